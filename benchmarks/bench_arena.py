@@ -0,0 +1,62 @@
+"""
+Compares the memory and render time of a NodeArena against the equivalent object tree.
+
+Both representations are built from scratch with the same generated document, a <div> with one
+paragraph of three inline nodes per child, so the text values are counted on both sides.
+
+Usage:
+    python -m benchmarks.bench_arena [--paragraphs N]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks import corpora
+
+
+def retained_memory(build: Callable[[], object]) -> tuple[object, int]:
+    """
+    Calls ``build`` and measures the traced memory held by the object it returns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        built = build()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return built, after - before
+
+
+def best_time(func: Callable[[], object], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paragraphs", type=int, default=250_000)
+    args = parser.parse_args()
+
+    tree, tree_bytes = retained_memory(lambda: corpora.wide_tree(args.paragraphs))
+    arena, arena_bytes = retained_memory(lambda: corpora.wide_arena(args.paragraphs))
+    nodes = len(arena)  # type: ignore[arg-type]
+    tree_seconds = best_time(lambda: "".join(tree.iter_html()))  # type: ignore[attr-defined]
+    arena_seconds = best_time(arena.to_html)  # type: ignore[attr-defined]
+
+    print(f"{nodes} nodes")
+    print(f"{'':<14}{'memory (B/node)':>18}{'render (s)':>14}")
+    print(f"{'object tree':<14}{tree_bytes / nodes:>18.1f}{tree_seconds:>14.3f}")
+    print(f"{'arena':<14}{arena_bytes / nodes:>18.1f}{arena_seconds:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
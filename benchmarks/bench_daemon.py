@@ -0,0 +1,127 @@
+"""
+Measures the latency of repeated builds with and without the build daemon.
+
+A synthetic corpus is built once, then one page is edited before each of the measured builds,
+the usual edit and rebuild loop. Builds run through the CLI in a new process, through build_site
+in a process that already imported repytile, and through a build daemon kept warm between them.
+
+Usage:
+    python -m benchmarks.bench_daemon [--pages N] [--builds N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.corpora import write_corpus
+from repytile.daemon import BuildDaemon, send_request
+from repytile.site_builder import build_site
+
+
+def measure(name: str, content: Path, builds: int, build: Callable[[], object]) -> None:
+    edited = content / "section0" / "page0.md"
+    original = edited.read_text()
+    build()
+    timings = []
+    for index in range(builds):
+        edited.write_text(f"{original}\n\nEdit {index}\n")
+        start = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - start)
+    edited.write_text(original)
+    print(
+        f"{name:<20}{statistics.median(timings) * 1000:>12.1f}"
+        f"{min(timings) * 1000:>12.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=2_000)
+    parser.add_argument("--builds", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        content = root / "content"
+        write_corpus(content, args.pages)
+        template = root / "template.html"
+        template.write_text("<html><title>{{ Title }}</title>{{ Content }}</html>")
+
+        print(f"{'build':<20}{'median ms':>12}{'min ms':>12}")
+        cli = [sys.executable, "-m", "repytile", "build", str(content)]
+        measure(
+            "cli",
+            content,
+            args.builds,
+            lambda: subprocess.run(
+                [*cli, str(root / "cli"), "--template", str(template)],
+                check=True,
+                stdout=subprocess.DEVNULL,
+            ),
+        )
+        measure(
+            "build_site",
+            content,
+            args.builds,
+            lambda: build_site(content, root / "in-process", template),
+        )
+
+        daemon = BuildDaemon(root / "daemon.sock")
+        started = threading.Event()
+
+        async def run() -> None:
+            await daemon.start()
+            started.set()
+            try:
+                await daemon.serve_forever()
+            finally:
+                await daemon.close()
+
+        thread = threading.Thread(target=asyncio.run, args=(run(),))
+        thread.start()
+        started.wait()
+        request = {
+            "command": "build",
+            "content": str(content),
+            "output": str(root / "daemon"),
+            "template": str(template),
+        }
+        try:
+            measure(
+                "daemon",
+                content,
+                args.builds,
+                lambda: send_request(daemon.socket_path, request),
+            )
+            measure(
+                "cli --daemon",
+                content,
+                args.builds,
+                lambda: subprocess.run(
+                    [
+                        *cli,
+                        str(root / "daemon"),
+                        "--template",
+                        str(template),
+                        "--daemon",
+                        str(daemon.socket_path),
+                    ],
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                ),
+            )
+        finally:
+            send_request(daemon.socket_path, {"command": "stop"})
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
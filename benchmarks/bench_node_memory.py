@@ -0,0 +1,178 @@
+"""
+Measures the memory used per node by the repytile node classes.
+
+The slotted classes are compared against replicas of the previous ``__dict__`` based
+layout, which are kept here so both numbers can be produced by the same interpreter.
+
+Nodes are measured on their own, then inside a populated tree, which adds the children lists,
+the weak reference every ParentNode with children hands to its children, and, once the tree is
+rendered, the cached HTML.
+
+Usage:
+    python -m benchmarks.bench_node_memory [--nodes N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from repytile.block_elements import LeafNode, ParentNode
+from repytile.inline_elements import TextNode
+
+
+class _DictHTMLNode:
+    def __init__(
+        self,
+        tag: Optional[str] = None,
+        value: Optional[str] = None,
+        children: Optional[list[_DictHTMLNode]] = None,
+        props: Optional[dict[str, str]] = None,
+    ) -> None:
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class _DictLeafNode(_DictHTMLNode):
+    pass
+
+
+class _DictParentNode(_DictHTMLNode):
+    pass
+
+
+class _DictTextNode:
+    def __init__(self, text: str, text_type: str, url: Optional[str] = None) -> None:
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def bytes_per_node(factory: Callable[[int], object], count: int) -> float:
+    """
+    Allocates ``count`` objects through ``factory`` and measures the traced memory they hold.
+
+    Arguments:
+        factory (Callable[[int], object]): Builds one object given its index.
+        count (int): How many objects to allocate.
+
+    Returns:
+        float: The average number of bytes retained per object.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        nodes = [factory(i) for i in range(count)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The list holding the nodes is not part of the node cost
+    list_overhead = 8 * len(nodes) + 56
+    return (after - before - list_overhead) / count
+
+
+def bytes_per_tree_node(build: Callable[[], tuple[Any, int]], render: bool) -> float:
+    """
+    Builds one tree and measures the traced memory it holds, per node.
+
+    Arguments:
+        build (Callable[[], tuple[Any, int]]): Builds the tree, returns its root and the
+            number of nodes in it.
+        render (bool): Whether the tree is rendered once with ``to_html``, so the HTML cached
+            by its nodes is measured too.
+
+    Returns:
+        float: The average number of bytes retained per node.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        root, count = build()
+        if render:
+            root.to_html()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (after - before) / count
+
+
+# Shared values so only the node objects themselves are measured
+_TAG = "b"
+_VALUE = "value"
+_PROPS: dict[str, str] = {}
+_CHILDREN: list = []
+
+CASES: dict[str, tuple[Callable[[int], object], Callable[[int], object]]] = {
+    "LeafNode": (
+        lambda _: _DictLeafNode(_TAG, _VALUE, None, _PROPS),
+        lambda _: LeafNode(_TAG, _VALUE, None, _PROPS),
+    ),
+    "ParentNode": (
+        lambda _: _DictParentNode("p", None, _CHILDREN, None),
+        lambda _: ParentNode("p", None, _CHILDREN, None),
+    ),
+    "TextNode": (
+        lambda _: _DictTextNode(_VALUE, "bold"),
+        lambda _: TextNode(_VALUE, "bold"),
+    ),
+}
+
+
+def _tree(
+    parent: Callable[..., object], leaf: Callable[..., object], count: int
+) -> Callable[[], tuple[object, int]]:
+    # A page of paragraphs holding a bold, a plain and an italic leaf, close to parsed Markdown
+    paragraphs = max(count // 4, 1)
+
+    def build() -> tuple[object, int]:
+        root = parent(
+            "div",
+            None,
+            [
+                parent(
+                    "p",
+                    None,
+                    [leaf("b", _VALUE), leaf(None, _VALUE), leaf("i", _VALUE)],
+                    None,
+                )
+                for _ in range(paragraphs)
+            ],
+            None,
+        )
+        return root, 1 + 4 * paragraphs
+
+    return build
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'class':<12}{'before (B/node)':>18}{'after (B/node)':>18}{'saved':>10}")
+    for name, (legacy, slotted) in CASES.items():
+        before = bytes_per_node(legacy, args.nodes)
+        after = bytes_per_node(slotted, args.nodes)
+        saved = 1 - after / before
+        print(f"{name:<12}{before:>18.1f}{after:>18.1f}{saved:>10.0%}")
+
+    legacy_tree = _tree(_DictParentNode, _DictLeafNode, args.nodes)
+    slotted_tree = _tree(ParentNode, LeafNode, args.nodes)
+    # Nodes of the previous layout cached nothing, rendering left no memory behind
+    before = bytes_per_tree_node(legacy_tree, render=False)
+    print()
+    print(f"{'tree':<12}{'before (B/node)':>18}{'after (B/node)':>18}{'saved':>10}")
+    for name, render in (("built", False), ("rendered", True)):
+        after = bytes_per_tree_node(slotted_tree, render)
+        saved = 1 - after / before
+        print(f"{name:<12}{before:>18.1f}{after:>18.1f}{saved:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures how a full site build scales with the number of rendering processes.
+
+A synthetic corpus of Markdown pages is generated in a temporary directory and built from
+scratch once per job count.
+
+Usage:
+    python -m benchmarks.bench_parallel_build [--pages N] [--jobs 1 2 4 ...] [--gzip]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpora import write_corpus
+from repytile.site_builder import build_site
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=2_000)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    parser.add_argument(
+        "--gzip", action="store_true", help="Compress pages in the workers too."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_corpus(root / "content", args.pages)
+        template = root / "template.html"
+        template.write_text("<html><title>{{ Title }}</title>{{ Content }}</html>")
+
+        print(f"{'jobs':>6}{'seconds':>10}{'pages/s':>10}{'speedup':>10}")
+        baseline = None
+        for jobs in args.jobs:
+            start = time.perf_counter()
+            report = build_site(
+                root / "content",
+                root / f"public-{jobs}",
+                template,
+                jobs=jobs,
+                compress=args.gzip,
+            )
+            elapsed = time.perf_counter() - start
+            assert not report.errors, report.errors
+            baseline = baseline or elapsed
+            print(
+                f"{jobs:>6}{elapsed:>10.2f}{args.pages / elapsed:>10.0f}"
+                f"{baseline / elapsed:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measures the cold and warm latency of the dev server against a local client.
+
+A synthetic corpus is served from a temporary directory. Every page is requested once with an
+empty cache, then again once rendered pages are cached.
+
+Usage:
+    python -m benchmarks.bench_server [--pages N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpora import write_corpus
+from repytile.server import DevServer
+
+
+async def fetch(port: int, path: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+async def measure(root: Path, pages: list[str]) -> dict[str, list[float]]:
+    server = DevServer(root / "content", root / "template.html", poll_interval=None)
+    await server.start(port=0)
+    latencies: dict[str, list[float]] = {"cold": [], "warm": []}
+    try:
+        for phase in ("cold", "warm"):
+            for page in pages:
+                start = time.perf_counter()
+                await fetch(server.port, page)
+                latencies[phase].append(time.perf_counter() - start)
+    finally:
+        await server.close()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_corpus(root / "content", args.pages)
+        (root / "template.html").write_text(
+            "<html><title>{{ Title }}</title>{{ Content }}</html>"
+        )
+        pages = [
+            "/" + path.relative_to(root / "content").with_suffix(".html").as_posix()
+            for path in sorted((root / "content").rglob("*.md"))
+        ]
+        latencies = asyncio.run(measure(root, pages))
+
+    print(f"{'phase':<8}{'median (ms)':>14}{'p95 (ms)':>12}")
+    for phase, values in latencies.items():
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f"{phase:<8}{statistics.median(values) * 1e3:>14.3f}{p95 * 1e3:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Benchmarks of the parse and render hot paths.
+"""
+
+import random
+from collections import deque
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+from benchmarks import corpora
+from benchmarks.suite import benchmark
+from repytile import ast_cache, links
+from repytile.arena import NodeArena
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.block_parser import iter_blocks, markdown_to_html_node
+from repytile.document import Document
+from repytile.escaping import escape_attribute, escape_text
+from repytile.helpers import (
+    LeafNodePool,
+    _split_keep,
+    split_nodes_inline,
+    text_node_to_html_node,
+    text_nodes_to_html_nodes,
+    text_to_textnodes,
+)
+from repytile.inline_elements import TextNode
+from repytile.links import LinkIndex
+from repytile.pages import render_page, render_pages, stream_page
+from repytile.source import map_source
+from repytile.transforms import (
+    ExternalLinks,
+    HeadingIds,
+    LazyImages,
+    RewriteUrls,
+    Transform,
+    apply_transforms,
+)
+
+LONG_TEXT = 20_000
+WIDE_CHILDREN = 5_000
+DEEP_LEVELS = 500
+LARGE_FILE_PAGES = 100
+
+
+def _clear_caches(root: HTMLNode) -> None:
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        node._html = None
+        stack.extend(node.children or ())
+
+
+@benchmark("split_keep.bold")
+def split_keep_bold() -> Callable[[], object]:
+    text = corpora.delimiter_text(LONG_TEXT)
+    return lambda: _split_keep(text, "**")
+
+
+@benchmark("split_keep.code")
+def split_keep_code() -> Callable[[], object]:
+    text = corpora.delimiter_text(LONG_TEXT)
+    return lambda: _split_keep(text, "`")
+
+
+@benchmark("inline.text_to_textnodes")
+def inline_text_to_textnodes() -> Callable[[], object]:
+    texts = [corpora.delimiter_text(200, seed) for seed in range(100)]
+    return lambda: [text_to_textnodes(text) for text in texts]
+
+
+@benchmark("inline.split_nodes_inline")
+def inline_split_nodes_inline() -> Callable[[], object]:
+    nodes: list[TextNode | HTMLNode] = [
+        TextNode(corpora.delimiter_text(200, seed), "text") for seed in range(100)
+    ]
+    return lambda: split_nodes_inline(nodes)
+
+
+@benchmark("inline.long_text")
+def inline_long_text() -> Callable[[], object]:
+    nodes: list[TextNode | HTMLNode] = [
+        TextNode(corpora.delimiter_text(LONG_TEXT), "text")
+    ]
+    return lambda: split_nodes_inline(nodes)
+
+
+@benchmark("inline.adversarial")
+def inline_adversarial() -> Callable[[], object]:
+    nodes: list[TextNode | HTMLNode] = [TextNode("*" * LONG_TEXT + "`[", "text")]
+    return lambda: split_nodes_inline(nodes)
+
+
+@benchmark("convert.text_node_to_html_node")
+def convert_text_nodes() -> Callable[[], object]:
+    nodes = corpora.inline_text_nodes(1_000)
+    return lambda: [text_node_to_html_node(node) for node in nodes]
+
+
+@benchmark("convert.text_node_to_html_node.pooled")
+def convert_text_nodes_pooled() -> Callable[[], object]:
+    nodes = corpora.inline_text_nodes(1_000)
+    pool = LeafNodePool()
+    return lambda: [text_node_to_html_node(node, pool) for node in nodes]
+
+
+@benchmark("convert.text_nodes_to_html_nodes")
+def convert_text_nodes_batch() -> Callable[[], object]:
+    nodes = corpora.inline_text_nodes(1_000)
+    return lambda: text_nodes_to_html_nodes(nodes)
+
+
+@benchmark("convert.text_nodes_to_html_nodes.pooled")
+def convert_text_nodes_batch_pooled() -> Callable[[], object]:
+    nodes = corpora.inline_text_nodes(1_000)
+    pool = LeafNodePool()
+    return lambda: text_nodes_to_html_nodes(nodes, pool)
+
+
+@benchmark("pages.render_page.loop")
+def pages_render_page_loop() -> Callable[[], object]:
+    rng = random.Random(0)
+    sources = [corpora.markdown_page(rng, index) for index in range(20)]
+    template = "<title>{{ Title }}</title>{{ Content }}"
+    return lambda: [render_page(source, template) for source in sources]
+
+
+@benchmark("pages.render_pages")
+def pages_render_pages() -> Callable[[], object]:
+    rng = random.Random(0)
+    sources = [corpora.markdown_page(rng, index) for index in range(20)]
+    template = "<title>{{ Title }}</title>{{ Content }}"
+    return lambda: render_pages(sources, template)
+
+
+@benchmark("props_to_html.small")
+def props_to_html_small() -> Callable[[], object]:
+    node = LeafNode(
+        "a", "link", props={"href": "https://example.com", "target": "_blank"}
+    )
+    return _uncached_props_to_html(node)
+
+
+@benchmark("props_to_html.large")
+def props_to_html_large() -> Callable[[], object]:
+    node = LeafNode("div", "props", props=corpora.large_props(200))
+    return _uncached_props_to_html(node)
+
+
+def _uncached_props_to_html(node: HTMLNode) -> Callable[[], object]:
+    # The attributes are cached on the node, dropping them times the escaping and joining
+    def render() -> object:
+        node.invalidate()
+        return node.props_to_html()
+
+    return render
+
+
+@benchmark("escape.text.clean")
+def escape_text_clean() -> Callable[[], object]:
+    rng = random.Random(0)
+    texts = [corpora.paragraph(rng) for _ in range(200)]
+    return lambda: [escape_text(text) for text in texts]
+
+
+@benchmark("escape.text.special")
+def escape_text_special() -> Callable[[], object]:
+    rng = random.Random(0)
+    texts = [corpora.paragraph(rng) + " a < b && c > d" for _ in range(200)]
+    return lambda: [escape_text(text) for text in texts]
+
+
+@benchmark("escape.attribute")
+def escape_attribute_urls() -> Callable[[], object]:
+    urls = [f"/search?q={index}&page={index % 7}" for index in range(100)]
+    urls += [f"/{index}.html" for index in range(100)]
+    return lambda: [escape_attribute(url) for url in urls]
+
+
+@benchmark("render.text_heavy_page")
+def render_text_heavy_page() -> Callable[[], object]:
+    rng = random.Random(0)
+    tree = markdown_to_html_node(
+        "\n\n".join(corpora.paragraph(rng, 200, 400) for _ in range(100))
+    )
+
+    def render() -> str:
+        _clear_caches(tree)
+        return "".join(tree.iter_html())
+
+    return render
+
+
+@benchmark("render.wide.iter_html")
+def render_wide_iter_html() -> Callable[[], object]:
+    tree = corpora.wide_tree(WIDE_CHILDREN)
+    return lambda: "".join(tree.iter_html())
+
+
+@benchmark("render.wide.to_html_cold")
+def render_wide_to_html_cold() -> Callable[[], object]:
+    tree = corpora.wide_tree(WIDE_CHILDREN)
+
+    def render() -> str:
+        _clear_caches(tree)
+        return tree.to_html()
+
+    return render
+
+
+@benchmark("render.wide.to_html_cached")
+def render_wide_to_html_cached() -> Callable[[], object]:
+    tree = corpora.wide_tree(WIDE_CHILDREN)
+    return tree.to_html
+
+
+@benchmark("render.deep.iter_html")
+def render_deep_iter_html() -> Callable[[], object]:
+    tree = corpora.deep_tree(DEEP_LEVELS)
+    return lambda: "".join(tree.iter_html())
+
+
+@benchmark("render.deep.to_html_cold")
+def render_deep_to_html_cold() -> Callable[[], object]:
+    tree = corpora.deep_tree(DEEP_LEVELS)
+
+    def render() -> str:
+        _clear_caches(tree)
+        return tree.to_html()
+
+    return render
+
+
+@benchmark("render.large_props")
+def render_large_props() -> Callable[[], object]:
+    props = corpora.large_props(50)
+    tree = ParentNode(
+        tag="div",
+        children=[LeafNode("span", str(index), props=props) for index in range(500)],
+    )
+    return lambda: "".join(tree.iter_html())
+
+
+@benchmark("arena.wide.to_html")
+def arena_wide_to_html() -> Callable[[], object]:
+    arena = NodeArena.from_node(corpora.wide_tree(WIDE_CHILDREN))
+    return arena.to_html
+
+
+@benchmark("arena.deep.to_html")
+def arena_deep_to_html() -> Callable[[], object]:
+    arena = NodeArena.from_node(corpora.deep_tree(DEEP_LEVELS))
+    return arena.to_html
+
+
+@benchmark("arena.wide.from_node")
+def arena_wide_from_node() -> Callable[[], object]:
+    tree = corpora.wide_tree(WIDE_CHILDREN)
+    return lambda: NodeArena.from_node(tree)
+
+
+@benchmark("arena.wide.to_node")
+def arena_wide_to_node() -> Callable[[], object]:
+    arena = NodeArena.from_node(corpora.wide_tree(WIDE_CHILDREN))
+    return arena.to_node
+
+
+@benchmark("parse.page")
+def parse_page() -> Callable[[], object]:
+    page = corpora.markdown_page(random.Random(0))
+    return lambda: markdown_to_html_node(page)
+
+
+@benchmark("parse.link_heavy_page")
+def parse_link_heavy_page() -> Callable[[], object]:
+    page = corpora.link_heavy_markdown(1_000)
+    return lambda: markdown_to_html_node(page)
+
+
+@benchmark("document.edit_line")
+def document_edit_line() -> Callable[[], object]:
+    rng = random.Random(0)
+    # About 10k lines, the size of a large reference page
+    document = Document("\n\n".join(corpora.markdown_page(rng, i) for i in range(100)))
+    document.to_html()
+    middle = len(document.source.splitlines()) // 2
+    texts = ["Edited **line** one", "Edited *line* two"]
+    state = [0]
+
+    def edit() -> str:
+        state[0] ^= 1
+        document.edit(middle, middle + 1, texts[state[0]])
+        return document.to_html()
+
+    return edit
+
+
+@benchmark("ast.dumps.page")
+def ast_dumps_page() -> Callable[[], object]:
+    tree = markdown_to_html_node(corpora.markdown_page(random.Random(0)))
+    return lambda: ast_cache.dumps([tree])
+
+
+@benchmark("ast.loads.page")
+def ast_loads_page() -> Callable[[], object]:
+    data = ast_cache.dumps(
+        [markdown_to_html_node(corpora.markdown_page(random.Random(0)))]
+    )
+    return lambda: ast_cache.loads(data)
+
+
+@benchmark("ast.load_mmap.page")
+def ast_load_mmap_page() -> Callable[[], object]:
+    tree = markdown_to_html_node(corpora.markdown_page(random.Random(0)))
+    # The directory lives as long as the process, the suite holds on to the returned callable
+    path = Path(tempfile.mkdtemp(prefix="repytile-bench-")) / "page.ast"
+    ast_cache.save(path, [tree])
+    return lambda: ast_cache.load(path)
+
+
+@benchmark("ast.loads.link_heavy_page")
+def ast_loads_link_heavy_page() -> Callable[[], object]:
+    data = ast_cache.dumps([markdown_to_html_node(corpora.link_heavy_markdown(1_000))])
+    return lambda: ast_cache.loads(data)
+
+
+def _large_markdown_file() -> Path:
+    rng = random.Random(0)
+    path = Path(tempfile.mkdtemp(prefix="repytile-bench-")) / "large.md"
+    path.write_text(
+        "\n\n".join(corpora.markdown_page(rng, i) for i in range(LARGE_FILE_PAGES)),
+        encoding="utf-8",
+    )
+    return path
+
+
+@benchmark("split.large_file.read_text")
+def split_large_file_read_text() -> Callable[[], object]:
+    path = _large_markdown_file()
+    return lambda: deque(iter_blocks(path.read_text(encoding="utf-8")), maxlen=0)
+
+
+@benchmark("split.large_file.mmap")
+def split_large_file_mmap() -> Callable[[], object]:
+    path = _large_markdown_file()
+
+    def split() -> object:
+        with map_source(path) as source:
+            return deque(iter_blocks(source), maxlen=0)
+
+    return split
+
+
+@benchmark("stream.large_file.first_chunk")
+def stream_large_file_first_chunk() -> Callable[[], object]:
+    path = _large_markdown_file()
+    template = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+    def first_chunk() -> object:
+        with path.open(encoding="utf-8") as file:
+            return next(stream_page(file, template))
+
+    return first_chunk
+
+
+@benchmark("stream.large_file.stream_page")
+def stream_large_file_stream_page() -> Callable[[], object]:
+    path = _large_markdown_file()
+    template = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+    def stream() -> object:
+        with path.open(encoding="utf-8") as file:
+            return deque(stream_page(file, template), maxlen=0)
+
+    return stream
+
+
+@benchmark("stream.large_file.render_page")
+def stream_large_file_render_page() -> Callable[[], object]:
+    path = _large_markdown_file()
+    template = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+    return lambda: render_page(path.read_text(encoding="utf-8"), template)
+
+
+@benchmark("parse.link_heavy_page.indexed")
+def parse_link_heavy_page_indexed() -> Callable[[], object]:
+    page = corpora.link_heavy_markdown(1_000)
+    index = LinkIndex()
+
+    def parse() -> object:
+        with links.enabled(index), index.document("page.md"):
+            return markdown_to_html_node(page)
+
+    return parse
+
+
+@benchmark("links.broken")
+def links_broken() -> Callable[[], object]:
+    index = LinkIndex()
+    with links.enabled(index):
+        for i in range(100):
+            with index.document(f"docs/page{i}.md"):
+                markdown_to_html_node(corpora.link_heavy_markdown(100, seed=i))
+    pages = {f"docs/page{i}.html" for i in range(50)}
+    return lambda: LinkIndex.from_dict(index.to_dict()).broken(pages.__contains__)
+
+
+def _transform_passes() -> list[Transform]:
+    return [
+        HeadingIds(),
+        ExternalLinks(),
+        LazyImages(),
+        RewriteUrls(lambda url: url.removesuffix(".md")),
+    ]
+
+
+def _transform_tree() -> HTMLNode:
+    rng = random.Random(0)
+    markdown = "\n\n".join(corpora.markdown_page(rng, i) for i in range(10))
+    return markdown_to_html_node(markdown + "\n\n" + corpora.link_heavy_markdown(500))
+
+
+@benchmark("transforms.fused")
+def transforms_fused() -> Callable[[], object]:
+    tree = _transform_tree()
+    passes = _transform_passes()
+    return lambda: apply_transforms(tree, passes)
+
+
+@benchmark("transforms.separate")
+def transforms_separate() -> Callable[[], object]:
+    tree = _transform_tree()
+    passes = _transform_passes()
+
+    def run() -> object:
+        for transform in passes:
+            apply_transforms(tree, [transform])
+        return tree
+
+    return run
@@ -0,0 +1,159 @@
+"""
+Synthetic, seeded corpora shared by the benchmarks.
+
+Every generator takes an explicit seed or is fully deterministic, so two runs on the same
+machine measure exactly the same input.
+"""
+
+import random
+from pathlib import Path
+
+from repytile.arena import NodeArena
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.inline_elements import TextNode
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+
+
+def paragraph(rng: random.Random, min_words: int = 40, max_words: int = 120) -> str:
+    """
+    Generates a paragraph of inline Markdown with some bold, code and link elements.
+    """
+    words = []
+    for _ in range(rng.randint(min_words, max_words)):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.05:
+            word = f"**{word}**"
+        elif roll < 0.1:
+            word = f"`{word}`"
+        elif roll < 0.12:
+            word = f"[{word}](/{word}.html)"
+        words.append(word)
+    return " ".join(words)
+
+
+def markdown_page(rng: random.Random, index: int = 0) -> str:
+    """
+    Generates a Markdown page made of headings, paragraphs and lists.
+    """
+    blocks = [f"# Page {index}"]
+    for section in range(rng.randint(5, 15)):
+        blocks.append(f"## Section {section}")
+        blocks.append(paragraph(rng))
+        blocks.append("\n".join(f"* {paragraph(rng)[:60]}" for _ in range(5)))
+    return "\n\n".join(blocks)
+
+
+def write_corpus(content_dir: Path, pages: int, seed: int = 0) -> None:
+    """
+    Writes a synthetic corpus of Markdown pages.
+
+    Arguments:
+        content_dir (Path): Where the pages are written.
+        pages (int): How many pages to generate.
+        seed (int): Seed of the random generator, so runs are reproducible.
+    """
+    rng = random.Random(seed)
+    for index in range(pages):
+        page = content_dir / f"section{index % 10}" / f"page{index}.md"
+        page.parent.mkdir(parents=True, exist_ok=True)
+        page.write_text(markdown_page(rng, index))
+
+
+def delimiter_text(length: int, seed: int = 0) -> str:
+    """
+    Generates long inline text where a large share of the words carry bold, italic or code delimiters.
+    """
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        word = rng.choice(["{}", "**{}**", "*{}*", "`{}`"]).format(word)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def link_heavy_markdown(links: int, seed: int = 0) -> str:
+    """
+    Generates a Markdown page whose paragraphs are mostly links and images.
+    """
+    rng = random.Random(seed)
+    lines = ["# Links"]
+    for index in range(links):
+        word = rng.choice(WORDS)
+        if index % 3 == 0:
+            lines.append(f"![{word} {index}](/img/{word}-{index}.png)")
+        else:
+            lines.append(f"* [{word} {index}](https://example.com/{word}/{index})")
+        if index % 10 == 9:
+            lines.append("")
+    return "\n".join(lines)
+
+
+def inline_text_nodes(count: int, seed: int = 0) -> list[TextNode]:
+    """
+    Generates a mix of TextNodes of every type, with the repetition found on real pages.
+    """
+    rng = random.Random(seed)
+    text_types = ["text", "text", "text", "bold", "italic", "code", "link", "image"]
+    nodes = []
+    for _ in range(count):
+        text_type = rng.choice(text_types)
+        word = rng.choice(WORDS)
+        url = f"/{word}.html" if text_type in ("link", "image") else None
+        nodes.append(TextNode(word, text_type, url))
+    return nodes
+
+
+def wide_tree(children: int) -> ParentNode:
+    """
+    Builds a <div> with ``children`` paragraphs of three inline nodes each.
+    """
+    return ParentNode(
+        tag="div",
+        children=[
+            ParentNode(
+                tag="p",
+                children=[
+                    LeafNode(None, "text "),
+                    LeafNode("b", f"bold {index}"),
+                    LeafNode("a", "link", props={"href": f"/{index}.html"}),
+                ],
+            )
+            for index in range(children)
+        ],
+    )
+
+
+def wide_arena(children: int) -> NodeArena:
+    """
+    Builds the same document as ``wide_tree`` directly into a NodeArena.
+    """
+    arena = NodeArena()
+    root = arena.add_parent("div")
+    for index in range(children):
+        paragraph = arena.add_parent("p", parent=root)
+        arena.add_leaf(None, "text ", parent=paragraph)
+        arena.add_leaf("b", f"bold {index}", parent=paragraph)
+        arena.add_leaf("a", "link", {"href": f"/{index}.html"}, parent=paragraph)
+    return arena
+
+
+def deep_tree(depth: int) -> ParentNode:
+    """
+    Builds a chain of ``depth`` nested <div> with a single leaf at the bottom.
+    """
+    node: HTMLNode = LeafNode("b", "deep")
+    for _ in range(depth):
+        node = ParentNode(tag="div", children=[node])
+    return node  # type: ignore[return-value]
+
+
+def large_props(count: int) -> dict[str, str]:
+    """
+    Builds a props dictionary with ``count`` attributes.
+    """
+    return {f"data-attr-{index}": f"value {index}" for index in range(count)}
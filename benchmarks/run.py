@@ -0,0 +1,75 @@
+"""
+Runs the benchmark suite and optionally compares it against a stored baseline.
+
+Usage:
+    python -m benchmarks.run [-k PATTERN] [--output results.json]
+                             [--baseline baseline.json] [--threshold 0.1]
+
+The process exits with status 1 when a benchmark regressed beyond the threshold.
+"""
+
+import argparse
+import fnmatch
+import json
+import sys
+
+import benchmarks.cases  # noqa: F401 registers the benchmarks
+from benchmarks.suite import (
+    BENCHMARKS,
+    compare_results,
+    results_to_json,
+    run_benchmark,
+    save_results,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-k", "--filter", default="*", help="Glob pattern of the benchmarks to run."
+    )
+    parser.add_argument("--list", action="store_true", help="List the benchmarks.")
+    parser.add_argument("--output", help="Save the results into this JSON file.")
+    parser.add_argument("--baseline", help="Compare the results to this JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Tolerated slowdown or memory growth against the baseline.",
+    )
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if fnmatch.fnmatch(name, args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = []
+    print(f"{'benchmark':<42}{'ops/sec':>14}{'mean':>12}{'peak mem':>12}")
+    for name in names:
+        result = run_benchmark(name, min_time=args.min_time, repeat=args.repeat)
+        results.append(result)
+        print(
+            f"{name:<42}{result.ops_per_sec:>14,.1f}"
+            f"{result.mean_seconds * 1e6:>10.1f}us"
+            f"{result.peak_memory_bytes / 1024:>10.1f}KB"
+        )
+
+    if args.output:
+        save_results(results, args.output)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(
+            results_to_json(results), baseline, args.threshold
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
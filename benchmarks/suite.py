@@ -0,0 +1,170 @@
+"""
+Registry and timing harness of the benchmark suite.
+
+A benchmark is a setup function decorated with ``@benchmark``. The setup builds its input
+outside of the measurement and returns the zero-argument callable that is timed.
+"""
+
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from repytile import __version__
+
+MIN_COMPARED_MEMORY = 4096
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(
+    name: str,
+) -> Callable[[Callable[[], Callable[[], object]]], Callable[[], Callable[[], object]]]:
+    """
+    Registers a benchmark setup function under ``name``.
+    """
+
+    def register(
+        setup: Callable[[], Callable[[], object]]
+    ) -> Callable[[], Callable[[], object]]:
+        if name in BENCHMARKS:
+            raise ValueError(f"benchmark {name} is already registered")
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class BenchmarkResult:
+    __slots__ = ("name", "ops_per_sec", "mean_seconds", "peak_memory_bytes")
+
+    def __init__(
+        self, name: str, ops_per_sec: float, mean_seconds: float, peak_memory_bytes: int
+    ) -> None:
+        """
+        Initialize a BenchmarkResult object.
+
+        Parameters:
+            name (str): The name of the benchmark.
+            ops_per_sec (float): Calls per second of the fastest repetition.
+            mean_seconds (float): Duration of one call in the fastest repetition.
+            peak_memory_bytes (int): Peak memory allocated during a single call.
+        """
+        self.name = name
+        self.ops_per_sec = ops_per_sec
+        self.mean_seconds = mean_seconds
+        self.peak_memory_bytes = peak_memory_bytes
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "ops_per_sec": self.ops_per_sec,
+            "mean_seconds": self.mean_seconds,
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_benchmark(name: str, min_time: float = 0.2, repeat: int = 5) -> BenchmarkResult:
+    """
+    Times a registered benchmark.
+
+    Arguments:
+        name (str): The name of the benchmark.
+        min_time (float): Minimum duration of each repetition, in seconds. The number of calls per
+            repetition is calibrated once to reach it.
+        repeat (int): How many repetitions are timed, the fastest one is kept.
+
+    Returns:
+        BenchmarkResult: The measurements of the benchmark.
+    """
+    func = BENCHMARKS[name]()
+    # Warm up, then calibrate the number of calls so each repetition lasts at least min_time
+    func()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed < min_time / 10 else 1 + int(min_time / elapsed)
+
+    best = elapsed
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    mean = best / loops
+    return BenchmarkResult(name, 1 / mean, mean, _peak_memory(func))
+
+
+def results_to_json(results: list[BenchmarkResult]) -> dict[str, Any]:
+    return {
+        "meta": {
+            "repytile": __version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": {result.name: result.to_dict() for result in results},
+    }
+
+
+def save_results(results: list[BenchmarkResult], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(results_to_json(results), output, indent=2, sort_keys=True)
+
+
+def compare_results(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Compares two result files and lists the regressions.
+
+    Arguments:
+        current (dict[str, Any]): The results of this run, as saved by ``save_results``.
+        baseline (dict[str, Any]): The stored baseline results.
+        threshold (float): The tolerated slowdown or memory increase, 0.1 meaning 10%.
+
+    Returns:
+        list[str]: One message per regressed benchmark. Benchmarks missing from either side
+                   are ignored.
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        reference: Optional[dict[str, Any]] = baseline["results"].get(name)
+        if reference is None:
+            continue
+        slowdown = reference["ops_per_sec"] / result["ops_per_sec"] - 1
+        if slowdown > threshold:
+            regressions.append(f"{name}: {slowdown:.1%} slower than baseline")
+        # Tiny allocations are too noisy to be compared relatively
+        if reference["peak_memory_bytes"] > MIN_COMPARED_MEMORY:
+            growth = result["peak_memory_bytes"] / reference["peak_memory_bytes"] - 1
+            if growth > threshold:
+                regressions.append(
+                    f"{name}: {growth:.1%} more peak memory than baseline"
+                )
+    return regressions
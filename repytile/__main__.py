@@ -0,0 +1,5 @@
+import sys
+
+from repytile.cli import main
+
+sys.exit(main())
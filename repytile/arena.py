@@ -0,0 +1,343 @@
+from array import array
+from typing import Iterator, Optional
+
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.escaping import escape_attribute, escape_text
+
+# Index used for missing parents, children, siblings, tags and props
+NO_NODE = -1
+
+_LEAF = 0
+_PARENT = 1
+
+
+class NodeArena:
+    """
+    NodeArena stores a forest of HTML nodes in parallel arrays instead of one object per node.
+
+    A node is an integer index. Tags and attribute sets are interned once per arena, and the tree
+    structure is kept as parent, first child and next sibling indices, so a node costs a few dozen
+    bytes instead of a Python object, a children list and a props dictionary.
+    """
+
+    __slots__ = (
+        "_strings",
+        "_string_ids",
+        "_prop_sets",
+        "_prop_set_ids",
+        "_prop_html",
+        "_kinds",
+        "_tags",
+        "_values",
+        "_props",
+        "_parents",
+        "_first_children",
+        "_last_children",
+        "_next_siblings",
+    )
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty NodeArena object.
+        """
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._prop_sets: list[tuple[tuple[str, str], ...]] = []
+        self._prop_set_ids: dict[tuple[tuple[str, str], ...], int] = {}
+        # Attributes of each prop set rendered once, with their leading space
+        self._prop_html: list[str] = []
+        self._kinds = array("b")
+        self._tags = array("i")
+        self._values: list[Optional[str]] = []
+        self._props = array("i")
+        self._parents = array("i")
+        self._first_children = array("i")
+        self._last_children = array("i")
+        self._next_siblings = array("i")
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def _intern_string(self, string: Optional[str]) -> int:
+        if string is None:
+            return NO_NODE
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = self._string_ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+    def _intern_props(self, props: Optional[dict[str, str]]) -> int:
+        if props is None:
+            return NO_NODE
+        key = tuple(props.items())
+        props_id = self._prop_set_ids.get(key)
+        if props_id is None:
+            props_id = self._prop_set_ids[key] = len(self._prop_sets)
+            self._prop_sets.append(key)
+            self._prop_html.append(
+                "".join(
+                    f' {attr}="{escape_attribute(val)}"'
+                    for attr, val in key
+                    if val is not None
+                )
+            )
+        return props_id
+
+    def _add(
+        self,
+        kind: int,
+        tag: Optional[str],
+        value: Optional[str],
+        props: Optional[dict[str, str]],
+        parent: int,
+    ) -> int:
+        if parent != NO_NODE and self._kinds[parent] != _PARENT:
+            raise ValueError(f"Node {parent} is a leaf and cannot have children")
+        index = len(self._kinds)
+        self._kinds.append(kind)
+        self._tags.append(self._intern_string(tag))
+        self._values.append(value)
+        self._props.append(self._intern_props(props))
+        self._parents.append(parent)
+        self._first_children.append(NO_NODE)
+        self._last_children.append(NO_NODE)
+        self._next_siblings.append(NO_NODE)
+        if parent != NO_NODE:
+            last = self._last_children[parent]
+            if last == NO_NODE:
+                self._first_children[parent] = index
+            else:
+                self._next_siblings[last] = index
+            self._last_children[parent] = index
+        return index
+
+    def add_leaf(
+        self,
+        tag: Optional[str],
+        value: Optional[str],
+        props: Optional[dict[str, str]] = None,
+        parent: int = NO_NODE,
+    ) -> int:
+        """
+        Adds a node rendered like a LeafNode.
+
+        Parameters:
+            tag (Optional[str]): The HTML tag, None for raw text.
+            value (Optional[str]): The content of the node.
+            props (Optional[dict[str, str]]): The attributes of the node.
+            parent (int): The index of the parent node, NO_NODE for a root.
+
+        Returns:
+            int: The index of the new node.
+
+        Raises:
+            ValueError: If the parent is a leaf node.
+        """
+        return self._add(_LEAF, tag, value, props, parent)
+
+    def add_parent(
+        self,
+        tag: Optional[str],
+        props: Optional[dict[str, str]] = None,
+        parent: int = NO_NODE,
+    ) -> int:
+        """
+        Adds a node rendered like a ParentNode. Its children are added afterwards, in order.
+
+        Parameters:
+            tag (Optional[str]): The HTML tag.
+            props (Optional[dict[str, str]]): The attributes of the node.
+            parent (int): The index of the parent node, NO_NODE for a root.
+
+        Returns:
+            int: The index of the new node.
+
+        Raises:
+            ValueError: If the parent is a leaf node.
+        """
+        return self._add(_PARENT, tag, None, props, parent)
+
+    def add_tree(self, node: HTMLNode, parent: int = NO_NODE) -> int:
+        """
+        Copies a tree of LeafNode and ParentNode objects into the arena, without recursion.
+
+        Parameters:
+            node (HTMLNode): The root of the tree.
+            parent (int): The index of the node the tree is attached to, NO_NODE for a root.
+
+        Returns:
+            int: The index of the copied root.
+
+        Raises:
+            TypeError: If the tree contains nodes other than LeafNode and ParentNode.
+        """
+        root = NO_NODE
+        # Children are pushed in reverse so they are added, and linked, in document order
+        stack: list[tuple[HTMLNode, int]] = [(node, parent)]
+        while stack:
+            current, current_parent = stack.pop()
+            if isinstance(current, ParentNode):
+                index = self.add_parent(current.tag, current.props, current_parent)
+                stack.extend(
+                    (child, index) for child in reversed(current.children or ())
+                )
+            elif isinstance(current, LeafNode):
+                index = self.add_leaf(
+                    current.tag, current.value, current.props, current_parent
+                )
+            else:
+                raise TypeError(
+                    f"Only LeafNode and ParentNode can be stored, got {type(current).__name__}"
+                )
+            if root == NO_NODE:
+                root = index
+        return root
+
+    @classmethod
+    def from_node(cls, node: HTMLNode) -> "NodeArena":
+        """
+        Builds an arena holding a copy of a tree, its root being the node 0.
+
+        Parameters:
+            node (HTMLNode): The root of the tree.
+
+        Returns:
+            NodeArena: The new arena.
+        """
+        arena = cls()
+        arena.add_tree(node)
+        return arena
+
+    def tag(self, index: int) -> Optional[str]:
+        tag_id = self._tags[index]
+        return None if tag_id == NO_NODE else self._strings[tag_id]
+
+    def value(self, index: int) -> Optional[str]:
+        return self._values[index]
+
+    def props(self, index: int) -> Optional[dict[str, str]]:
+        """
+        Returns a new dictionary with the attributes of a node, None if it has no props.
+        """
+        props_id = self._props[index]
+        return None if props_id == NO_NODE else dict(self._prop_sets[props_id])
+
+    def parent(self, index: int) -> int:
+        return self._parents[index]
+
+    def is_leaf(self, index: int) -> bool:
+        return self._kinds[index] == _LEAF
+
+    def children(self, index: int) -> Iterator[int]:
+        """
+        Iterates over the indices of the children of a node, in order.
+        """
+        child = self._first_children[index]
+        while child != NO_NODE:
+            yield child
+            child = self._next_siblings[child]
+
+    def to_node(self, index: int = 0) -> HTMLNode:
+        """
+        Converts a node of the arena and its descendants back into LeafNode and ParentNode objects.
+
+        Parameters:
+            index (int): The index of the root of the subtree.
+
+        Returns:
+            HTMLNode: The root of the converted tree.
+        """
+        root = self._to_object(index)
+        stack = [(root, index)]
+        while stack:
+            node, current = stack.pop()
+            for child in self.children(current):
+                child_node = self._to_object(child)
+                node.append_child(child_node)  # type: ignore[attr-defined]
+                if isinstance(child_node, ParentNode):
+                    stack.append((child_node, child))
+        return root
+
+    def _to_object(self, index: int) -> HTMLNode:
+        if self._kinds[index] == _LEAF:
+            return LeafNode(
+                self.tag(index), self._values[index], props=self.props(index)
+            )
+        # Children are appended by to_node, a leaf parent keeps children set to None
+        children: Optional[list[HTMLNode]] = (
+            [] if self._first_children[index] != NO_NODE else None
+        )
+        return ParentNode(
+            tag=self.tag(index), children=children, props=self.props(index)
+        )
+
+    def iter_html(self, index: int = 0) -> Iterator[str]:
+        """
+        Lazily generates the HTML of a node and its descendants, straight from the arrays.
+
+        The output is identical to ``HTMLNode.iter_html`` on the equivalent object tree.
+
+        Parameters:
+            index (int): The index of the root of the subtree.
+
+        Returns:
+            Iterator[str]: The chunks that, once concatenated, form the HTML of the subtree.
+
+        Raises:
+            ValueError: If any parent node in the subtree does not have a tag value or any children.
+        """
+        strings = self._strings
+        prop_html = self._prop_html
+        kinds = self._kinds
+        tags = self._tags
+        values = self._values
+        props = self._props
+        first_children = self._first_children
+        next_siblings = self._next_siblings
+        # Nodes still to be rendered, closing tags are pushed as the complement of the node index
+        stack = [index]
+        while stack:
+            current = stack.pop()
+            if current < 0:
+                yield f"</{strings[tags[~current]]}>"
+                continue
+            tag_id = tags[current]
+            tag = strings[tag_id] if tag_id != NO_NODE else None
+            props_id = props[current]
+            attrs = prop_html[props_id] if props_id != NO_NODE else ""
+            if kinds[current] == _LEAF:
+                value = values[current]
+                text = escape_text(value) if isinstance(value, str) else f"{value}"
+                yield f"<{tag}{attrs}>{text}</{tag}>" if tag else text
+                continue
+            if not tag:
+                raise ValueError("ParentNode instances should have a tag value")
+            child = first_children[current]
+            if child == NO_NODE:
+                raise ValueError(
+                    "ParentNode instances should have at least one children"
+                )
+            yield f"<{tag}{attrs}>"
+            stack.append(~current)
+            children = []
+            while child != NO_NODE:
+                children.append(child)
+                child = next_siblings[child]
+            children.reverse()
+            stack.extend(children)
+
+    def to_html(self, index: int = 0) -> str:
+        """
+        Converts a node of the arena and its descendants to an HTML string.
+
+        Parameters:
+            index (int): The index of the root of the subtree.
+
+        Returns:
+            str: The HTML representation of the subtree.
+        """
+        return "".join(self.iter_html(index))
+
+    def __repr__(self) -> str:
+        return f"NodeArena(nodes={len(self)}, strings={len(self._strings)}, prop_sets={len(self._prop_sets)})"
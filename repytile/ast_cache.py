@@ -0,0 +1,325 @@
+"""
+Compact binary serialization of parsed documents.
+
+A file holds a header, a string table and a sequence of node records:
+
+    magic          b"RPAST"
+    format         varint, FORMAT_VERSION
+    version        varint length + UTF-8 bytes, the repytile version that parsed the document
+    strings        varint count, then varint length + UTF-8 bytes for each string
+    records        varint count, then one record per node
+
+Every tag, value, attribute, text and URL is stored once in the string table and referenced by
+its varint index. Records are written in post-order, so a ParentNode record only stores the
+number of its children, which are the records right before it, and loading is a single pass over
+the bytes with a value stack, without recursion. Each record starts with a byte holding the node
+kind and the presence flags of its optional fields:
+
+    LeafNode       [tag] [value] [props]
+    ParentNode     [tag] [props] children count
+    TextNode       text, text_type, [url]
+
+props being a varint count followed by the name and value of each attribute. Nodes left on the
+stack at the end of the records are the roots of the file, in order.
+"""
+
+import mmap
+import os
+from pathlib import Path
+from typing import Sequence, Union
+
+from repytile import __version__
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.escaping import Markup
+from repytile.exceptions import InvalidCacheFile, InvalidElementType
+from repytile.inline_elements import TextNode
+from repytile.output import write_atomic
+
+MAGIC = b"RPAST"
+FORMAT_VERSION = 1
+AST_SUFFIX = ".ast"
+
+# Nodes that can be stored in an AST file
+ASTNode = Union[HTMLNode, TextNode]
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+_KIND_MASK = 0x03
+_LEAF = 0
+_PARENT = 1
+_TEXT = 2
+_HAS_TAG = 0x04
+_HAS_VALUE = 0x08
+_HAS_PROPS = 0x10
+_MARKUP_VALUE = 0x20
+_HAS_URL = 0x40
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _StringTable:
+    __slots__ = ("ids", "strings")
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.strings: list[str] = []
+
+    def add(self, string: str) -> int:
+        # Markup and plain strings with the same text share an entry, the record keeps the flag
+        string = str(string)
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+
+def _write_props(out: bytearray, strings: _StringTable, props: dict[str, str]) -> None:
+    _write_varint(out, len(props))
+    for name, value in props.items():
+        _write_varint(out, strings.add(name))
+        _write_varint(out, strings.add(value))
+
+
+def _write_record(
+    out: bytearray, strings: _StringTable, node: ASTNode, children: int
+) -> None:
+    if isinstance(node, TextNode):
+        flags = _TEXT | (_HAS_URL if node.url is not None else 0)
+        out.append(flags)
+        _write_varint(out, strings.add(node.text))
+        _write_varint(out, strings.add(node.text_type))
+        if node.url is not None:
+            _write_varint(out, strings.add(node.url))
+        return
+
+    tag, value, props = node.tag, node.value, node.props
+    is_parent = isinstance(node, ParentNode)
+    if not is_parent and not isinstance(node, LeafNode):
+        raise TypeError(
+            f"Only LeafNode, ParentNode and TextNode can be stored, got {type(node).__name__}"
+        )
+    flags = _PARENT if is_parent else _LEAF
+    if tag is not None:
+        flags |= _HAS_TAG
+    if value is not None and not is_parent:
+        flags |= _HAS_VALUE
+        if isinstance(value, Markup):
+            flags |= _MARKUP_VALUE
+    if props is not None:
+        flags |= _HAS_PROPS
+    out.append(flags)
+    if tag is not None:
+        _write_varint(out, strings.add(tag))
+    if flags & _HAS_VALUE:
+        _write_varint(out, strings.add(value))  # type: ignore[arg-type]
+    if props is not None:
+        _write_props(out, strings, props)
+    if is_parent:
+        _write_varint(out, children)
+
+
+def dumps(roots: Sequence[ASTNode]) -> bytes:
+    """
+    Serializes trees of nodes into the binary AST format.
+
+    Arguments:
+        roots (Sequence[ASTNode]): The roots to store, LeafNode, ParentNode or TextNode objects.
+
+    Returns:
+        bytes: The serialized trees.
+
+    Raises:
+        TypeError: If a tree contains another kind of node.
+    """
+    strings = _StringTable()
+    records = bytearray()
+    count = 0
+    # Post-order walk with an explicit stack: a node is written once all of its children were
+    stack: list[tuple[ASTNode, bool]] = [(root, False) for root in reversed(roots)]
+    while stack:
+        node, children_written = stack.pop()
+        children = node.children if isinstance(node, ParentNode) else None
+        if children and not children_written:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        _write_record(records, strings, node, len(children or ()))
+        count += 1
+
+    out = bytearray(MAGIC)
+    _write_varint(out, FORMAT_VERSION)
+    version = __version__.encode("utf-8")
+    _write_varint(out, len(version))
+    out += version
+    _write_varint(out, len(strings.strings))
+    for string in strings.strings:
+        encoded = string.encode("utf-8")
+        _write_varint(out, len(encoded))
+        out += encoded
+    _write_varint(out, count)
+    out += records
+    return bytes(out)
+
+
+class _Reader:
+    __slots__ = ("data", "position")
+
+    def __init__(self, data: Buffer) -> None:
+        self.data = data
+        self.position = 0
+
+    def varint(self) -> int:
+        data = self.data
+        position = self.position
+        byte = data[position]
+        position += 1
+        value = byte & 0x7F
+        shift = 7
+        while byte & 0x80:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        self.position = position
+        return value
+
+    def string(self) -> str:
+        length = self.varint()
+        start = self.position
+        self.position = start + length
+        if self.position > len(self.data):
+            raise IndexError("string out of the buffer")
+        return str(self.data[start : self.position], "utf-8")
+
+
+def loads(data: Buffer) -> list[ASTNode]:
+    """
+    Deserializes trees of nodes from the binary AST format.
+
+    Arguments:
+        data (Buffer): The serialized trees, as bytes or any buffer such as a memory-mapped file.
+
+    Returns:
+        list[ASTNode]: The roots, in the order they were stored.
+
+    Raises:
+        InvalidCacheFile: If the data is not a valid AST file, was written with another format
+            version or by another repytile version, or holds nodes that cannot be built.
+    """
+    if bytes(data[: len(MAGIC)]) != MAGIC:
+        raise InvalidCacheFile("Not a repytile AST file")
+    reader = _Reader(data)
+    reader.position = len(MAGIC)
+    try:
+        format_version = reader.varint()
+        if format_version != FORMAT_VERSION:
+            raise InvalidCacheFile(f"Unsupported AST format {format_version}")
+        version = reader.string()
+        if version != __version__:
+            raise InvalidCacheFile(f"AST file written by repytile {version}")
+        strings = [reader.string() for _ in range(reader.varint())]
+        return _load_records(reader, strings)
+    except (IndexError, UnicodeDecodeError) as exc:
+        raise InvalidCacheFile(f"Truncated or corrupt AST file: {exc}") from exc
+    except (InvalidElementType, ValueError) as exc:
+        # Raised by the node constructors, the builder re-parses the source instead
+        raise InvalidCacheFile(f"Invalid node in AST file: {exc}") from exc
+
+
+def _decode_varints(data: memoryview) -> list[int]:
+    # Flag bytes are below 0x80, so the records section is a plain sequence of varints and
+    # can be decoded in one pass over the bytes, read in place from the buffer
+    values: list[int] = []
+    append = values.append
+    value = shift = 0
+    for byte in data:
+        if byte < 0x80:
+            append(value | (byte << shift))
+            value = shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+    if shift:
+        raise InvalidCacheFile("Truncated varint at the end of the records")
+    return values
+
+
+def _load_records(reader: _Reader, strings: list[str]) -> list[ASTNode]:
+    count = reader.varint()
+    with memoryview(reader.data)[reader.position :] as records:
+        values = iter(_decode_varints(records))
+    read = values.__next__
+    stack: list[ASTNode] = []
+    try:
+        for _ in range(count):
+            flags = read()
+            kind = flags & _KIND_MASK
+            if kind == _TEXT:
+                text = strings[read()]
+                text_type = strings[read()]
+                url = strings[read()] if flags & _HAS_URL else None
+                stack.append(TextNode(text, text_type, url))
+                continue
+
+            tag = strings[read()] if flags & _HAS_TAG else None
+            value = None
+            if flags & _HAS_VALUE:
+                value = strings[read()]
+                if flags & _MARKUP_VALUE:
+                    value = Markup(value)
+            props = None
+            if flags & _HAS_PROPS:
+                props = {}
+                for _ in range(read()):
+                    name = strings[read()]
+                    props[name] = strings[read()]
+            if kind == _LEAF:
+                stack.append(LeafNode(tag, value, None, props))
+                continue
+            if kind != _PARENT:
+                raise InvalidCacheFile(f"Unknown record kind {kind}")
+            children_count = read()
+            if children_count > len(stack):
+                raise InvalidCacheFile("ParentNode record with missing children")
+            children: list[HTMLNode] | None = None
+            if children_count:
+                children = stack[-children_count:]  # type: ignore[assignment]
+                del stack[-children_count:]
+            stack.append(ParentNode(tag, None, children, props))
+    except StopIteration:
+        raise InvalidCacheFile("Truncated records") from None
+    if next(values, None) is not None:
+        raise InvalidCacheFile("Trailing data after the last record")
+    return stack
+
+
+def save(path: Union[str, Path], roots: Sequence[ASTNode]) -> None:
+    """
+    Writes trees of nodes into an AST file.
+
+    The file is written next to its destination and renamed into place, so concurrent readers
+    never see a partial file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, dumps(roots))
+
+
+def load(path: Union[str, Path]) -> list[ASTNode]:
+    """
+    Reads trees of nodes from an AST file, memory-mapping it instead of copying it in memory.
+
+    Raises:
+        OSError: If the file cannot be read.
+        InvalidCacheFile: If the file is not a valid AST file, see ``loads``.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise InvalidCacheFile("Empty AST file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return loads(mapped)
@@ -1,9 +1,39 @@
 from __future__ import annotations
 
-from typing import Optional
+import weakref
+from typing import Iterable, Iterator, Optional, Protocol
+
+from repytile.escaping import escape_attribute, escape_text
+
+# Number of characters buffered by ``render_to`` before flushing into the writer
+RENDER_BUFFER_SIZE = 64 * 1024
+# Levels of ParentNodes below the rendered node whose HTML ``to_html`` caches. Each cached level
+# keeps another copy of the HTML of the nodes below it, deeper nodes are only rendered.
+HTML_CACHE_DEPTH = 3
+
+
+class SupportsWrite(Protocol):
+    """
+    Minimal protocol for the objects accepted by ``HTMLNode.render_to``,
+    such as open text files, sockets wrapped with ``makefile`` or ``io.StringIO``.
+    """
+
+    def write(self, s: str, /) -> object: ...
 
 
 class HTMLNode:
+    # Nodes are allocated by the million on large sites, slots avoid a per-instance __dict__
+    __slots__ = (
+        "_tag",
+        "_value",
+        "_children",
+        "_props",
+        "_parent",
+        "_html",
+        "_attrs",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         tag: Optional[str] = None,
@@ -24,23 +54,178 @@ class HTMLNode:
             props (dict[str, str]): A dictionary of properties/attributes for the node.
                 If not provided, the node will have no attributes.
 
+        Values and attribute values are HTML escaped when rendered, unless they are Markup strings.
+
+        The HTML generated by ``to_html`` is cached on the node and on its descendants down to
+        HTML_CACHE_DEPTH levels of ParentNodes. Assigning ``tag``, ``value``, ``children`` or
+        ``props``, or using the mutation methods, drops the cache of the node and of its ancestors
+        only, so re-rendering after an edit only renders the edited node and the children of its
+        ancestors again, the subtree of the edited node when it lies below the cached levels. Lists and dictionaries mutated in place are
+        not tracked, ``invalidate`` should be called after such edits.
+
+        Children only hold a weak reference to their parent, so trees hold no reference cycle and
+        are freed as soon as they are dropped. A node belongs to a single tree: adding a node that
+        is still the child of another node raises a ValueError. Nodes meant to appear in several
+        trees, such as the LeafNodes of a LeafNodePool, are marked with ``share`` and are
+        read-only.
         """
-        self.tag = tag
-        self.value = value
-        self.children = children
+        self._parent: Optional[weakref.ref[HTMLNode]] = None
+        self._html: Optional[str] = None
+        self._attrs: Optional[str] = None
+        self._tag = tag
+        self._value = value
+        self._props = props
+        # Fresh nodes have nothing to invalidate, children are adopted without the setter
+        if children:
+            _adopt(self, children)
+        self._children = children
+
+    @property
+    def tag(self) -> Optional[str]:
+        return self._tag
+
+    @tag.setter
+    def tag(self, tag: Optional[str]) -> None:
+        self.invalidate()
+        self._tag = tag
+
+    @property
+    def value(self) -> Optional[str]:
+        return self._value
+
+    @value.setter
+    def value(self, value: Optional[str]) -> None:
+        self.invalidate()
+        self._value = value
+
+    @property
+    def props(self) -> Optional[dict[str, str]]:
+        return self._props
+
+    @props.setter
+    def props(self, props: Optional[dict[str, str]]) -> None:
+        self.invalidate()
+        self._props = props
+
+    @property
+    def children(self) -> Optional[list[HTMLNode]]:
+        return self._children
+
+    @children.setter
+    def children(self, children: Optional[list[HTMLNode]]) -> None:
+        self.invalidate()
+        if children:
+            _adopt(self, children)
+        self._children = children
+
+    @property
+    def parent(self) -> Optional[HTMLNode]:
+        """
+        The node this node is a child of, None for roots and shared nodes.
+        """
+        parent = self._parent
+        if parent is None or parent is _SHARED:
+            return None
+        return parent()
+
+    def share(self) -> None:
+        """
+        Marks the node as shared by several trees, such as the LeafNodes of a LeafNodePool.
+
+        A shared node keeps no parent, so it can be the child of any number of nodes, and is
+        read-only: modifying it raises a ValueError, as the cached HTML of the trees holding it
+        could not be dropped. Edit a copy instead.
+        """
+        self._parent = _SHARED
+
+    def set_prop(self, name: str, value: str) -> None:
+        """
+        Sets a single property of the node.
+
+        The properties dictionary is replaced by an updated copy rather than mutated, so
+        dictionaries shared between several nodes are never modified behind their back.
+
+        Parameters:
+            name (str): The name of the attribute.
+            value (str): The value of the attribute.
+        """
+        props = dict(self._props) if self._props else {}
+        props[name] = value
         self.props = props
 
+    def invalidate(self) -> None:
+        """
+        Drops the cached HTML of the node and of all of its ancestors, and the cached attributes
+        of the node.
+
+        Raises:
+            ValueError: If the node is shared, see ``share``.
+        """
+        if self._parent is _SHARED:
+            raise ValueError("Shared nodes are read-only, edit a copy instead")
+        self._attrs = None
+        node: Optional[HTMLNode] = self
+        # Caches are only kept on some levels, an ancestor may be cached above uncached nodes
+        while node is not None:
+            node._html = None
+            parent = node._parent
+            node = parent() if parent is not None else None
+
     def to_html(self) -> str:
+        """
+        Converts the node to its HTML representation.
+
+        Returns:
+            str: The HTML representation of the node.
+        """
+        if self._html is None:
+            self._html = "".join(self.iter_html())
+        return self._html
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Lazily generates the HTML representation of the node as a sequence of string chunks.
+
+        Cached HTML is reused when available, but no new cache is filled, so streaming a large
+        document does not keep a copy of it in memory.
+
+        Returns:
+            Iterator[str]: The chunks that, once concatenated, form the HTML of the node.
+        """
         raise NotImplementedError
 
+    def render_to(self, writer: SupportsWrite) -> None:
+        """
+        Writes the HTML representation of the node into a file-like object.
+
+        Chunks are buffered up to ``RENDER_BUFFER_SIZE`` characters before each write,
+        so peak memory stays bounded no matter how large the document is.
+
+        Parameters:
+            writer (SupportsWrite): Any object exposing a ``write(str)`` method.
+        """
+        buffer: list[str] = []
+        buffered = 0
+        for chunk in self.iter_html():
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= RENDER_BUFFER_SIZE:
+                writer.write("".join(buffer))
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            writer.write("".join(buffer))
+
     def props_to_html(self) -> str:
         """
         Converts the properties of an object into HTML attribute format.
 
         This method takes the properties of an object stored in a dictionary format
         and converts them into a string of HTML attributes.
-        Each key-value pair in the dictionary is converted into a string in the format 'key="value"'.
+        Each key-value pair in the dictionary is converted into a string in the format 'key="value"',
+        the value being escaped for an attribute context. Properties set to None are left out.
         If the object has no properties, an empty string is returned.
+        The result is cached on the node until its props are assigned or ``invalidate`` is called.
 
         Returns:
             str: A string containing the HTML attributes generated from the object's properties.
@@ -50,23 +235,54 @@ class HTMLNode:
             >>> obj.props_to_html()
             'id="my_id" class="my_class" style="color: red;"'
         """
-        if not self.props:
-            return ""
-        html_props = []
-        for attr, val in self.props.items():
-            html_props.append(f'{attr}="{val}"')
-
-        return " ".join(html_props)
+        attrs = self._attrs
+        if attrs is None:
+            props = self._props
+            attrs = self._attrs = (
+                " ".join(
+                    f'{attr}="{escape_attribute(val)}"'
+                    for attr, val in props.items()
+                    if val is not None
+                )
+                if props
+                else ""
+            )
+        return attrs
 
     def __repr__(self) -> str:
         return f"HTMLNode(tag={self.tag}, value={self.value}, children={self.children}, props={self.props})"
 
 
+# Parent link of the nodes marked with ``HTMLNode.share``, only ever compared by identity
+_SHARED = weakref.ref(HTMLNode())
+
+
+def _adopt(parent: HTMLNode, children: Iterable[HTMLNode]) -> None:
+    # A node reachable from two trees would only invalidate the cache of the last one
+    link = weakref.ref(parent)
+    for child in children:
+        current = child._parent
+        if current is link or current is _SHARED:
+            continue
+        owner = current() if current is not None else None
+        if owner is not None and owner is not parent:
+            raise ValueError(
+                "The node is already the child of another node, remove it from its parent "
+                "first or add a copy"
+            )
+        child._parent = link
+
+
 class LeafNode(HTMLNode):
     """
     LeafNode represents HTML elements without any children
     """
 
+    __slots__ = ()
+
+    def iter_html(self) -> Iterator[str]:
+        yield self._html if self._html is not None else self._render()
+
     def to_html(self) -> str:
         """
         Converts the LeafNode object to its HTML representation.
@@ -74,11 +290,27 @@ class LeafNode(HTMLNode):
         Returns:
             str: The HTML representation of the LeafNode object.
         """
-        if not self.tag:
-            return f"{self.value}"
-        html_attrs = self.props_to_html()
-        sp = " " if html_attrs else ""
-        return f"<{self.tag}{sp}{html_attrs}>{self.value}</{self.tag}>"
+        if self._html is None:
+            self._html = self._render()
+        return self._html
+
+    def _render(self) -> str:
+        text = self._value
+        # Plain strings without special characters, the common case, skip the escaping call
+        if text.__class__ is str:
+            if "&" in text or "<" in text or ">" in text:  # type: ignore[operator]
+                text = escape_text(text)  # type: ignore[arg-type]
+        else:
+            text = escape_text(text) if isinstance(text, str) else f"{text}"
+        tag = self._tag
+        if not tag:
+            return text  # type: ignore[return-value]
+        attrs = self._attrs
+        if attrs is None:
+            attrs = self.props_to_html()
+        if attrs:
+            return f"<{tag} {attrs}>{text}</{tag}>"
+        return f"<{tag}>{text}</{tag}>"
 
 
 class ParentNode(HTMLNode):
@@ -86,25 +318,160 @@ class ParentNode(HTMLNode):
     ParentNode represents HTML elements that have at least one children. It is assumed it has no value.
     """
 
-    def to_html(self) -> str:
+    __slots__ = ()
+
+    def _tag_pair(self) -> tuple[str, str]:
         """
-        Converts the parent node and its children to an HTML string.
+        Builds the opening and closing tags of the node.
 
         Returns:
-            str: The HTML representation of the parent node and its children.
+            tuple[str, str]: The opening and closing tags.
 
         Raises:
             ValueError: If the parent node does not have a tag value or if it does not have any children.
         """
-        if not self.tag:
+        if not self._tag:
             raise ValueError("ParentNode instances should have a tag value")
 
-        if not self.children:
+        if not self._children:
             raise ValueError("ParentNode instances should have at least one children")
         html_attrs = self.props_to_html()
         sp = " " if html_attrs else ""
-        # For each child nod, generate the HTML representation
-        children_html_repr = [child.to_html() for child in self.children]
-        # Concats all children HTML representation into a single string
-        children_html = "".join(children_html_repr)
-        return f"<{self.tag}{sp}{html_attrs}>{children_html}</{self.tag}>"
+        return f"<{self._tag}{sp}{html_attrs}>", f"</{self._tag}>"
+
+    def to_html(self) -> str:
+        """
+        Converts the parent node and its children to an HTML string.
+
+        The HTML of the node is cached, and so is the HTML of its descendants down to
+        HTML_CACHE_DEPTH levels of ParentNodes, and of the children of the deepest of them. Nodes
+        whose cache is still valid are not rendered again. Below the cached levels, each child is
+        rendered with ``iter_html`` and joined once, so deep trees are rendered in linear time
+        and memory, without deep recursion.
+
+        Returns:
+            str: The HTML representation of the parent node and its children.
+
+        Raises:
+            ValueError: If any parent node in the tree does not have a tag value or any children.
+        """
+        return self._cached_html(HTML_CACHE_DEPTH)
+
+    def _cached_html(self, levels: int) -> str:
+        html = self._html
+        if html is not None:
+            return html
+        opening, closing = self._tag_pair()
+        parts = [opening]
+        for child in self._children or ():
+            html = child._html
+            if html is None:
+                if levels and isinstance(child, ParentNode):
+                    html = child._cached_html(levels - 1)
+                else:
+                    html = child._html = "".join(child.iter_html())
+            parts.append(html)
+        parts.append(closing)
+        html = self._html = "".join(parts)
+        return html
+
+    def append_child(self, child: HTMLNode) -> None:
+        """
+        Adds a child at the end of the children of the node.
+
+        Parameters:
+            child (HTMLNode): The node to add.
+        """
+        self.insert_child(len(self._children or ()), child)
+
+    def insert_child(self, index: int, child: HTMLNode) -> None:
+        """
+        Inserts a child before the given position.
+
+        Parameters:
+            index (int): The position of the new child.
+            child (HTMLNode): The node to insert.
+
+        Raises:
+            ValueError: If the child is already the child of another node.
+        """
+        self.invalidate()
+        _adopt(self, (child,))
+        if self._children is None:
+            self._children = []
+        self._children.insert(index, child)
+
+    def replace_child(self, index: int, child: HTMLNode) -> HTMLNode:
+        """
+        Replaces the child at the given position.
+
+        Parameters:
+            index (int): The position of the child to replace.
+            child (HTMLNode): The new node.
+
+        Returns:
+            HTMLNode: The replaced node.
+
+        Raises:
+            ValueError: If the new child is already the child of another node.
+        """
+        self.invalidate()
+        children = self._children or []
+        old = children[index]
+        if old is child:
+            return old
+        _adopt(self, (child,))
+        children[index] = child
+        if old.parent is self:
+            old._parent = None
+        return old
+
+    def remove_child(self, index: int) -> HTMLNode:
+        """
+        Removes the child at the given position.
+
+        Parameters:
+            index (int): The position of the child to remove.
+
+        Returns:
+            HTMLNode: The removed node.
+        """
+        self.invalidate()
+        old = (self._children or []).pop(index)
+        if old.parent is self:
+            old._parent = None
+        return old
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Lazily generates the HTML of the parent node and all of its descendants.
+
+        The tree is walked with an explicit stack instead of recursion, so arbitrarily deep
+        documents do not hit the interpreter recursion limit, and each chunk is produced exactly
+        once instead of being copied again at every nesting level.
+
+        Returns:
+            Iterator[str]: The chunks that, once concatenated, form the HTML of the tree.
+
+        Raises:
+            ValueError: If any parent node in the tree does not have a tag value or any children.
+        """
+        # The stack holds either nodes still to be rendered or closing tags still to be emitted
+        stack: list[HTMLNode | str] = [self]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                yield item  # type: ignore[misc]
+            elif item._html is not None:  # type: ignore[union-attr]
+                yield item._html  # type: ignore[union-attr]
+            elif isinstance(item, ParentNode):
+                opening, closing = item._tag_pair()
+                yield opening
+                stack.append(closing)
+                # Children are pushed in reverse so they are popped in document order
+                stack.extend(reversed(item._children))  # type: ignore[arg-type]
+            elif isinstance(item, LeafNode):
+                # Rendering leaves inline avoids creating a generator per leaf
+                yield item._render()
+            else:
+                yield from item.iter_html()  # type: ignore[union-attr]
@@ -0,0 +1,431 @@
+import mmap
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+from repytile import instrumentation, links
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.exceptions import InvalidElementType
+from repytile.helpers import (
+    LeafNodePool,
+    text_nodes_to_html_nodes,
+    text_to_textnodes,
+)
+
+HEADING_PATTERN = re.compile(r"(#{1,6}) (.*)")
+ORDERED_ITEM_PATTERN = re.compile(r"\d+\. ")
+UNORDERED_ITEM_MARKERS = ("* ", "- ")
+CODE_FENCE = "```"
+
+# Patterns run on the raw bytes of a buffer, between the offsets of a line
+_HEADING_BYTES_PATTERN = re.compile(rb"#{1,6} .*")
+# ASCII characters stripped by str.strip, non-ASCII whitespace is checked on the decoded line
+_ASCII_SPACE_PATTERN = re.compile(rb"[\t\x0b\x0c\r\x1c-\x1f ]*")
+_CODE_FENCE_BYTES = CODE_FENCE.encode("ascii")
+# First bytes of lines that can neither be blank nor start a heading or a code fence
+_PLAIN_LINE_START = tuple(
+    0x20 < byte < 0x80 and byte not in b"#`" for byte in range(256)
+)
+
+BLOCK_TAG_MAPPING = {
+    "paragraph": "p",
+    "quote": "blockquote",
+    "code": "pre",
+    "unordered_list": "ul",
+    "ordered_list": "ol",
+}
+
+# UTF-8 encoded Markdown, such as a memory-mapped file
+MarkdownBuffer = Union[bytes, bytearray, mmap.mmap]
+# Markdown text, split into lines as it is read
+MarkdownLines = Union[str, Iterable[str]]
+# Markdown can be given as a whole string, an open file, any iterable of lines or a buffer
+MarkdownSource = Union[MarkdownLines, MarkdownBuffer]
+
+
+class MarkdownBlock:
+    __slots__ = ("block_type", "lines", "line_number")
+
+    def __init__(self, block_type: str, lines: list[str], line_number: int) -> None:
+        """
+        Initialize a MarkdownBlock object holding the raw source lines of a block.
+
+        Parameters:
+            block_type (str): The type of the block, such as 'heading', 'paragraph', 'code', etc.
+            lines (list[str]): The source lines of the block, without line terminators.
+                Block markers such as '#', '>' or code fences are kept.
+            line_number (int): The 1-based line number of the first line of the block.
+        """
+        self.block_type = block_type
+        self.lines = lines
+        self.line_number = line_number
+
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, MarkdownBlock):
+            return False
+        return (
+            self.block_type == __value.block_type
+            and self.lines == __value.lines
+            and self.line_number == __value.line_number
+        )
+
+    def __repr__(self) -> str:
+        return f"MarkdownBlock({self.block_type}, {self.lines}, {self.line_number})"
+
+
+def _classify_lines(lines: list[str]) -> str:
+    """
+    Finds the type of a block made of consecutive non-blank lines.
+
+    Arguments:
+        lines (list[str]): The lines of the block.
+
+    Returns:
+        str: 'quote', 'unordered_list' or 'ordered_list' if every line has the matching marker,
+             'paragraph' otherwise.
+    """
+    if all(line.startswith(">") for line in lines):
+        return "quote"
+    if all(line.startswith(UNORDERED_ITEM_MARKERS) for line in lines):
+        return "unordered_list"
+    if all(ORDERED_ITEM_PATTERN.match(line) for line in lines):
+        return "ordered_list"
+    return "paragraph"
+
+
+def split_lines(text: str) -> list[str]:
+    """
+    Splits Markdown text into lines the way buffers are split by ``iter_blocks``.
+
+    Lines end with "\\n" only, unlike ``str.splitlines`` which also breaks on characters such as
+    form feeds or "\\u2028", so a document gives the same lines, and line numbers, whether it
+    is read as text or as bytes.
+
+    Arguments:
+        text (str): The Markdown text.
+
+    Returns:
+        list[str]: The lines, without their "\\n" or "\\r\\n" ending. A line break ending
+            the text does not start another line.
+    """
+    lines = text.split("\n")
+    if not lines[-1]:
+        lines.pop()
+    if "\r" in text:
+        return [line.rstrip("\r") for line in lines]
+    return lines
+
+
+def _iter_lines(source: MarkdownLines) -> Iterable[str]:
+    if isinstance(source, str):
+        return split_lines(source)
+    return source
+
+
+def iter_blocks(source: MarkdownSource) -> Iterator[MarkdownBlock]:
+    """
+    Lazily splits Markdown into blocks, yielding each block as soon as it is closed.
+
+    Arguments:
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+            Lines are consumed one at a time, so only the block being built is kept in memory.
+            A bytes-like buffer, such as a memory-mapped file, is split on byte offsets and only
+            the lines of each block are decoded, as UTF-8, once the block is closed. Its lines
+            end with "\\n" or "\\r\\n".
+
+    Returns:
+        Iterator[MarkdownBlock]: The blocks of the document, in order.
+
+    Blocks are separated by blank lines. Headings always form a block of their own and code
+    fences keep every line, blank ones included, until the closing fence. A code fence left
+    open at the end of the input is closed implicitly.
+    """
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        return _iter_buffer_blocks(source)
+    return _iter_line_blocks(source)
+
+
+def _iter_line_blocks(source: MarkdownLines) -> Iterator[MarkdownBlock]:
+    pending: list[str] = []
+    pending_start = 0
+    fence: list[str] | None = None
+    fence_start = 0
+
+    for line_number, raw_line in enumerate(_iter_lines(source), start=1):
+        line = raw_line.rstrip("\r\n")
+
+        if fence is not None:
+            fence.append(line)
+            if line.startswith(CODE_FENCE):
+                yield MarkdownBlock("code", fence, fence_start)
+                fence = None
+            continue
+
+        if not line.strip():
+            if pending:
+                yield MarkdownBlock(_classify_lines(pending), pending, pending_start)
+                pending = []
+            continue
+
+        if line.startswith(CODE_FENCE) or HEADING_PATTERN.fullmatch(line):
+            if pending:
+                yield MarkdownBlock(_classify_lines(pending), pending, pending_start)
+                pending = []
+            if line.startswith(CODE_FENCE):
+                fence = [line]
+                fence_start = line_number
+            else:
+                yield MarkdownBlock("heading", [line], line_number)
+            continue
+
+        if not pending:
+            pending_start = line_number
+        pending.append(line)
+
+    if fence is not None:
+        yield MarkdownBlock("code", fence, fence_start)
+    if pending:
+        yield MarkdownBlock(_classify_lines(pending), pending, pending_start)
+
+
+def _decode_lines(buffer: MarkdownBuffer, start: int, end: int) -> list[str]:
+    text = str(buffer[start:end], "utf-8")
+    lines = text.split("\n")
+    if "\r" in text:
+        return [line.rstrip("\r") for line in lines]
+    return lines
+
+
+def _is_blank_line(buffer: MarkdownBuffer, start: int, end: int) -> bool:
+    first = _ASCII_SPACE_PATTERN.match(buffer, start, end).end()  # type: ignore[union-attr]
+    if first == end:
+        return True
+    if buffer[first] < 0x80:
+        return False
+    return not str(buffer[first:end], "utf-8").strip()
+
+
+def _iter_buffer_blocks(buffer: MarkdownBuffer) -> Iterator[MarkdownBlock]:
+    # Same state machine as _iter_line_blocks, lines and blocks being tracked as offsets into
+    # the buffer. Nothing is copied out of the buffer before a block is closed. Line ends keep
+    # their "\r", which the blank and heading checks accept and _decode_lines strips.
+    size = len(buffer)
+    find = buffer.find
+    plain = _PLAIN_LINE_START
+    fence_pattern = _CODE_FENCE_BYTES
+    fence_length = len(fence_pattern)
+    pending_start = -1
+    pending_end = 0
+    pending_line = 0
+    fence_start = -1
+    fence_end = 0
+    fence_line = 0
+    position = 0
+    line_number = 0
+
+    while position < size:
+        line_number += 1
+        start = position
+        end = find(b"\n", start)
+        if end < 0:
+            end = size
+        position = end + 1
+
+        if fence_start >= 0:
+            fence_end = end
+            if buffer[start : start + fence_length] == fence_pattern:
+                yield MarkdownBlock(
+                    "code", _decode_lines(buffer, fence_start, end), fence_line
+                )
+                fence_start = -1
+            continue
+
+        # Most lines continue a block, their first byte is enough to tell
+        if start < end and plain[buffer[start]]:
+            if pending_start < 0:
+                pending_start = start
+                pending_line = line_number
+            pending_end = end
+            continue
+
+        if _is_blank_line(buffer, start, end):
+            if pending_start >= 0:
+                lines = _decode_lines(buffer, pending_start, pending_end)
+                yield MarkdownBlock(_classify_lines(lines), lines, pending_line)
+                pending_start = -1
+            continue
+
+        is_fence = buffer[start : start + fence_length] == fence_pattern
+        if is_fence or _HEADING_BYTES_PATTERN.fullmatch(buffer, start, end):
+            if pending_start >= 0:
+                lines = _decode_lines(buffer, pending_start, pending_end)
+                yield MarkdownBlock(_classify_lines(lines), lines, pending_line)
+                pending_start = -1
+            if is_fence:
+                fence_start = start
+                fence_end = end
+                fence_line = line_number
+            else:
+                yield MarkdownBlock(
+                    "heading", _decode_lines(buffer, start, end), line_number
+                )
+            continue
+
+        if pending_start < 0:
+            pending_start = start
+            pending_line = line_number
+        pending_end = end
+
+    if fence_start >= 0:
+        yield MarkdownBlock(
+            "code", _decode_lines(buffer, fence_start, fence_end), fence_line
+        )
+    if pending_start >= 0:
+        lines = _decode_lines(buffer, pending_start, pending_end)
+        yield MarkdownBlock(_classify_lines(lines), lines, pending_line)
+
+
+def instrumented_blocks(source: MarkdownSource) -> Iterator[MarkdownBlock]:
+    """
+    Same as ``iter_blocks``, timing the "block_split" stage when instrumentation is enabled.
+    """
+    instr = instrumentation.active()
+    if instr is None:
+        return iter_blocks(source)
+    return instr.timed_iter("block_split", iter_blocks(source))
+
+
+def text_to_children(text: str, pool: Optional[LeafNodePool] = None) -> list[HTMLNode]:
+    """
+    Converts inline Markdown text into the HTML nodes used as children of a block.
+
+    Arguments:
+        text (str): The inline Markdown text.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        list[HTMLNode]: The converted nodes. Empty text results in a single empty raw text node,
+                        so the resulting ParentNode can still be rendered.
+    """
+    instr = instrumentation.active()
+    if instr is None:
+        children: list[HTMLNode] = text_nodes_to_html_nodes(  # type: ignore[assignment]
+            text_to_textnodes(text), pool
+        )
+    else:
+        with instr.stage("inline_split"):
+            text_nodes = text_to_textnodes(text)
+        with instr.stage("convert"):
+            children = text_nodes_to_html_nodes(text_nodes, pool)  # type: ignore[assignment]
+        instr.count("inline_nodes", len(children))
+    return children or [LeafNode(value="")]
+
+
+def _code_block_to_html_node(lines: list[str]) -> ParentNode:
+    closed = len(lines) > 1 and lines[-1].startswith(CODE_FENCE)
+    body = lines[1:-1] if closed else lines[1:]
+    language = lines[0][len(CODE_FENCE) :].strip()
+    props = {"class": f"language-{language}"} if language else None
+    code = LeafNode(tag="code", value="\n".join(body), props=props)
+    return ParentNode(tag="pre", children=[code])
+
+
+def block_to_html_node(
+    block: MarkdownBlock, pool: Optional[LeafNodePool] = None
+) -> ParentNode:
+    """
+    Converts a MarkdownBlock into a ParentNode, parsing the inline elements of its text.
+
+    Arguments:
+        block (MarkdownBlock): The block to be converted.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        ParentNode: The converted node.
+
+    Raises:
+        InvalidElementType: If the block_type of the block is not supported.
+
+    The mapping of block_type to HTML is as follows:
+    - "heading": <h1> to <h6> tag, depending on the number of '#'
+    - "paragraph": <p> tag, lines are joined with spaces
+    - "quote": <blockquote> tag, with the '>' markers removed
+    - "code": <pre><code> tags, the content is kept verbatim
+    - "unordered_list": <ul> tag with one <li> per line
+    - "ordered_list": <ol> tag with one <li> per line
+
+    While a LinkIndex is enabled, links and images are recorded with the line of their block,
+    or of their list item.
+    """
+    block_type = block.block_type
+    lines = block.lines
+    index = links.active()
+    if index is not None:
+        index.line = block.line_number
+    if block_type == "heading":
+        heading = HEADING_PATTERN.fullmatch(lines[0])
+        if heading is None:
+            raise InvalidElementType(f"Invalid heading block: {lines[0]}")
+        level, text = heading.groups()
+        return ParentNode(tag=f"h{len(level)}", children=text_to_children(text, pool))
+
+    if block_type not in BLOCK_TAG_MAPPING:
+        raise InvalidElementType(
+            f"The type of MarkdownBlock {block_type} is not allowed for conversion"
+        )
+    tag = BLOCK_TAG_MAPPING[block_type]
+    if block_type == "code":
+        return _code_block_to_html_node(lines)
+    if block_type == "paragraph":
+        return ParentNode(tag=tag, children=text_to_children(" ".join(lines), pool))
+    if block_type == "quote":
+        text = " ".join(line[1:].removeprefix(" ") for line in lines)
+        return ParentNode(tag=tag, children=text_to_children(text, pool))
+
+    if block_type == "unordered_list":
+        items = [line[2:] for line in lines]
+    else:
+        items = [ORDERED_ITEM_PATTERN.sub("", line, count=1) for line in lines]
+    if index is not None:
+        children: list[HTMLNode] = []
+        for offset, item in enumerate(items):
+            index.line = block.line_number + offset
+            children.append(ParentNode(tag="li", children=text_to_children(item, pool)))
+        return ParentNode(tag=tag, children=children)
+    children = [
+        ParentNode(tag="li", children=text_to_children(item, pool)) for item in items
+    ]
+    return ParentNode(tag=tag, children=children)
+
+
+def markdown_to_html_nodes(
+    source: MarkdownSource, pool: Optional[LeafNodePool] = None
+) -> Iterator[ParentNode]:
+    """
+    Lazily converts Markdown into one ParentNode per block.
+
+    Arguments:
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        Iterator[ParentNode]: The converted blocks, each one yielded as soon as it is closed.
+    """
+    for block in instrumented_blocks(source):
+        yield block_to_html_node(block, pool)
+
+
+def markdown_to_html_node(
+    source: MarkdownSource, pool: Optional[LeafNodePool] = None
+) -> ParentNode:
+    """
+    Converts a whole Markdown document into a single <div> ParentNode.
+
+    Arguments:
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        ParentNode: A <div> node with one child per block of the document.
+    """
+    children: list[HTMLNode] = list(markdown_to_html_nodes(source, pool))
+    return ParentNode(tag="div", children=children or [LeafNode(value="")])
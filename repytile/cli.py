@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+from repytile import __version__
+from repytile.instrumentation import Instrumentation
+from repytile.links import LinkIndex, LinkRecord
+from repytile.server import DEFAULT_CACHE_BYTES, DEFAULT_POLL_INTERVAL, DevServer, serve
+from repytile.daemon import BuildDaemon, run_daemon, send_request
+from repytile.exceptions import ShardMergeError
+from repytile.site_builder import (
+    COMPRESS_MIN_SIZE,
+    Shard,
+    build_site,
+    copy_assets,
+    find_broken_links,
+    merge_shards,
+)
+
+
+def _shard(spec: str) -> Shard:
+    try:
+        return Shard.parse(spec)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard {spec!r}, expected NUMBER/COUNT such as 1/4"
+        ) from None
+
+
+def _build(args: argparse.Namespace) -> int:
+    if args.shard is not None and args.check_links:
+        # Links to the pages of other shards would be reported as broken
+        print(
+            "error: --check-links is not supported with --shard, "
+            "check the links when merging the shards",
+            file=sys.stderr,
+        )
+        return 2
+    if args.daemon is not None:
+        return _build_with_daemon(args)
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    profile = Instrumentation() if args.profile else None
+    report = build_site(
+        content_dir=args.content,
+        output_dir=args.output,
+        template_path=args.template,
+        manifest_path=args.manifest,
+        jobs=args.jobs,
+        profile=profile,
+        use_ast_cache=not args.no_ast_cache,
+        compress=args.gzip,
+        compress_min_size=args.gzip_min_size,
+        shard=args.shard,
+    )
+    for source, error in report.errors.items():
+        print(f"error: {source}: {error}", file=sys.stderr)
+    broken = _check_site(args, report.links)
+    print(report.summary())
+    if profile is not None:
+        print(profile.report(top=args.profile_top))
+    return 1 if report.errors or broken else 0
+
+
+def _build_with_daemon(args: argparse.Namespace) -> int:
+    if args.profile:
+        print("error: --profile is not supported with --daemon", file=sys.stderr)
+        return 2
+    request = {
+        "command": "build",
+        "content": str(args.content.resolve()),
+        "output": str(args.output.resolve()),
+        "template": str(args.template.resolve()),
+        "manifest": str(args.manifest.resolve()) if args.manifest else None,
+        "use_ast_cache": not args.no_ast_cache,
+        "compress": args.gzip,
+        "compress_min_size": args.gzip_min_size,
+        "shard": str(args.shard) if args.shard is not None else None,
+    }
+    try:
+        response = send_request(args.daemon, request)
+    except OSError as exc:
+        print(
+            f"error: cannot reach the daemon at {args.daemon}: {exc}", file=sys.stderr
+        )
+        return 1
+    if "error" in response:
+        print(f"error: {response['error']}", file=sys.stderr)
+        return 1
+    for source, error in response["errors"].items():
+        print(f"error: {source}: {error}", file=sys.stderr)
+    broken = _check_site(args, LinkIndex.from_dict(response["links"]))
+    print(response["summary"])
+    return 1 if response["errors"] or broken else 0
+
+
+def _daemon(args: argparse.Namespace) -> int:
+    def announce(daemon: BuildDaemon) -> None:
+        print(f"Build daemon listening on {daemon.socket_path}", flush=True)
+
+    try:
+        asyncio.run(run_daemon(args.socket, on_start=announce))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _check_site(args: argparse.Namespace, index: LinkIndex) -> list[LinkRecord]:
+    if args.copy_assets:
+        copied = copy_assets(index, args.content, args.output)
+        print(f"{len(copied)} assets copied")
+    broken = []
+    if args.check_links:
+        broken = find_broken_links(index, args.content, args.output)
+        for record in broken:
+            print(
+                f"error: {record.source}:{record.line}: broken {record.kind} {record.url}",
+                file=sys.stderr,
+            )
+    return broken
+
+
+def _merge(args: argparse.Namespace) -> int:
+    if (args.check_links or args.copy_assets) and args.content is None:
+        print("error: --check-links and --copy-assets need --content", file=sys.stderr)
+        return 2
+    try:
+        manifest = merge_shards(
+            args.shards,
+            args.output,
+            manifest_path=args.manifest,
+            content_dir=args.content,
+        )
+    except ShardMergeError as exc:
+        for problem in str(exc).splitlines():
+            print(f"error: {problem}", file=sys.stderr)
+        return 1
+    broken = _check_site(args, manifest.links)
+    print(f"{len(manifest.pages)} pages merged from {len(args.shards)} shards")
+    return 1 if broken else 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    def announce(server: DevServer) -> None:
+        print(
+            f"Serving {args.content} on http://{args.host}:{server.port}/", flush=True
+        )
+
+    try:
+        asyncio.run(
+            serve(
+                content_dir=args.content,
+                template_path=args.template,
+                host=args.host,
+                port=args.port,
+                cache_bytes=args.cache_size * 1024 * 1024,
+                poll_interval=args.poll_interval if args.poll_interval > 0 else None,
+                on_start=announce,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="repytile", description="Static site generator for Markdown documents."
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser(
+        "build", help="Render a content directory into HTML pages."
+    )
+    build.add_argument("content", type=Path, help="Directory of Markdown sources.")
+    build.add_argument("output", type=Path, help="Directory for the rendered pages.")
+    build.add_argument(
+        "--template", type=Path, required=True, help="HTML page template."
+    )
+    build.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="Build manifest path, defaults to a file inside the output directory.",
+    )
+    build.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes rendering pages, 0 uses every CPU.",
+    )
+    build.add_argument(
+        "--no-ast-cache",
+        action="store_true",
+        help="Parse every rendered page instead of reusing cached parsed documents.",
+    )
+    build.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Also write a gzip compressed copy of each page, for precompressed serving.",
+    )
+    build.add_argument(
+        "--gzip-min-size",
+        type=int,
+        default=COMPRESS_MIN_SIZE,
+        help="Size in bytes from which pages are compressed by --gzip.",
+    )
+    build.add_argument(
+        "--shard",
+        type=_shard,
+        default=None,
+        metavar="NUMBER/COUNT",
+        help="Only build the pages of this shard, such as 2/4. Shards are combined, and "
+        "their links checked, by the merge command.",
+    )
+    build.add_argument(
+        "--check-links",
+        action="store_true",
+        help="Fail when links or images point to missing pages or files of the site. "
+        "Not supported with --shard.",
+    )
+    build.add_argument(
+        "--copy-assets",
+        action="store_true",
+        help="Copy the images referenced by the pages into the output directory.",
+    )
+    build.add_argument(
+        "--daemon",
+        type=Path,
+        default=None,
+        metavar="SOCKET",
+        help="Have the build daemon listening on this socket build the site, with its caches.",
+    )
+    build.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report the time spent per stage and the slowest documents.",
+    )
+    build.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="Number of slowest documents listed by --profile.",
+    )
+    build.set_defaults(handler=_build)
+
+    merge = commands.add_parser(
+        "merge", help="Combine the output directories of a sharded build."
+    )
+    merge.add_argument("output", type=Path, help="Directory for the merged pages.")
+    merge.add_argument(
+        "shards", type=Path, nargs="+", help="Output directories of every shard."
+    )
+    merge.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="Merged manifest path, defaults to a file inside the output directory.",
+    )
+    merge.add_argument(
+        "--content",
+        type=Path,
+        default=None,
+        help="Directory of Markdown sources, to check that every page was built.",
+    )
+    merge.add_argument(
+        "--check-links",
+        action="store_true",
+        help="Fail when links or images point to missing pages or files of the site.",
+    )
+    merge.add_argument(
+        "--copy-assets",
+        action="store_true",
+        help="Copy the images referenced by the pages into the output directory.",
+    )
+    merge.set_defaults(handler=_merge)
+
+    daemon = commands.add_parser(
+        "daemon",
+        help="Build sites on request, keeping caches warm between builds.",
+    )
+    daemon.add_argument("socket", type=Path, help="Unix socket to listen on.")
+    daemon.set_defaults(handler=_daemon)
+
+    serve_command = commands.add_parser(
+        "serve", help="Serve a content directory, rendering pages on demand."
+    )
+    serve_command.add_argument(
+        "content", type=Path, help="Directory of Markdown sources."
+    )
+    serve_command.add_argument(
+        "--template", type=Path, required=True, help="HTML page template."
+    )
+    serve_command.add_argument("--host", default="127.0.0.1")
+    serve_command.add_argument("--port", type=int, default=8000)
+    serve_command.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+        help="Size of the in-memory page cache, in MiB.",
+    )
+    serve_command.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between two checks for changed files, 0 disables watching.",
+    )
+    serve_command.set_defaults(handler=_serve)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = make_parser().parse_args(argv)
+    return args.handler(args)
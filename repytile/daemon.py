@@ -0,0 +1,208 @@
+import asyncio
+import gc
+import json
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from repytile.site_builder import (
+    COMPRESS_MIN_SIZE,
+    BuildReport,
+    BuildState,
+    Shard,
+    build_site,
+)
+
+# Requests and responses are single JSON lines, larger ones are rejected
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+# Builds between two full collections of the objects frozen after each build
+FULL_COLLECTION_BUILDS = 50
+
+
+class BuildDaemon:
+    def __init__(self, socket_path: Union[str, Path]) -> None:
+        """
+        Initialize a BuildDaemon object, building sites on request from a local Unix socket.
+
+        Parameters:
+            socket_path (Union[str, Path]): The path of the socket to listen on.
+
+        The daemon keeps a BuildState per content and output directory, so its parsed template,
+        the content hashes of the sources, the manifest, the LeafNodePool and the parsed pages stay
+        warm between builds, and a build only reads, parses and renders what changed since the
+        previous request. Builds run one at a time on a dedicated thread, in the daemon process.
+        """
+        self.socket_path = Path(socket_path)
+        self.builds = 0
+        self._states: dict[tuple[Path, Path], BuildState] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """
+        Starts listening, replacing a socket file left by a daemon that did not stop cleanly.
+        """
+        self.socket_path.unlink(missing_ok=True)
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_unix_server(
+            self._handle, self.socket_path, limit=MAX_MESSAGE_BYTES
+        )
+
+    async def serve_forever(self) -> None:
+        """
+        Serves requests until a 'stop' request is received.
+        """
+        if self._server is None or self._stopped is None:
+            raise RuntimeError("The daemon is not started")
+        await self._stopped.wait()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            self.socket_path.unlink(missing_ok=True)
+        self._executor.shutdown(wait=False)
+
+    def state_for(self, content_dir: Path, output_dir: Path) -> BuildState:
+        key = (content_dir, output_dir)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = BuildState()
+        return state
+
+    def build(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Builds a site with the warm state of its directories.
+
+        Arguments:
+            request (dict[str, Any]): The arguments of ``build_site``, with paths as strings and
+                the shard as 'number/count'. Relative paths are resolved against the directory
+                of the daemon, clients send absolute ones.
+
+        Returns:
+            dict[str, Any]: The report of the build, see ``report_to_dict``.
+        """
+        content_dir = Path(request["content"])
+        output_dir = Path(request["output"])
+        shard = request.get("shard")
+        report = build_site(
+            content_dir=content_dir,
+            output_dir=output_dir,
+            template_path=Path(request["template"]),
+            manifest_path=_optional_path(request.get("manifest")),
+            use_ast_cache=request.get("use_ast_cache", True),
+            compress=request.get("compress", False),
+            compress_min_size=request.get("compress_min_size", COMPRESS_MIN_SIZE),
+            shard=Shard.parse(shard) if shard is not None else None,
+            state=self.state_for(content_dir, output_dir),
+        )
+        self.builds += 1
+        self._freeze_heap()
+        return report_to_dict(report)
+
+    def _freeze_heap(self) -> None:
+        # The warm caches hold millions of objects, and the cyclic collector would scan all of
+        # them again during builds. Frozen objects are skipped. The garbage of the build is
+        # collected before freezing, so it is not kept frozen, and the frozen objects dropped by
+        # later builds are collected periodically.
+        if self.builds % FULL_COLLECTION_BUILDS == 0:
+            gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            response = await self._respond(reader)
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, reader: asyncio.StreamReader) -> dict[str, Any]:
+        try:
+            request = json.loads(await reader.readuntil(b"\n"))
+        except (asyncio.LimitOverrunError, ValueError) as exc:
+            return {"error": f"Invalid request: {exc}"}
+        command = request.get("command") if isinstance(request, dict) else None
+        if command == "stop":
+            self._stopped.set()  # type: ignore[union-attr]
+            return {"stopped": True}
+        if command != "build":
+            return {"error": f"Unknown command {command!r}"}
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self.build, request)
+        except Exception as exc:
+            return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+def report_to_dict(report: BuildReport) -> dict[str, Any]:
+    return {
+        "rendered": report.rendered,
+        "skipped": report.skipped,
+        "errors": report.errors,
+        "summary": report.summary(),
+        "links": report.links.to_dict(),
+    }
+
+
+def _optional_path(path: Optional[str]) -> Optional[Path]:
+    return Path(path) if path is not None else None
+
+
+def send_request(
+    socket_path: Union[str, Path],
+    request: dict[str, Any],
+    timeout: Optional[float] = None,
+) -> dict[str, Any]:
+    """
+    Sends a request to a running BuildDaemon and waits for its response.
+
+    Arguments:
+        socket_path (Union[str, Path]): The socket the daemon listens on.
+        request (dict[str, Any]): The request, with a 'command' of 'build' or 'stop'.
+        timeout (Optional[float]): Seconds to wait for the response, None waits for the build.
+
+    Returns:
+        dict[str, Any]: The response, holding an 'error' key if the request failed.
+
+    Raises:
+        OSError: If the daemon is not running or the connection is lost.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path))
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as response:
+            line = response.readline()
+    if not line:
+        raise ConnectionError("The daemon closed the connection without responding")
+    return json.loads(line)
+
+
+async def run_daemon(
+    socket_path: Union[str, Path],
+    on_start: Optional[Callable[[BuildDaemon], None]] = None,
+) -> None:
+    """
+    Runs a BuildDaemon until it receives a 'stop' request or the task is cancelled.
+
+    Arguments:
+        socket_path (Union[str, Path]): The path of the socket to listen on.
+        on_start (Optional[Callable[[BuildDaemon], None]]): Called once the daemon listens.
+    """
+    daemon = BuildDaemon(socket_path)
+    await daemon.start()
+    try:
+        if on_start is not None:
+            on_start(daemon)
+        await daemon.serve_forever()
+    finally:
+        await daemon.close()
@@ -0,0 +1,235 @@
+from bisect import bisect_left
+from typing import Iterator, Optional
+
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.block_parser import (
+    MarkdownBlock,
+    block_to_html_node,
+    iter_blocks,
+    split_lines,
+)
+from repytile.helpers import LeafNodePool
+
+
+def _block_key(block: MarkdownBlock) -> int:
+    return hash((block.block_type, *block.lines))
+
+
+class Document:
+    """
+    Document keeps a parsed Markdown document and updates it incrementally as its text is edited.
+
+    The document remembers the boundaries of its blocks, a hash of their source and the ParentNode
+    built for each of them. An edit only re-splits the lines around the edited range, stops as soon
+    as the blocks line up with the previous ones again, and only re-parses the blocks whose text
+    changed. Rendered HTML is cached per block, so re-rendering after an edit only renders the new
+    blocks.
+    """
+
+    __slots__ = (
+        "_lines",
+        "_final_line_break",
+        "_blocks",
+        "_keys",
+        "_nodes",
+        "_root",
+        "pool",
+    )
+
+    def __init__(self, source: str = "", pool: Optional[LeafNodePool] = None) -> None:
+        """
+        Initialize a Document object by parsing the whole source once.
+
+        Parameters:
+            source (str): The Markdown text.
+            pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+        """
+        self.pool = pool
+        self._lines: list[str] = []
+        # Whether the text ends with a line break, which its lines do not keep
+        self._final_line_break = False
+        self._blocks: list[MarkdownBlock] = []
+        self._keys: list[int] = []
+        self._nodes: list[HTMLNode] = []
+        self._root = ParentNode(tag="div", children=[LeafNode(value="")])
+        self.update(source)
+
+    @property
+    def source(self) -> str:
+        """
+        The current Markdown text, lines being joined with "\\n". A line break ending the text
+        is kept, and one follows a blank last line, so parsing the source again gives the same
+        lines.
+        """
+        lines = self._lines
+        if not lines:
+            return ""
+        final_line_break = self._final_line_break or not lines[-1]
+        return "\n".join(lines) + ("\n" if final_line_break else "")
+
+    @property
+    def lines(self) -> list[str]:
+        return list(self._lines)
+
+    @property
+    def root(self) -> ParentNode:
+        """
+        The <div> node holding one child per block, as built by ``markdown_to_html_node``.
+        """
+        return self._root
+
+    @property
+    def blocks(self) -> list[MarkdownBlock]:
+        return list(self._blocks)
+
+    @property
+    def nodes(self) -> list[HTMLNode]:
+        """
+        The node of each block, in the same order as ``blocks``.
+        """
+        return list(self._nodes)
+
+    def update(self, source: str) -> list[int]:
+        """
+        Replaces the whole text of the document, re-parsing only what changed.
+
+        The edited range is found by skipping the lines shared by the old and new text at their
+        start and at their end, so a whole-buffer update costs one comparison per line on top of
+        the work done by ``edit``.
+
+        Parameters:
+            source (str): The new Markdown text.
+
+        Returns:
+            list[int]: The indices of the blocks that were re-parsed, in the new list of blocks.
+        """
+        self._final_line_break = source.endswith("\n")
+        old = self._lines
+        new = split_lines(source)
+        limit = min(len(old), len(new))
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+            suffix += 1
+        return self._replace_lines(
+            prefix, len(old) - suffix, new[prefix : len(new) - suffix]
+        )
+
+    def edit(self, start: int, end: int, text: str) -> list[int]:
+        """
+        Replaces a range of lines of the document.
+
+        Parameters:
+            start (int): The 0-based index of the first replaced line.
+            end (int): The index after the last replaced line, ``start`` to only insert lines.
+            text (str): The text of the replacement lines, empty to only delete lines. When the
+                lines run to the end of the document, whether the text ends with a line break
+                decides whether the document does.
+
+        Returns:
+            list[int]: The indices of the blocks that were re-parsed, in the new list of blocks.
+
+        Raises:
+            IndexError: If the range is not within the document.
+        """
+        if not 0 <= start <= end <= len(self._lines):
+            raise IndexError(
+                f"Line range {start}:{end} is out of a document of {len(self._lines)} lines"
+            )
+        if text and end == len(self._lines):
+            self._final_line_break = text.endswith("\n")
+        return self._replace_lines(start, end, split_lines(text))
+
+    def _replace_lines(self, start: int, end: int, new_lines: list[str]) -> list[int]:
+        delta = len(new_lines) - (end - start)
+        self._lines[start:end] = new_lines
+        if delta == 0 and not new_lines:
+            return []
+
+        # Splitting restarts at the last block starting before the edit, which the edited lines
+        # can extend. Any block start is a clean state for the splitter.
+        first = bisect_left(
+            self._blocks, start, key=lambda block: block.line_number - 1
+        )
+        restart_index = max(first - 1, 0)
+        restart_line = self._blocks[restart_index].line_number - 1 if first > 0 else 0
+
+        new_blocks: list[MarkdownBlock] = []
+        old_index = restart_index
+        for block in iter_blocks(self._iter_lines(restart_line)):
+            block.line_number += restart_line
+            block_start = block.line_number - 1
+            # Only old blocks starting after the edited lines can line up with the new ones,
+            # they are compared at their position after the edit
+            while old_index < len(self._blocks):
+                old_start = self._blocks[old_index].line_number - 1
+                if old_start >= end and old_start + delta >= block_start:
+                    break
+                old_index += 1
+            if (
+                old_index < len(self._blocks)
+                and self._blocks[old_index].line_number - 1 + delta == block_start
+                and self._same_block(old_index, block)
+            ):
+                break
+            new_blocks.append(block)
+        else:
+            old_index = len(self._blocks)
+
+        for block in self._blocks[old_index:]:
+            block.line_number += delta
+        return self._splice(restart_index, old_index, new_blocks)
+
+    def _iter_lines(self, start: int) -> Iterator[str]:
+        lines = self._lines
+        for index in range(start, len(lines)):
+            yield lines[index]
+
+    def _same_block(self, index: int, block: MarkdownBlock) -> bool:
+        old = self._blocks[index]
+        return (
+            self._keys[index] == _block_key(block)
+            and old.block_type == block.block_type
+            and old.lines == block.lines
+        )
+
+    def _splice(self, start: int, stop: int, blocks: list[MarkdownBlock]) -> list[int]:
+        # Blocks that only moved, such as the restart block, keep their node and cached HTML
+        reusable: dict[int, list[int]] = {}
+        for index in range(start, stop):
+            reusable.setdefault(self._keys[index], []).append(index)
+
+        keys = []
+        nodes = []
+        reparsed = []
+        for offset, block in enumerate(blocks):
+            key = _block_key(block)
+            candidates = reusable.get(key)
+            while candidates and self._blocks[candidates[0]].lines != block.lines:
+                candidates.pop(0)
+            if candidates:
+                nodes.append(self._nodes[candidates.pop(0)])
+            else:
+                nodes.append(block_to_html_node(block, self.pool))
+                reparsed.append(start + offset)
+            keys.append(key)
+
+        self._blocks[start:stop] = blocks
+        self._keys[start:stop] = keys
+        self._nodes[start:stop] = nodes
+        self._root.children = self._nodes or [LeafNode(value="")]
+        return reparsed
+
+    def to_html(self) -> str:
+        """
+        Renders the document, reusing the cached HTML of every block that did not change.
+
+        Returns:
+            str: The HTML of the document, the same as ``markdown_to_html_node(source).to_html()``.
+        """
+        return self._root.to_html()
+
+    def __repr__(self) -> str:
+        return f"Document(lines={len(self._lines)}, blocks={len(self._blocks)})"
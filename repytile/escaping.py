@@ -0,0 +1,61 @@
+class Markup(str):
+    """
+    Markup marks a string as trusted HTML, which is inserted as it is instead of being escaped.
+
+    Example:
+        >>> LeafNode("svg", Markup("<circle />")).to_html()
+        '<svg><circle /></svg>'
+    """
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return f"Markup({str.__repr__(self)})"
+
+
+def escape_text(value: str) -> str:
+    """
+    Escapes a string for use as the text content of an HTML element.
+
+    Only '&', '<' and '>' are replaced. Strings without any of them, the vast majority of the text
+    of a page, are returned as they are after three ``in`` scans, which run at memchr speed and
+    allocate nothing. Markup strings are never escaped.
+
+    Arguments:
+        value (str): The text to escape.
+
+    Returns:
+        str: The escaped text.
+    """
+    if value.__class__ is Markup:
+        return value
+    if "&" in value or "<" in value or ">" in value:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return value
+
+
+def escape_attribute(value: object) -> str:
+    """
+    Escapes a value for use as a double quoted HTML attribute value.
+
+    Same as ``escape_text``, double quotes being replaced too. Values that are not strings, such
+    as numbers, are converted with ``str`` first.
+
+    Arguments:
+        value (object): The attribute value to escape.
+
+    Returns:
+        str: The escaped value.
+    """
+    if not isinstance(value, str):
+        value = f"{value}"
+    elif value.__class__ is Markup:
+        return value
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return (
+            value.replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace('"', "&quot;")
+        )
+    return value
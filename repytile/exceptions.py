@@ -1,2 +1,10 @@
 class InvalidElementType(Exception):
     pass
+
+
+class InvalidCacheFile(Exception):
+    pass
+
+
+class ShardMergeError(Exception):
+    pass
@@ -1,5 +1,9 @@
 import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Optional, Sequence
 
+from repytile import links
 from repytile.block_elements import HTMLNode, LeafNode
 from repytile.exceptions import InvalidElementType
 from repytile.inline_elements import TextNode
@@ -14,22 +18,173 @@ TAG_MAPPING = {
 }
 
 
-def text_node_to_html_node(tn: TextNode) -> LeafNode:
+def _build_text(tn: TextNode) -> LeafNode:
+    return LeafNode(value=tn.text)
+
+
+def _build_bold(tn: TextNode) -> LeafNode:
+    return LeafNode(tag="b", value=tn.text, props={})
+
+
+def _build_italic(tn: TextNode) -> LeafNode:
+    return LeafNode(tag="i", value=tn.text, props={})
+
+
+def _build_code(tn: TextNode) -> LeafNode:
+    return LeafNode(tag="code", value=tn.text, props={})
+
+
+def _build_link(tn: TextNode) -> LeafNode:
+    return LeafNode(tag="a", value=tn.text, props={"href": tn.url})  # type: ignore[dict-item]
+
+
+def _build_image(tn: TextNode) -> LeafNode:
+    return LeafNode(
+        tag="img", value=tn.text, props={"src": tn.url, "alt": tn.text}  # type: ignore[dict-item]
+    )
+
+
+# Maps every convertible text_type to the function building its LeafNode
+NODE_BUILDERS: dict[str, Callable[[TextNode], LeafNode]] = {
+    "text": _build_text,
+    "bold": _build_bold,
+    "italic": _build_italic,
+    "code": _build_code,
+    "link": _build_link,
+    "image": _build_image,
+}
+
+
+class LeafNodePool:
+    def __init__(self, maxsize: int = 4096) -> None:
+        """
+        Initialize a LeafNodePool object, a bounded cache sharing the LeafNode of identical TextNodes.
+
+        Parameters:
+            maxsize (int): The maximum number of LeafNodes kept in the pool. When it is full,
+                the least recently used node is evicted.
+
+        Pooled LeafNodes, and their props, are shared by every tree they were handed to. They are
+        marked with ``HTMLNode.share``, which makes them read-only, and their HTML is rendered once
+        when they enter the pool.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize should be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._nodes: OrderedDict[tuple[str, str, Optional[str]], LeafNode] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, tn: TextNode, build: Callable[[TextNode], LeafNode]) -> LeafNode:
+        """
+        Returns the pooled LeafNode of a TextNode, building and pooling it on a miss.
+
+        Arguments:
+            tn (TextNode): The TextNode to convert.
+            build (Callable[[TextNode], LeafNode]): Builds the LeafNode on a miss.
+
+        Returns:
+            LeafNode: The shared LeafNode.
+        """
+        # Keying by the fields rather than the TextNode keeps hashing and comparisons in C
+        key = (tn.text, tn.text_type, tn.url)
+        nodes = self._nodes
+        node = nodes.get(key)
+        if node is not None:
+            self.hits += 1
+            nodes.move_to_end(key)
+            return node
+        self.misses += 1
+        node = build(tn)
+        node.to_html()
+        node.share()
+        nodes[key] = node
+        if len(nodes) > self.maxsize:
+            nodes.popitem(last=False)
+            self.evictions += 1
+        return node
+
+    def get_many(
+        self,
+        text_nodes: Sequence[TextNode],
+        builds: Sequence[Callable[[TextNode], LeafNode]],
+    ) -> list[LeafNode]:
+        """
+        Same as calling ``get`` for every TextNode, with the lookups done in a single loop.
+
+        Arguments:
+            text_nodes (Sequence[TextNode]): The TextNodes to convert.
+            builds (Sequence[Callable[[TextNode], LeafNode]]): The builder of each TextNode.
+
+        Returns:
+            list[LeafNode]: The shared LeafNodes, in the same order.
+        """
+        nodes = self._nodes
+        lookup = nodes.get
+        move_to_end = nodes.move_to_end
+        maxsize = self.maxsize
+        result = []
+        misses = 0
+        for tn, build in zip(text_nodes, builds):
+            key = (tn.text, tn.text_type, tn.url)
+            node = lookup(key)
+            if node is None:
+                misses += 1
+                node = build(tn)
+                node.to_html()
+                node.share()
+                nodes[key] = node
+                if len(nodes) > maxsize:
+                    nodes.popitem(last=False)
+                    self.evictions += 1
+            else:
+                move_to_end(key)
+            result.append(node)
+        self.misses += misses
+        self.hits += len(result) - misses
+        return result
+
+    def clear(self) -> None:
+        self._nodes.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"LeafNodePool(size={len(self)}/{self.maxsize}, hits={self.hits}, "
+            f"misses={self.misses}, evictions={self.evictions})"
+        )
+
+
+def text_node_to_html_node(
+    tn: TextNode, pool: Optional[LeafNodePool] = None
+) -> LeafNode:
     """
     Converts a TextNode object to a LeafNode object for HTML representation.
 
     Arguments:
         tn (TextNode): The TextNode object to be converted.
+        pool (Optional[LeafNodePool]): If provided, identical TextNodes share a single LeafNode
+            taken from this pool instead of allocating a new one on every call.
 
     Returns:
         LeafNode: The converted LeafNode object for HTML representation.
 
     Raises:
-        InvalidElementType: If the text_type of the TextNode is not in the ALLOWED_TYPES list.
+        InvalidElementType: If the text_type of the TextNode is not in the NODE_BUILDERS table.
 
-    The function checks if the text_type of the TextNode is allowed for conversion. If it is not in the ALLOWED_TYPES
-    tuple, it raises an InvalidElementType exception. Otherwise, it converts the TextNode to a LeafNode object with
-    appropriate tag and properties for HTML representation.
+    The function looks up the builder of the text_type of the TextNode. If there is none,
+    it raises an InvalidElementType exception. Otherwise, it converts the TextNode to a LeafNode
+    object with appropriate tag and properties for HTML representation.
 
     The mapping of text_type to HTML tag is as follows:
     - "text": No tag, just the text value
@@ -38,24 +193,70 @@ def text_node_to_html_node(tn: TextNode) -> LeafNode:
     - "code": <code> tag
     - "link": <a> tag with href property
     - "image": <img> tag with src and alt properties
-    """
 
-    if tn.text_type not in TAG_MAPPING and tn.text_type != "text":
+    While a LinkIndex is enabled, the URL of links and images is recorded into it.
+    """
+    build = NODE_BUILDERS.get(tn.text_type)
+    if build is None:
         raise InvalidElementType(
             f"The type of TextNode {tn.text_type} is not allowed for conversion"
         )
-    if tn.text_type == "text":
-        return LeafNode(value=tn.text)
+    index = links.active()
+    if index is not None:
+        index.record_nodes((tn,))
+    if pool is None:
+        return build(tn)
+    return pool.get(tn, build)
+
+
+def text_nodes_to_html_nodes(
+    text_nodes: Sequence[TextNode], pool: Optional[LeafNodePool] = None
+) -> list[LeafNode]:
+    """
+    Converts a list of TextNode objects to LeafNode objects in one call.
+
+    The whole list is validated before any node is built, and the builder lookups, the pool
+    lookups and the result allocation are done in tight loops rather than once per call.
+
+    Arguments:
+        text_nodes (Sequence[TextNode]): The TextNode objects to be converted.
+        pool (Optional[LeafNodePool]): If provided, identical TextNodes share a single LeafNode
+            taken from this pool.
+
+    Returns:
+        list[LeafNode]: The converted LeafNode objects, in the same order as the TextNodes.
+
+    Raises:
+        InvalidElementType: If the text_type of a TextNode is not in the NODE_BUILDERS table.
+            The message reports the index of the first invalid TextNode and the node itself.
+
+    While a LinkIndex is enabled, the URL of links and images is recorded into it.
+    """
+    lookup = NODE_BUILDERS.get
+    builds = [lookup(tn.text_type) for tn in text_nodes]  # type: ignore[arg-type]
+    if None in builds:
+        index = builds.index(None)
+        tn = text_nodes[index]
+        raise InvalidElementType(
+            f"The type of TextNode {tn.text_type} at index {index} is not allowed for "
+            f"conversion: {tn!r}"
+        )
+    link_index = links.active()
+    if link_index is not None:
+        link_index.record_nodes(text_nodes)
+    if pool is not None:
+        return pool.get_many(text_nodes, builds)  # type: ignore[arg-type]
+    return [build(tn) for build, tn in zip(builds, text_nodes)]  # type: ignore[misc]
 
-    tag = TAG_MAPPING[tn.text_type]
-    props = {}
-    if tn.text_type == "link":
-        props["href"] = tn.url
-    elif tn.text_type == "image":
-        props["src"] = tn.url
-        props["alt"] = tn.text
 
-    return LeafNode(tag=tag, value=tn.text, props=props)
+@lru_cache(maxsize=None)
+def _split_keep_pattern(sep: str) -> re.Pattern[str]:
+    # Compiled once per separator, a long-running process splits with the same few separators
+    # Escape any special characters on separator
+    sep = re.escape(sep)
+    # Define the regex for extraction, format is sep(words)sep, as separators always should appear in pairs
+    # We use parenthesis to keep the separator as part of the capturing group
+    return re.compile(rf"({sep}[^*]+{sep})")
 
 
 def _split_keep(input_str: str, sep: str) -> list[str]:
@@ -74,13 +275,8 @@ def _split_keep(input_str: str, sep: str) -> list[str]:
         >>> _split_keep("apple,orange,banana", ",")
         ['apple', ',orange,', 'banana']
     """
-    # Escape any special characters on separator
-    sep = re.escape(sep)
-    # Define the regex for extraction, format is sep(words)sep, as separators always should appear in pairs
-    # We use parenthesis to keep the separator as part of the capturing group
-    expr = rf"({sep}[^*]+{sep})"
     # split the input string into parts using the separator
-    result = re.split(expr, input_str)
+    result = _split_keep_pattern(sep).split(input_str)
     # remove any empty strings
     result = [split_part for split_part in result if split_part]
     return result
@@ -101,3 +297,155 @@ def split_nodes_delimiter(
             )
 
     return resulting_nodes
+
+
+# Every character that may start an inline element, used to jump over plain text
+_INLINE_MARKERS = re.compile(r"[*`!\[]")
+
+
+class _MemoFind:
+    """
+    Memoizes ``str.find`` lookups over a single string.
+
+    The scanner only ever moves forward, so the leftmost occurrence of a token found from
+    position ``p`` is still the answer for any later start up to that occurrence (or for
+    every later start when nothing was found). Reusing those answers means each token kind
+    scans every character at most once, which keeps the whole tokenization linear even on
+    long runs of unmatched delimiters.
+    """
+
+    __slots__ = ("_text", "_cache")
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+        self._cache: dict[str, int] = {}
+
+    def find(self, token: str, start: int) -> int:
+        found = self._cache.get(token)
+        if found is not None and (found == -1 or found >= start):
+            return found
+        found = self._text.find(token, start)
+        self._cache[token] = found
+        return found
+
+
+def text_to_textnodes(text: str) -> list[TextNode]:
+    """
+    Splits raw Markdown text into bold, italic, code, link, image and text nodes in a single pass.
+
+    Arguments:
+        text (str): The raw inline Markdown text.
+
+    Returns:
+        list[TextNode]: The resulting nodes, in order. Adjacent plain text is merged into a
+                        single "text" node and delimiters without a matching closing
+                        delimiter are kept as plain text.
+
+    The scanner walks the text from left to right and never backtracks: every closing
+    delimiter lookup is memoized, so the worst case is O(n) even for adversarial input such
+    as long runs of unmatched ``*`` or backticks. Elements are not nested, the content of an
+    element is kept verbatim.
+
+    Example:
+        >>> text_to_textnodes("This is **bold** and `code`")
+        [TextNode(This is , text, None), TextNode(bold, bold, None), TextNode( and , text, None), TextNode(code, code, None)]
+    """
+    nodes: list[TextNode] = []
+    finder = _MemoFind(text)
+    # Start of the plain text run that has not been emitted yet
+    pending = 0
+    pos = 0
+    length = len(text)
+
+    def flush(end: int) -> None:
+        if end > pending:
+            nodes.append(TextNode(text[pending:end], "text"))
+
+    while pos < length:
+        marker = _INLINE_MARKERS.search(text, pos)
+        if marker is None:
+            break
+        pos = marker.start()
+        char = text[pos]
+
+        if char == "*" and text.startswith("**", pos):
+            close = finder.find("**", pos + 2)
+            if close > pos + 2:
+                flush(pos)
+                nodes.append(TextNode(text[pos + 2 : close], "bold"))
+                pos = pending = close + 2
+                continue
+
+        if char == "*" or char == "`":
+            close = finder.find(char, pos + 1)
+            if close > pos + 1:
+                flush(pos)
+                text_type = "italic" if char == "*" else "code"
+                nodes.append(TextNode(text[pos + 1 : close], text_type))
+                pos = pending = close + 1
+                continue
+            pos += 1
+            continue
+
+        # Links are [text](url) and images are ![alt](url)
+        is_image = char == "!"
+        bracket = pos + 1 if is_image else pos
+        if is_image and not text.startswith("[", bracket):
+            pos += 1
+            continue
+        close_bracket = finder.find("]", bracket + 1)
+        if close_bracket == -1 or not text.startswith("(", close_bracket + 1):
+            pos = bracket + 1
+            continue
+        close_paren = finder.find(")", close_bracket + 2)
+        if close_paren == -1:
+            pos = bracket + 1
+            continue
+        flush(pos)
+        nodes.append(
+            TextNode(
+                text[bracket + 1 : close_bracket],
+                "image" if is_image else "link",
+                text[close_bracket + 2 : close_paren],
+            )
+        )
+        pos = pending = close_paren + 1
+
+    flush(length)
+    return nodes
+
+
+def split_nodes_inline(
+    old_nodes: list[TextNode | HTMLNode],
+) -> list[TextNode | HTMLNode]:
+    """
+    Splits every "text" TextNode into its inline elements using ``text_to_textnodes``.
+
+    This replaces running ``split_nodes_delimiter`` once per delimiter followed by the link and
+    image passes: each text node is scanned exactly once.
+
+    Arguments:
+        old_nodes (list[TextNode | HTMLNode]): The nodes to process.
+
+    Returns:
+        list[TextNode | HTMLNode]: The processed nodes. Nodes that are not TextNodes, or TextNodes
+                                   that are already typed, are kept as they are.
+
+    Raises:
+        InvalidElementType: If a TextNode has a type that cannot be processed.
+    """
+    resulting_nodes: list[TextNode | HTMLNode] = []
+    for node in old_nodes:
+        if not isinstance(node, TextNode):
+            resulting_nodes.append(node)
+            continue
+        if node.text_type != "text" and node.text_type not in TAG_MAPPING:
+            raise InvalidElementType(
+                f"The type of TextNode {node.text_type} is not processable."
+            )
+        if node.text_type != "text":
+            resulting_nodes.append(node)
+            continue
+        resulting_nodes.extend(text_to_textnodes(node.text))
+
+    return resulting_nodes
@@ -4,6 +4,8 @@ from repytile.exceptions import InvalidElementType
 
 
 class TextNode:
+    __slots__ = ("_text", "_text_type", "_url")
+
     def __init__(self, text: str, text_type: str, url: Optional[str] = None) -> None:
         """
         Initialize a TextNode object with the given text, text type, and optional URL.
@@ -18,12 +20,27 @@ class TextNode:
 
         Returns:
             None
+
+        TextNode objects are immutable and hashable, so identical nodes can be used as dictionary
+        keys, for instance to share their converted LeafNode.
         """
         if not text_type:
             raise InvalidElementType("text_type cannot be None")
-        self.text = text
-        self.text_type = text_type
-        self.url = url
+        self._text = text
+        self._text_type = text_type
+        self._url = url
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def text_type(self) -> str:
+        return self._text_type
+
+    @property
+    def url(self) -> Optional[str]:
+        return self._url
 
     def __eq__(self, __value: object) -> bool:
         """
@@ -43,6 +60,9 @@ class TextNode:
             and self.url == __value.url
         )
 
+    def __hash__(self) -> int:
+        return hash((self._text, self._text_type, self._url))
+
     def __repr__(self) -> str:
         """
         Returns a string representation of the TextNode object.
@@ -0,0 +1,306 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from repytile.block_elements import HTMLNode
+
+# Stages of the pipeline, in the order a page goes through them
+STAGES = ("io", "block_split", "inline_split", "convert", "render")
+
+# Hooks are called with the stage name, the current document (if any) and the elapsed nanoseconds
+StageHook = Callable[[str, Optional[str], int], None]
+
+T = TypeVar("T")
+
+_active: Optional["Instrumentation"] = None
+
+
+class DocumentProfile:
+    __slots__ = ("name", "stage_ns", "node_count")
+
+    def __init__(self, name: str) -> None:
+        """
+        Initialize a DocumentProfile object, the time spent in each stage for one document.
+
+        Parameters:
+            name (str): The name of the document, usually its source path.
+        """
+        self.name = name
+        self.stage_ns: dict[str, int] = {}
+        self.node_count = 0
+
+    @property
+    def total_ns(self) -> int:
+        return sum(self.stage_ns.values())
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "stage_ns": dict(self.stage_ns),
+            "node_count": self.node_count,
+        }
+
+
+class Instrumentation:
+    def __init__(self) -> None:
+        """
+        Initialize an empty Instrumentation object collecting timers, counters and node counts.
+
+        Instrumentation is opt-in: probes in the pipeline only do work while an Instrumentation
+        object is enabled through ``enable``, otherwise they cost a single global lookup.
+        """
+        self.stage_ns: dict[str, int] = {}
+        self.stage_calls: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+        self.documents: dict[str, DocumentProfile] = {}
+        # Number of documents per power of two bucket of their node count
+        self.node_histogram: dict[int, int] = {}
+        self.current_document: Optional[DocumentProfile] = None
+        self._hooks: list[StageHook] = []
+
+    def add_hook(self, hook: StageHook) -> None:
+        """
+        Registers a callable invoked every time a stage duration is recorded,
+        for instance to forward the measurements to a metrics system.
+
+        Parameters:
+            hook (StageHook): Called with the stage name, the document name or None,
+                and the elapsed time in nanoseconds.
+        """
+        self._hooks.append(hook)
+
+    def record(self, stage: str, elapsed_ns: int) -> None:
+        """
+        Records time spent in a stage, for the current document if there is one.
+
+        Parameters:
+            stage (str): The stage name, see STAGES.
+            elapsed_ns (int): The elapsed time in nanoseconds.
+        """
+        self.stage_ns[stage] = self.stage_ns.get(stage, 0) + elapsed_ns
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+        document = self.current_document
+        if document is not None:
+            document.stage_ns[stage] = document.stage_ns.get(stage, 0) + elapsed_ns
+        for hook in self._hooks:
+            hook(stage, document.name if document else None, elapsed_ns)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_nodes(self, count: int) -> None:
+        """
+        Records the number of nodes in the tree of the current document.
+
+        Parameters:
+            count (int): The number of nodes.
+        """
+        if self.current_document is not None:
+            self.current_document.node_count += count
+        bucket = 1 << max(count - 1, 0).bit_length()
+        self.node_histogram[bucket] = self.node_histogram.get(bucket, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Times the body of the ``with`` statement as part of a stage.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def timed_iter(self, name: str, iterator: Iterator[T]) -> Iterator[T]:
+        """
+        Wraps an iterator so the time spent producing each item is recorded as part of a stage.
+
+        Parameters:
+            name (str): The stage name.
+            iterator (Iterator[T]): The iterator to wrap.
+
+        Returns:
+            Iterator[T]: The same items.
+        """
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.record(name, time.perf_counter_ns() - start)
+                return
+            self.record(name, time.perf_counter_ns() - start)
+            yield item
+
+    @contextmanager
+    def document(self, name: str) -> Iterator[DocumentProfile]:
+        """
+        Attributes the measurements taken in the body of the ``with`` statement to a document.
+        """
+        previous = self.current_document
+        profile = self.documents.get(name)
+        if profile is None:
+            profile = self.documents[name] = DocumentProfile(name)
+        self.current_document = profile
+        try:
+            yield profile
+        finally:
+            self.current_document = previous
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Exports the measurements as plain data, so they can be sent across processes.
+
+        Returns:
+            dict[str, Any]: The measurements, accepted by ``merge``.
+        """
+        return {
+            "stage_ns": dict(self.stage_ns),
+            "stage_calls": dict(self.stage_calls),
+            "counters": dict(self.counters),
+            "documents": [doc.to_dict() for doc in self.documents.values()],
+            "node_histogram": dict(self.node_histogram),
+        }
+
+    def merge(self, snapshot: dict[str, Any]) -> None:
+        """
+        Adds measurements exported by ``snapshot``, typically taken in a worker process.
+
+        Hooks are called once per stage of each merged document, with the document total.
+
+        Parameters:
+            snapshot (dict[str, Any]): The exported measurements.
+        """
+        for stage, elapsed in snapshot["stage_ns"].items():
+            self.stage_ns[stage] = self.stage_ns.get(stage, 0) + elapsed
+        for stage, calls in snapshot["stage_calls"].items():
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+        for name, amount in snapshot["counters"].items():
+            self.count(name, amount)
+        for bucket, documents in snapshot["node_histogram"].items():
+            bucket = int(bucket)
+            self.node_histogram[bucket] = self.node_histogram.get(bucket, 0) + documents
+        for data in snapshot["documents"]:
+            profile = self.documents.get(data["name"])
+            if profile is None:
+                profile = self.documents[data["name"]] = DocumentProfile(data["name"])
+            profile.node_count += data["node_count"]
+            for stage, elapsed in data["stage_ns"].items():
+                profile.stage_ns[stage] = profile.stage_ns.get(stage, 0) + elapsed
+                for hook in self._hooks:
+                    hook(stage, profile.name, elapsed)
+
+    def report(self, top: int = 10) -> str:
+        """
+        Formats the measurements as a human readable profile.
+
+        Parameters:
+            top (int): How many of the slowest documents are listed.
+
+        Returns:
+            str: The report, listing the time per stage, the slowest documents,
+                 the node count histogram and the counters.
+        """
+        lines = ["Stages:"]
+        total = sum(self.stage_ns.values()) or 1
+        ordered_stages = sorted(
+            self.stage_ns, key=lambda stage: self.stage_ns[stage], reverse=True
+        )
+        for stage in ordered_stages:
+            elapsed = self.stage_ns[stage]
+            lines.append(
+                f"  {stage:<14}{elapsed / 1e6:>12.2f} ms{elapsed / total:>8.1%}"
+                f"{self.stage_calls.get(stage, 0):>10} calls"
+            )
+
+        slowest = sorted(
+            self.documents.values(), key=lambda doc: doc.total_ns, reverse=True
+        )[:top]
+        if slowest:
+            lines.append(f"Slowest documents (top {len(slowest)}):")
+        for doc in slowest:
+            stages = ", ".join(
+                f"{stage} {elapsed / 1e6:.2f}"
+                for stage, elapsed in sorted(
+                    doc.stage_ns.items(), key=lambda item: item[1], reverse=True
+                )
+            )
+            lines.append(
+                f"  {doc.total_ns / 1e6:>10.2f} ms  {doc.name} "
+                f"({doc.node_count} nodes; {stages})"
+            )
+
+        if self.node_histogram:
+            lines.append("Nodes per document:")
+        for bucket in sorted(self.node_histogram):
+            lines.append(f"  <= {bucket:<10}{self.node_histogram[bucket]:>8} documents")
+
+        if self.counters:
+            lines.append("Counters:")
+        for name in sorted(self.counters):
+            lines.append(f"  {name:<24}{self.counters[name]:>10}")
+        return "\n".join(lines)
+
+
+def active() -> Optional[Instrumentation]:
+    """
+    Returns the enabled Instrumentation object, or None when instrumentation is disabled.
+    """
+    return _active
+
+
+def enable(instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+    """
+    Enables instrumentation for the whole process.
+
+    Parameters:
+        instrumentation (Optional[Instrumentation]): The object collecting the measurements.
+            A new one is created if not provided.
+
+    Returns:
+        Instrumentation: The enabled object.
+    """
+    global _active
+    _active = instrumentation or Instrumentation()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+@contextmanager
+def enabled(
+    instrumentation: Optional[Instrumentation] = None,
+) -> Iterator[Instrumentation]:
+    """
+    Enables instrumentation for the body of the ``with`` statement, then restores the previous state.
+    """
+    global _active
+    previous = _active
+    current = enable(instrumentation)
+    try:
+        yield current
+    finally:
+        _active = previous
+
+
+def count_nodes(root: HTMLNode) -> int:
+    """
+    Counts the nodes of a tree, without recursion.
+
+    Parameters:
+        root (HTMLNode): The root of the tree.
+
+    Returns:
+        int: The number of nodes, the root included.
+    """
+    count = 0
+    stack: list[HTMLNode] = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
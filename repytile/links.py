@@ -0,0 +1,279 @@
+import posixpath
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+from urllib.parse import unquote, urlsplit
+
+from repytile.inline_elements import TextNode
+
+# TextNode types recorded by the index
+LINK_TYPES = ("link", "image")
+
+_active: Optional["LinkIndex"] = None
+
+
+class LinkRecord:
+    __slots__ = ("kind", "url", "source", "line")
+
+    def __init__(
+        self, kind: str, url: str, source: Optional[str] = None, line: int = 0
+    ) -> None:
+        """
+        Initialize a LinkRecord object, one URL referenced by a document.
+
+        Parameters:
+            kind (str): 'link' for the href of an <a> tag, 'image' for the src of an <img> tag.
+            url (str): The URL, as written in the Markdown source.
+            source (Optional[str]): The source path of the document, relative to the content
+                directory, None if it is unknown.
+            line (int): The 1-based line of the block holding the URL, or of the list item,
+                0 if it is unknown.
+        """
+        self.kind = kind
+        self.url = url
+        self.source = source
+        self.line = line
+
+    @property
+    def target(self) -> Optional[str]:
+        """
+        The path the URL points to within the site, relative to its root, or None for external
+        URLs and links to a fragment of the same page. URLs ending with '/' point to the
+        index.html page of the directory.
+        """
+        parts = urlsplit(self.url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        path = unquote(parts.path)
+        if path.startswith("/"):
+            target = posixpath.normpath(path.lstrip("/") or ".")
+        else:
+            base = posixpath.dirname(self.source or "")
+            target = posixpath.normpath(posixpath.join(base, path))
+        if path.endswith("/") or target == ".":
+            target = posixpath.join(target, "index.html").removeprefix("./")
+        return target
+
+    def to_list(self) -> list[Any]:
+        # The source is the key of the page the record is stored with
+        return [self.kind, self.url, self.line]
+
+    @classmethod
+    def from_list(cls, data: Sequence[Any], source: Optional[str]) -> "LinkRecord":
+        kind, url, line = data
+        return cls(kind, url, source, line)
+
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, LinkRecord):
+            return False
+        return (self.kind, self.url, self.source, self.line) == (
+            __value.kind,
+            __value.url,
+            __value.source,
+            __value.line,
+        )
+
+    def __repr__(self) -> str:
+        return f"LinkRecord({self.kind}, {self.url}, {self.source}:{self.line})"
+
+
+class LinkIndex:
+    def __init__(self) -> None:
+        """
+        Initialize an empty LinkIndex object, the URLs referenced by the documents of a site.
+
+        The index is filled while documents are parsed: when it is enabled through ``enabled``,
+        every link and image converted into a LeafNode is recorded with its document and line,
+        so checking links or collecting assets never needs another pass over the rendered pages.
+        """
+        self._pages: dict[str, list[LinkRecord]] = {}
+        self._by_target: Optional[dict[str, list[LinkRecord]]] = None
+        self.current: Optional[list[LinkRecord]] = None
+        self.current_source: Optional[str] = None
+        # Line of the block being converted, set by the block parser
+        self.line = 0
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._pages.values())
+
+    def __iter__(self) -> Iterator[LinkRecord]:
+        for records in self._pages.values():
+            yield from records
+
+    @property
+    def sources(self) -> list[str]:
+        return list(self._pages)
+
+    @contextmanager
+    def document(self, source: str) -> Iterator[list[LinkRecord]]:
+        """
+        Records the URLs of the body of the ``with`` statement for a document,
+        replacing the records the document had.
+        """
+        previous = self.current, self.current_source, self.line
+        self.current = []
+        self.current_source = source
+        self.line = 0
+        try:
+            yield self.current
+        finally:
+            self.set_page(source, self.current)
+            self.current, self.current_source, self.line = previous
+
+    def record(self, kind: str, url: str, line: Optional[int] = None) -> None:
+        """
+        Records a URL for the current document, see ``document``. Nothing is recorded outside
+        of a document.
+
+        Parameters:
+            kind (str): 'link' or 'image'.
+            url (str): The URL.
+            line (Optional[int]): The line of the URL, defaults to the line of the current block.
+        """
+        if self.current is None:
+            return
+        self.current.append(
+            LinkRecord(
+                kind, url, self.current_source, self.line if line is None else line
+            )
+        )
+
+    def record_nodes(self, text_nodes: Iterable[TextNode]) -> None:
+        """
+        Records the URL of every link and image TextNode for the current document.
+        """
+        if self.current is None:
+            return
+        append = self.current.append
+        source = self.current_source
+        line = self.line
+        for tn in text_nodes:
+            if tn.text_type in LINK_TYPES and tn.url is not None:
+                append(LinkRecord(tn.text_type, tn.url, source, line))
+
+    def set_page(self, source: str, records: Iterable[LinkRecord]) -> None:
+        self._pages[source] = list(records)
+        self._by_target = None
+
+    def remove_page(self, source: str) -> None:
+        self._pages.pop(source, None)
+        self._by_target = None
+
+    def page(self, source: str) -> list[LinkRecord]:
+        """
+        Returns the records of a document, in the order the URLs appear in it.
+        """
+        return list(self._pages.get(source, ()))
+
+    def merge(self, other: "LinkIndex") -> None:
+        """
+        Adds the documents of another index, replacing the records of documents found in both.
+        """
+        for source in other.sources:
+            self.set_page(source, other.page(source))
+
+    def referencing(self, target: str) -> list[LinkRecord]:
+        """
+        Returns the records pointing to a path of the site, see ``LinkRecord.target``.
+        """
+        return list(self._targets().get(target, ()))
+
+    def _targets(self) -> dict[str, list[LinkRecord]]:
+        # Built on the first lookup after a change, URLs are resolved once per record
+        if self._by_target is None:
+            by_target: dict[str, list[LinkRecord]] = {}
+            for record in self:
+                target = record.target
+                if target is not None:
+                    by_target.setdefault(target, []).append(record)
+            self._by_target = by_target
+        return self._by_target
+
+    def targets(self, kind: Optional[str] = None) -> set[str]:
+        """
+        Returns the paths of the site referenced by the documents.
+
+        Arguments:
+            kind (Optional[str]): Only returns the targets of 'link' or 'image' records.
+
+        Returns:
+            set[str]: The referenced paths, relative to the root of the site.
+        """
+        return {
+            target
+            for target, records in self._targets().items()
+            if kind is None or any(record.kind == kind for record in records)
+        }
+
+    def assets(self) -> set[str]:
+        """
+        The images hosted by the site, to be copied next to the pages.
+        """
+        return self.targets("image")
+
+    def broken(self, exists: Callable[[str], bool]) -> list[LinkRecord]:
+        """
+        Finds the records pointing to paths that are missing from the site.
+
+        Arguments:
+            exists (Callable[[str], bool]): Whether a path, relative to the root of the site, exists.
+                It is called once per distinct target.
+
+        Returns:
+            list[LinkRecord]: The records with a missing target, grouped by target in the order
+                              the targets are first referenced.
+        """
+        broken: list[LinkRecord] = []
+        for target, records in self._targets().items():
+            if not exists(target):
+                broken.extend(records)
+        return broken
+
+    def to_dict(self) -> dict[str, list[list[Any]]]:
+        return {
+            source: [record.to_list() for record in records]
+            for source, records in self._pages.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, list[list[Any]]]) -> "LinkIndex":
+        return cls.from_pages(
+            (source, [LinkRecord.from_list(record, source) for record in records])
+            for source, records in data.items()
+        )
+
+    @classmethod
+    def from_pages(
+        cls, pages: Iterable[tuple[str, Iterable[LinkRecord]]]
+    ) -> "LinkIndex":
+        """
+        Builds an index from the records of each document, keeping the order of the documents.
+        """
+        index = cls()
+        for source, records in pages:
+            index.set_page(source, records)
+        return index
+
+    def __repr__(self) -> str:
+        return f"LinkIndex(documents={len(self._pages)}, urls={len(self)})"
+
+
+def active() -> Optional[LinkIndex]:
+    """
+    Returns the enabled LinkIndex object, None if URLs are not being recorded.
+    """
+    return _active
+
+
+@contextmanager
+def enabled(index: Optional[LinkIndex] = None) -> Iterator[LinkIndex]:
+    """
+    Records the URLs converted in the body of the ``with`` statement into an index,
+    then restores the previous state.
+    """
+    global _active
+    previous = _active
+    _active = index if index is not None else LinkIndex()
+    try:
+        yield _active
+    finally:
+        _active = previous
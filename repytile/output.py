@@ -0,0 +1,128 @@
+import os
+from pathlib import Path
+from types import TracebackType
+from typing import Optional, Union
+
+# Files written to temporary files before being renamed into place together
+WRITE_BATCH_SIZE = 64
+
+
+def temporary_path_for(path: Path) -> Path:
+    """
+    Maps a file to the temporary file it is written to, in the same directory so it can be
+    renamed into place atomically. Hidden, and unique per process.
+    """
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def write_atomic(path: Union[str, Path], data: bytes) -> None:
+    """
+    Writes a file next to its destination and renames it into place, so readers, such as a web
+    server or a synchronization tool, never see a partial file.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    path = Path(path)
+    temporary = temporary_path_for(path)
+    try:
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+class OutputWriter:
+    """
+    OutputWriter writes the files of a build, and counts the ones kept as they are.
+
+    Files whose content did not change are not given to the writer, so they keep their
+    modification time, which spares synchronization tools and CDN uploads. Files are written to
+    temporary files and renamed into place in batches, so readers never see a partial file.
+    Use it as a context manager, the last batch being written on exit.
+    """
+
+    __slots__ = ("root", "batch_size", "written", "unchanged", "_batch", "_dirs")
+
+    def __init__(self, root: Path, batch_size: int = WRITE_BATCH_SIZE) -> None:
+        """
+        Initialize an OutputWriter object.
+
+        Parameters:
+            root (Path): The output directory, files are given relative to it.
+            batch_size (int): How many files are buffered before being written.
+
+        Raises:
+            ValueError: If batch_size is lower than 1.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size should be at least 1")
+        self.root = root
+        self.batch_size = batch_size
+        self.written = 0
+        self.unchanged = 0
+        self._batch: list[tuple[Path, bytes]] = []
+        # Directories known to exist, created at most once per build
+        self._dirs: set[Path] = set()
+
+    def write(self, relative: str, data: bytes) -> None:
+        """
+        Queues a file for writing.
+
+        Arguments:
+            relative (str): The path of the file, relative to the output directory.
+            data (bytes): The content of the file.
+        """
+        self._batch.append((self.root / relative, data))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def keep(self) -> None:
+        """
+        Counts a file kept as it is, such as a page its renderer found identical.
+        """
+        self.unchanged += 1
+
+    def flush(self) -> None:
+        """
+        Writes the queued files. Every file of the batch is written to a temporary file first,
+        then they are all renamed into place.
+        """
+        batch, self._batch = self._batch, []
+        temporaries = []
+        try:
+            for path, data in batch:
+                if path.parent not in self._dirs:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    self._dirs.add(path.parent)
+                temporary = temporary_path_for(path)
+                temporaries.append(temporary)
+                temporary.write_bytes(data)
+            for (path, _), temporary in zip(batch, temporaries):
+                os.replace(temporary, path)
+                self.written += 1
+        except BaseException:
+            for temporary in temporaries:
+                temporary.unlink(missing_ok=True)
+            raise
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.flush()
+        else:
+            self._batch = []
+
+    def __repr__(self) -> str:
+        return (
+            f"OutputWriter(root={self.root}, written={self.written}, "
+            f"unchanged={self.unchanged}, queued={len(self._batch)})"
+        )
@@ -0,0 +1,248 @@
+from typing import Iterator, Optional, Sequence, Union
+
+from repytile import instrumentation
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode, SupportsWrite
+from repytile.block_parser import (
+    MarkdownSource,
+    block_to_html_node,
+    instrumented_blocks,
+)
+from repytile.escaping import escape_text
+from repytile.helpers import LeafNodePool
+from repytile.templates import SlotValue, Template
+
+TITLE_SLOT = "Title"
+CONTENT_SLOT = "Content"
+
+
+def markdown_to_page_node(
+    source: MarkdownSource, pool: Optional[LeafNodePool] = None
+) -> tuple[ParentNode, Optional[str]]:
+    """
+    Converts a Markdown document into a <div> ParentNode and finds its title along the way.
+
+    Arguments:
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        tuple[ParentNode, Optional[str]]: The <div> node of the document and the text of its
+                                          first level 1 heading, or None if it has none.
+    """
+    title = None
+    children: list[HTMLNode] = []
+    for block in instrumented_blocks(source):
+        if title is None and block.block_type == "heading":
+            if block.lines[0].startswith("# "):
+                title = block.lines[0][2:].strip()
+        children.append(block_to_html_node(block, pool))
+    return ParentNode(tag="div", children=children or [LeafNode(value="")]), title
+
+
+def _page_values(
+    source: MarkdownSource, default_title: str, pool: Optional[LeafNodePool]
+) -> dict[str, SlotValue]:
+    node, title = markdown_to_page_node(source, pool)
+    return _node_values(node, title, default_title)
+
+
+def _node_values(
+    node: ParentNode, title: Optional[str], default_title: str
+) -> dict[str, SlotValue]:
+    instr = instrumentation.active()
+    if instr is not None:
+        instr.record_nodes(instrumentation.count_nodes(node))
+    # The title is inserted in the template as text, it is escaped like node values
+    return {TITLE_SLOT: escape_text(title or default_title), CONTENT_SLOT: node}
+
+
+def render_page(
+    source: MarkdownSource,
+    template: Union[Template, str],
+    default_title: str = "",
+    pool: Optional[LeafNodePool] = None,
+) -> str:
+    """
+    Renders a Markdown document into a full HTML page.
+
+    Arguments:
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+        template (Union[Template, str]): The page template, where the "{{ Title }}" and
+            "{{ Content }}" placeholders are replaced by the document title and its HTML.
+            Passing a parsed Template avoids parsing the template again for every page.
+        default_title (str): The title used when the document has no level 1 heading.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    if isinstance(template, str):
+        template = Template(template)
+    values = _page_values(source, default_title, pool)
+    instr = instrumentation.active()
+    if instr is None:
+        return template.render(values)
+    with instr.stage("render"):
+        return template.render(values)
+
+
+def render_page_node(
+    node: ParentNode,
+    title: Optional[str],
+    template: Template,
+    default_title: str = "",
+) -> str:
+    """
+    Renders an already parsed document into a full HTML page, skipping the Markdown parser.
+
+    Arguments:
+        node (ParentNode): The <div> node of the document, as built by ``markdown_to_page_node``.
+        title (Optional[str]): The title of the document, None if it has none.
+        template (Template): The page template, see ``render_page``.
+        default_title (str): The title used when the document has no title.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    values = _node_values(node, title, default_title)
+    instr = instrumentation.active()
+    if instr is None:
+        return template.render(values)
+    with instr.stage("render"):
+        return template.render(values)
+
+
+def stream_page(
+    source: MarkdownSource,
+    template: Union[Template, str],
+    default_title: str = "",
+    pool: Optional[LeafNodePool] = None,
+) -> Iterator[str]:
+    """
+    Renders a Markdown document into a full HTML page, yielding the HTML while the document is
+    being parsed.
+
+    The template up to the content slot is yielded as soon as the first block is parsed, then
+    each block is converted and rendered as soon as it is closed, and its HTML is yielded before
+    the next block is read. Only one block is held in memory at a time, so reading lines from a
+    file or a socket keeps peak memory in the order of the largest block whatever the size of
+    the document, and the first chunk is sent after parsing a single block.
+
+    Arguments:
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+        template (Union[Template, str]): The page template, see ``render_page``.
+        default_title (str): The title used when the document does not start with a level 1
+            heading.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        Iterator[str]: The chunks that, once concatenated, form the HTML of the page.
+
+    The head of the page is sent before the rest of the document is read, so unlike
+    ``render_page`` the title is only taken from the first block. The rest of the page is the
+    same as the one rendered by ``render_page``. Nothing is read or parsed before the first
+    chunk is requested, errors are raised while iterating.
+    """
+    if isinstance(template, str):
+        template = Template(template)
+    blocks = instrumented_blocks(source)
+    first = next(blocks, None)
+    title = None
+    if first is not None and first.block_type == "heading":
+        if first.lines[0].startswith("# "):
+            title = first.lines[0][2:].strip()
+
+    def content() -> Iterator[str]:
+        if first is None:
+            yield "<div></div>"
+            return
+        yield "<div>"
+        yield block_to_html_node(first, pool).to_html()
+        for block in blocks:
+            yield block_to_html_node(block, pool).to_html()
+        yield "</div>"
+
+    yield from template.iter_render(
+        {TITLE_SLOT: escape_text(title or default_title), CONTENT_SLOT: content()}
+    )
+
+
+def render_page_to(
+    writer: SupportsWrite,
+    source: MarkdownSource,
+    template: Template,
+    default_title: str = "",
+    pool: Optional[LeafNodePool] = None,
+) -> None:
+    """
+    Renders a Markdown document into a full HTML page, written directly into a file-like object.
+
+    Arguments:
+        writer (SupportsWrite): Any object exposing a ``write(str)`` method.
+        source (MarkdownSource): The Markdown text, or any iterable of lines such as an open file.
+        template (Template): The page template, see ``render_page``.
+        default_title (str): The title used when the document has no level 1 heading.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+    """
+    values = _page_values(source, default_title, pool)
+    instr = instrumentation.active()
+    if instr is None:
+        template.render_to(writer, values)
+        return
+    with instr.stage("render"):
+        template.render_to(writer, values)
+
+
+def render_pages(
+    sources: Sequence[MarkdownSource],
+    template: Union[Template, str],
+    default_titles: Optional[Sequence[str]] = None,
+    pool: Optional[LeafNodePool] = None,
+) -> list[str]:
+    """
+    Renders several Markdown documents with the same template in one call.
+
+    The template is parsed once, the instrumentation state is looked up once, and the documents
+    share a LeafNodePool, so the inline elements repeated across documents are built and
+    rendered only once.
+
+    Arguments:
+        sources (Sequence[MarkdownSource]): The Markdown documents.
+        template (Union[Template, str]): The page template, see ``render_page``.
+        default_titles (Optional[Sequence[str]]): The title of each document without a level 1
+            heading. Documents fall back to an empty title if not provided.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+            A pool is created for the call if not provided.
+
+    Returns:
+        list[str]: The HTML of each page, in the same order as the sources.
+
+    Raises:
+        ValueError: If default_titles and sources do not have the same length.
+
+    An exception raised while rendering a document carries a note with the index of the document.
+    """
+    if default_titles is not None and len(default_titles) != len(sources):
+        raise ValueError(
+            f"Got {len(default_titles)} default titles for {len(sources)} documents"
+        )
+    if isinstance(template, str):
+        template = Template(template)
+    if pool is None:
+        pool = LeafNodePool()
+    instr = instrumentation.active()
+    render = template.render
+    pages = []
+    for index, source in enumerate(sources):
+        default_title = default_titles[index] if default_titles is not None else ""
+        try:
+            values = _page_values(source, default_title, pool)
+            if instr is None:
+                pages.append(render(values))
+            else:
+                with instr.stage("render"):
+                    pages.append(render(values))
+        except Exception as exc:
+            exc.add_note(f"while rendering document {index}")
+            raise
+    return pages
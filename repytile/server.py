@@ -0,0 +1,395 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Callable, Optional, Union
+from urllib.parse import unquote, urlsplit
+
+from repytile.helpers import LeafNodePool
+from repytile.pages import render_page
+from repytile.site_builder import (
+    INTERN_POOL_SIZE,
+    OUTPUT_SUFFIX,
+    SOURCE_SUFFIX,
+    hash_bytes,
+)
+from repytile.templates import load_template
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_POLL_INTERVAL = 0.5
+# Requests with a longer header are rejected instead of being buffered
+MAX_HEADER_BYTES = 16 * 1024
+
+CACHE_HEADER = "X-Repytile-Cache"
+
+
+class PageCache:
+    """
+    PageCache keeps rendered pages in memory, evicting the least recently used ones once the
+    total size of the cached HTML exceeds its budget.
+
+    Entries are keyed by source path and content hash, so a page whose file changed is never
+    served from the cache, even before the watcher notices the change.
+    """
+
+    __slots__ = ("max_bytes", "size", "hits", "misses", "evictions", "_entries")
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        """
+        Initialize an empty PageCache object.
+
+        Parameters:
+            max_bytes (int): The maximum total size of the cached pages, in UTF-8 bytes.
+
+        Raises:
+            ValueError: If max_bytes is lower than 1.
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes should be at least 1")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: str, content_hash: str) -> Optional[bytes]:
+        page = self._entries.get((path, content_hash))
+        if page is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((path, content_hash))
+        self.hits += 1
+        return page
+
+    def put(self, path: str, content_hash: str, page: bytes) -> None:
+        """
+        Stores a rendered page. Pages larger than the whole budget are not cached.
+        """
+        if len(page) > self.max_bytes:
+            return
+        self.invalidate(path)
+        self._entries[(path, content_hash)] = page
+        self.size += len(page)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        """
+        Drops every cached version of a page.
+        """
+        for key in [key for key in self._entries if key[0] == path]:
+            self.size -= len(self._entries.pop(key))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"PageCache(pages={len(self)}, size={self.size}, max_bytes={self.max_bytes}, "
+            f"hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+        )
+
+
+class FileWatcher:
+    """
+    FileWatcher polls the modification time and size of files, which works on every platform
+    without any dependency.
+    """
+
+    __slots__ = ("root", "suffix", "extra_files", "_stats")
+
+    def __init__(
+        self,
+        root: Path,
+        suffix: str = SOURCE_SUFFIX,
+        extra_files: tuple[Path, ...] = (),
+    ) -> None:
+        """
+        Initialize a FileWatcher object and record the current state of the watched files.
+
+        Parameters:
+            root (Path): The directory watched recursively.
+            suffix (str): Only files with this suffix are watched in root.
+            extra_files (tuple[Path, ...]): Files watched in addition to root, such as the template.
+        """
+        self.root = root
+        self.suffix = suffix
+        self.extra_files = extra_files
+        self._stats = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        stats = {}
+        paths = [*self.root.rglob(f"*{self.suffix}"), *self.extra_files]
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def poll(self) -> list[Path]:
+        """
+        Compares the watched files with their state at the previous poll.
+
+        Returns:
+            list[Path]: The files created, modified or deleted since the previous poll, sorted.
+        """
+        stats = self._scan()
+        changed = {path for path in stats if self._stats.get(path) != stats[path]}
+        changed.update(path for path in self._stats if path not in stats)
+        self._stats = stats
+        return sorted(changed)
+
+    async def watch(
+        self,
+        on_change: Callable[[list[Path]], None],
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        """
+        Polls the files forever, calling ``on_change`` with the changed files after each poll
+        that found some.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            changed = await asyncio.get_running_loop().run_in_executor(None, self.poll)
+            if changed:
+                on_change(changed)
+
+
+def source_for_url(url: str) -> Optional[str]:
+    """
+    Maps the path of a request to the relative path of its Markdown source.
+
+    Arguments:
+        url (str): The request target, such as "/", "/blog/" or "/blog/post.html".
+
+    Returns:
+        Optional[str]: The source path relative to the content directory, such as "index.md",
+                       "blog/index.md" or "blog/post.md". None if the path leaves the directory.
+    """
+    path = unquote(urlsplit(url).path)
+    if path.endswith("/"):
+        path += "index" + OUTPUT_SUFFIX
+    relative = PurePosixPath(path.lstrip("/"))
+    if ".." in relative.parts or "\\" in path:
+        return None
+    if relative.suffix == OUTPUT_SUFFIX:
+        relative = relative.with_suffix("")
+    return f"{relative}{SOURCE_SUFFIX}"
+
+
+class DevServer:
+    def __init__(
+        self,
+        content_dir: Union[str, Path],
+        template_path: Union[str, Path],
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        poll_interval: Optional[float] = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        """
+        Initialize a DevServer object rendering Markdown pages on demand.
+
+        Parameters:
+            content_dir (Union[str, Path]): Directory of the Markdown sources.
+            template_path (Union[str, Path]): The HTML page template.
+            cache_bytes (int): The size budget of the in-memory page cache.
+            poll_interval (Optional[float]): Seconds between two polls of the watcher,
+                None disables the watcher.
+
+        Pages are rendered one at a time by a dedicated thread, so the event loop keeps serving
+        cached pages during a render. Concurrent requests for the same page and content wait for
+        a single render.
+        """
+        self.content_dir = Path(content_dir)
+        self.template_path = Path(template_path)
+        self.cache = PageCache(cache_bytes)
+        self.poll_interval = poll_interval
+        self.renders = 0
+        self._pool = LeafNodePool(INTERN_POOL_SIZE)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._inflight: dict[tuple[str, str], asyncio.Future[bytes]] = {}
+        self._server: Optional[asyncio.Server] = None
+        self._watch_task: Optional[asyncio.Task[None]] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        """
+        Starts listening, and watching files if enabled. Port 0 picks a free port.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        if self.poll_interval is not None:
+            watcher = FileWatcher(self.content_dir, extra_files=(self.template_path,))
+            self._watch_task = asyncio.create_task(
+                watcher.watch(self._on_change, self.poll_interval)
+            )
+
+    @property
+    def port(self) -> int:
+        if self._server is None:
+            raise RuntimeError("The server is not started")
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            raise RuntimeError("The server is not started")
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=False)
+
+    def _on_change(self, changed: list[Path]) -> None:
+        if self.template_path in changed:
+            self.cache.clear()
+            return
+        for path in changed:
+            self.cache.invalidate(path.relative_to(self.content_dir).as_posix())
+
+    def _render(self, source: str, data: bytes) -> bytes:
+        template = load_template(self.template_path)
+        default_title = PurePosixPath(source).stem
+        html = render_page(data, template, default_title=default_title, pool=self._pool)
+        return html.encode("utf-8")
+
+    async def get_page(self, source: str) -> tuple[bytes, bool]:
+        """
+        Returns the rendered page of a source, from the cache when its content did not change.
+
+        Arguments:
+            source (str): The source path relative to the content directory.
+
+        Returns:
+            tuple[bytes, bool]: The UTF-8 encoded page and whether it came from the cache.
+
+        Raises:
+            FileNotFoundError: If the source does not exist.
+        """
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, (self.content_dir / source).read_bytes)
+        key = (source, hash_bytes(data))
+        page = self.cache.get(*key)
+        if page is not None:
+            return page, True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), False
+        future: asyncio.Future[bytes] = loop.create_future()
+        self._inflight[key] = future
+        try:
+            self.renders += 1
+            page = await loop.run_in_executor(
+                self._executor, self._render, source, data
+            )
+        except BaseException as exc:
+            future.set_exception(exc)
+            # The exception is raised below, waiters that were cancelled would never retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        self.cache.put(*key, page)
+        future.set_result(page)
+        return page, False
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            status, body, headers = await self._respond(reader)
+            headers.setdefault("Content-Length", str(len(body)))
+            head = [f"HTTP/1.1 {status}"]
+            head += [f"{name}: {value}" for name, value in headers.items()]
+            head.append("Connection: close")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[str, bytes, dict[str, str]]:
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            return "431 Request Header Fields Too Large", b"", {}
+        if len(request) > MAX_HEADER_BYTES:
+            return "431 Request Header Fields Too Large", b"", {}
+        parts = request.split(b"\r\n", 1)[0].decode("latin-1").split()
+        if len(parts) != 3:
+            return "400 Bad Request", b"", {}
+        method, target, _ = parts
+        if method not in ("GET", "HEAD"):
+            return "405 Method Not Allowed", b"", {"Allow": "GET, HEAD"}
+
+        source = source_for_url(target)
+        if source is None:
+            return "404 Not Found", b"Not Found", {"Content-Type": "text/plain"}
+        try:
+            page, cached = await self.get_page(source)
+        except (FileNotFoundError, IsADirectoryError):
+            return "404 Not Found", b"Not Found", {"Content-Type": "text/plain"}
+        except Exception as exc:
+            message = f"{type(exc).__name__}: {exc}".encode("utf-8")
+            return (
+                "500 Internal Server Error",
+                message,
+                {"Content-Type": "text/plain; charset=utf-8"},
+            )
+        headers = {
+            "Content-Type": "text/html; charset=utf-8",
+            CACHE_HEADER: "hit" if cached else "miss",
+        }
+        if method == "HEAD":
+            # Same headers as a GET, the length being the one of the page that is not sent
+            headers["Content-Length"] = str(len(page))
+            return "200 OK", b"", headers
+        return "200 OK", page, headers
+
+
+async def serve(
+    content_dir: Union[str, Path],
+    template_path: Union[str, Path],
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache_bytes: int = DEFAULT_CACHE_BYTES,
+    poll_interval: Optional[float] = DEFAULT_POLL_INTERVAL,
+    on_start: Optional[Callable[[DevServer], None]] = None,
+) -> None:
+    """
+    Runs a DevServer until the task is cancelled.
+
+    Arguments:
+        content_dir (Union[str, Path]): Directory of the Markdown sources.
+        template_path (Union[str, Path]): The HTML page template.
+        host (str): The interface to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+        cache_bytes (int): The size budget of the in-memory page cache.
+        poll_interval (Optional[float]): Seconds between two polls of the watcher,
+            None disables the watcher.
+        on_start (Optional[Callable[[DevServer], None]]): Called once the server listens,
+            for instance to print its address.
+    """
+    server = DevServer(content_dir, template_path, cache_bytes, poll_interval)
+    await server.start(host, port)
+    try:
+        if on_start is not None:
+            on_start(server)
+        await server.serve_forever()
+    finally:
+        await server.close()
@@ -0,0 +1,1228 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from repytile import __version__, ast_cache, instrumentation, links
+from repytile.ast_cache import Buffer
+from repytile.block_elements import ParentNode
+from repytile.exceptions import InvalidCacheFile, ShardMergeError
+from repytile.helpers import LeafNodePool
+from repytile.inline_elements import TextNode
+from repytile.instrumentation import Instrumentation
+from repytile.links import LINK_TYPES, LinkIndex, LinkRecord
+from repytile.output import OutputWriter, write_atomic
+from repytile.pages import markdown_to_page_node, render_page, render_page_node
+from repytile.source import map_source
+from repytile.templates import Template, load_template
+
+MANIFEST_NAME = ".repytile-manifest.json"
+AST_CACHE_NAME = ".repytile-ast"
+MANIFEST_FORMAT = 1
+SOURCE_SUFFIX = ".md"
+OUTPUT_SUFFIX = ".html"
+CHUNKS_PER_WORKER = 4
+INTERN_POOL_SIZE = 16 * 1024
+GZIP_SUFFIX = ".gz"
+# Smaller pages gain little from compression, hosts serve them as they are
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 9
+
+# The <div> node, the title and the links of a parsed page
+ParsedPage = tuple[ParentNode, Optional[str], list[LinkRecord]]
+
+
+def hash_bytes(data: Buffer) -> str:
+    """
+    Computes the content hash used to detect changed inputs.
+
+    Arguments:
+        data (Buffer): The content to hash, bytes or any buffer such as a memory-mapped file.
+
+    Returns:
+        str: The hexadecimal digest of the content.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def shard_for(source: str, count: int) -> int:
+    """
+    Assigns a source to one of the shards of a sharded build.
+
+    Arguments:
+        source (str): The source path, relative to the content directory.
+        count (int): The number of shards.
+
+    Returns:
+        int: The number of the shard building the source, from 1 to ``count``. It only depends on
+             the path, so every machine of a sharded build agrees on the partition.
+    """
+    digest = hashlib.blake2b(source.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+class Shard:
+    __slots__ = ("number", "count")
+
+    def __init__(self, number: int, count: int) -> None:
+        """
+        Initialize a Shard object, the part of the content directory built by one machine.
+
+        Parameters:
+            number (int): The number of the shard, from 1 to ``count``.
+            count (int): The number of shards the build is split into.
+
+        Raises:
+            ValueError: If the number is not between 1 and the count.
+        """
+        if count < 1 or not 1 <= number <= count:
+            raise ValueError(f"Invalid shard {number}/{count}")
+        self.number = number
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """
+        Parses a shard written as 'number/count', such as '2/4'.
+
+        Raises:
+            ValueError: If the shard is malformed or out of range.
+        """
+        number, separator, count = spec.partition("/")
+        if not separator:
+            raise ValueError(f"Invalid shard {spec!r}, expected 'number/count'")
+        return cls(int(number), int(count))
+
+    def contains(self, source: str) -> bool:
+        return shard_for(source, self.count) == self.number
+
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, Shard):
+            return False
+        return (self.number, self.count) == (__value.number, __value.count)
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.count}"
+
+    def __repr__(self) -> str:
+        return f"Shard({self})"
+
+
+class PageRecord:
+    __slots__ = ("input_hash", "output", "output_hash", "compressed")
+
+    def __init__(
+        self,
+        input_hash: str,
+        output: str,
+        output_hash: Optional[str] = None,
+        compressed: bool = False,
+    ) -> None:
+        """
+        Initialize a PageRecord object describing one page of the last build.
+
+        Parameters:
+            input_hash (str): The content hash of the Markdown source of the page.
+            output (str): The path of the rendered page, relative to the output directory.
+            output_hash (Optional[str]): The content hash of the rendered page, once rendered.
+            compressed (bool): Whether a gzip compressed copy of the page was written next to it.
+        """
+        self.input_hash = input_hash
+        self.output = output
+        self.output_hash = output_hash
+        self.compressed = compressed
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "input_hash": self.input_hash,
+            "output": self.output,
+            "output_hash": self.output_hash,
+            "compressed": self.compressed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PageRecord":
+        return cls(
+            input_hash=data["input_hash"],
+            output=data["output"],
+            output_hash=data.get("output_hash"),
+            compressed=data.get("compressed", False),
+        )
+
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, PageRecord):
+            return False
+        return self.to_dict() == __value.to_dict()
+
+    def __repr__(self) -> str:
+        return f"PageRecord({self.input_hash}, {self.output})"
+
+
+class BuildManifest:
+    def __init__(
+        self,
+        version: Optional[str] = None,
+        template_hash: Optional[str] = None,
+        pages: Optional[dict[str, PageRecord]] = None,
+        compress_min_size: Optional[int] = None,
+        links: Optional[LinkIndex] = None,
+        shard: Optional[Shard] = None,
+        sources: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Initialize a BuildManifest object, the persistent record of a site build.
+
+        Parameters:
+            version (Optional[str]): The repytile version that produced the build.
+            template_hash (Optional[str]): The content hash of the template used by the build.
+            pages (Optional[dict[str, PageRecord]]): The built pages, keyed by their source path
+                relative to the content directory.
+            compress_min_size (Optional[int]): The size from which pages were compressed,
+                None if the build did not compress pages.
+            links (Optional[LinkIndex]): The links and images of the built pages.
+            shard (Optional[Shard]): The part of the content directory built, None if the
+                build covered all of it.
+            sources (Optional[list[str]]): Every source assigned to a sharded build, failed
+                pages included, so ``merge_shards`` can tell a missing page from an empty shard.
+        """
+        self.version = version
+        self.template_hash = template_hash
+        self.pages = pages if pages is not None else {}
+        self.compress_min_size = compress_min_size
+        self.links = links if links is not None else LinkIndex()
+        self.shard = shard
+        self.sources = sources if sources is not None else []
+
+    def is_compatible(
+        self, template_hash: str, compress_min_size: Optional[int] = None
+    ) -> bool:
+        """
+        Checks whether the pages of this manifest can be reused by a new build.
+
+        Arguments:
+            template_hash (str): The content hash of the template used by the new build.
+            compress_min_size (Optional[int]): The compression threshold of the new build,
+                None if it does not compress pages.
+
+        Returns:
+            bool: True if the template, the compression settings and the repytile version are
+                  unchanged.
+        """
+        return (
+            self.version == __version__
+            and self.template_hash == template_hash
+            and self.compress_min_size == compress_min_size
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "format": MANIFEST_FORMAT,
+            "version": self.version,
+            "template_hash": self.template_hash,
+            "compress_min_size": self.compress_min_size,
+            "pages": {path: page.to_dict() for path, page in self.pages.items()},
+            "links": self.links.to_dict(),
+            "shard": str(self.shard) if self.shard is not None else None,
+            "sources": self.sources,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "BuildManifest":
+        return cls(
+            version=data["version"],
+            template_hash=data["template_hash"],
+            pages={
+                path: PageRecord.from_dict(page) for path, page in data["pages"].items()
+            },
+            compress_min_size=data.get("compress_min_size"),
+            links=LinkIndex.from_dict(data.get("links", {})),
+            shard=Shard.parse(data["shard"]) if data.get("shard") else None,
+            sources=data.get("sources"),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        """
+        Loads a manifest from disk.
+
+        Arguments:
+            path (Path): The manifest file.
+
+        Returns:
+            BuildManifest: The loaded manifest. A missing, unreadable or outdated manifest
+                           results in an empty one, which simply forces a full build.
+        """
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("format") != MANIFEST_FORMAT:
+                return cls()
+            return cls.from_dict(data)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return cls()
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Compact output goes through the C encoder, an indented one through the pure Python
+        # encoder, which dominated no-op builds of large sites
+        write_atomic(
+            path,
+            json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":")).encode(
+                "utf-8"
+            ),
+        )
+
+
+class BuildReport:
+    def __init__(self) -> None:
+        """
+        Initialize an empty BuildReport object, filled while a site is built.
+        """
+        self.rendered: list[str] = []
+        self.skipped: list[str] = []
+        self.errors: dict[str, str] = {}
+        self.intern_hits = 0
+        self.intern_misses = 0
+        # Rendered pages whose parsed document was loaded from the AST cache
+        self.ast_hits = 0
+        # Compressed copies written, and the ones kept because the page did not change
+        self.compressed = 0
+        self.compressed_unchanged = 0
+        # Output files written, and the ones kept because their content did not change
+        self.files_written = 0
+        self.files_unchanged = 0
+        # Links and images of every page of the site, skipped pages included
+        self.links = LinkIndex()
+
+    @property
+    def total(self) -> int:
+        return len(self.rendered) + len(self.skipped) + len(self.errors)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of pages served from the build cache, between 0 and 1.
+        """
+        if not self.total:
+            return 0.0
+        return len(self.skipped) / self.total
+
+    def summary(self) -> str:
+        summary = (
+            f"{self.total} pages: {len(self.rendered)} rendered, "
+            f"{len(self.skipped)} unchanged (cache hit rate {self.hit_rate:.1%})"
+        )
+        if self.errors:
+            summary += f", {len(self.errors)} failed"
+        if self.ast_hits:
+            summary += f", {self.ast_hits} loaded from the AST cache"
+        if self.compressed or self.compressed_unchanged:
+            summary += (
+                f", {self.compressed} compressed"
+                f" ({self.compressed_unchanged} compressed copies unchanged)"
+            )
+        if self.files_written or self.files_unchanged:
+            summary += (
+                f"; {self.files_written} files written, "
+                f"{self.files_unchanged} identical files kept"
+            )
+        lookups = self.intern_hits + self.intern_misses
+        if lookups:
+            summary += (
+                f"; {self.intern_hits}/{lookups} inline nodes shared "
+                f"({self.intern_hits / lookups:.1%})"
+            )
+        return summary
+
+
+# Identifies the content of a file without reading it
+_FileKey = tuple[int, int, int]
+
+
+def _file_key(path: Path) -> Optional[_FileKey]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class BuildState:
+    def __init__(self) -> None:
+        """
+        Initialize an empty BuildState object, the caches a long-running process keeps between
+        builds of a site, such as the build daemon.
+
+        Passed to ``build_site``, it keeps the parsed template until its file changes, the content
+        hash of each source until its size or modification time changes, the manifest of the
+        previous build, the LeafNodePool and the parsed pages, so a build only reads and parses
+        the sources that changed since the previous one.
+        """
+        self.pool = LeafNodePool(INTERN_POOL_SIZE)
+        # Parsed pages of the last build, keyed by content hash
+        self.pages: dict[str, ParsedPage] = {}
+        self._templates: dict[Path, tuple[_FileKey, Template]] = {}
+        self._hashes: dict[Path, tuple[_FileKey, str]] = {}
+        self._manifests: dict[Path, tuple[_FileKey, BuildManifest]] = {}
+
+    def template(self, path: Path) -> Template:
+        """
+        Returns the parsed template, loading it again only if its file changed.
+        """
+        key = _file_key(path)
+        cached = self._templates.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        template = load_template(path)
+        if key is not None:
+            self._templates[path] = key, template
+        return template
+
+    def hash_source(self, path: Path) -> str:
+        """
+        Returns the content hash of a source, reading it again only if its file changed.
+        """
+        key = _file_key(path)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with map_source(path) as data:
+            input_hash = hash_bytes(data)
+        if key is not None:
+            self._hashes[path] = key, input_hash
+        return input_hash
+
+    def manifest(self, path: Path) -> BuildManifest:
+        """
+        Returns the manifest saved by the previous build, loading it from disk only if the file
+        was changed by another process.
+        """
+        cached = self._manifests.get(path)
+        if cached is not None and cached[0] == _file_key(path):
+            return cached[1]
+        return BuildManifest.load(path)
+
+    def save_manifest(self, path: Path, manifest: BuildManifest) -> None:
+        manifest.save(path)
+        key = _file_key(path)
+        if key is not None:
+            self._manifests[path] = key, manifest
+
+    def prune(self, sources: Iterable[Path], input_hashes: set[str]) -> None:
+        """
+        Drops the cached hashes of deleted sources and the parsed pages of changed ones.
+        """
+        keep = set(sources)
+        self._hashes = {
+            path: cached for path, cached in self._hashes.items() if path in keep
+        }
+        self.pages = {
+            input_hash: page
+            for input_hash, page in self.pages.items()
+            if input_hash in input_hashes
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"BuildState(templates={len(self._templates)}, sources={len(self._hashes)}, "
+            f"pages={len(self.pages)})"
+        )
+
+
+def output_path_for(source: str) -> str:
+    """
+    Maps the relative path of a Markdown source to the relative path of its rendered page.
+
+    Arguments:
+        source (str): The source path, such as 'docs/index.md'.
+
+    Returns:
+        str: The output path, such as 'docs/index.html'.
+    """
+    return source.removesuffix(SOURCE_SUFFIX) + OUTPUT_SUFFIX
+
+
+def compressed_path_for(output: str) -> str:
+    """
+    Maps the relative path of a rendered page to the path of its gzip compressed copy.
+    """
+    return output + GZIP_SUFFIX
+
+
+def compress_page(data: bytes) -> bytes:
+    """
+    Compresses a rendered page for hosts serving precompressed files.
+
+    The gzip header holds no timestamp, so the same page always compresses to the same bytes.
+    """
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def find_sources(content_dir: Path) -> list[str]:
+    """
+    Lists the Markdown sources of a content directory.
+
+    Arguments:
+        content_dir (Path): The content directory.
+
+    Returns:
+        list[str]: The sorted source paths, relative to the content directory, in POSIX format.
+    """
+    return sorted(
+        path.relative_to(content_dir).as_posix()
+        for path in content_dir.rglob(f"*{SOURCE_SUFFIX}")
+        if path.is_file()
+    )
+
+
+class RenderResult:
+    __slots__ = (
+        "source",
+        "html",
+        "error",
+        "intern_hits",
+        "intern_misses",
+        "profile",
+        "from_ast",
+        "output_hash",
+        "compressed",
+        "compressed_unchanged",
+        "links",
+    )
+
+    def __init__(
+        self,
+        source: str,
+        html: Optional[str] = None,
+        error: Optional[str] = None,
+        intern_hits: int = 0,
+        intern_misses: int = 0,
+        profile: Optional[dict[str, Any]] = None,
+        from_ast: bool = False,
+        output_hash: Optional[str] = None,
+        compressed: Optional[bytes] = None,
+        compressed_unchanged: bool = False,
+        links: Optional[list[LinkRecord]] = None,
+    ) -> None:
+        """
+        Initialize a RenderResult object, sent back by a worker for each page it rendered.
+
+        Parameters:
+            source (str): The source path of the page, relative to the content directory.
+            html (Optional[str]): The rendered page, None if rendering failed or the page is
+                identical to the existing one.
+            error (Optional[str]): The reason why rendering failed, if it did.
+            intern_hits (int): How many inline nodes were taken from the worker LeafNodePool.
+            intern_misses (int): How many inline nodes had to be built.
+            profile (Optional[dict[str, Any]]): The instrumentation snapshot of the page,
+                when the build is profiled.
+            from_ast (bool): Whether the parsed document was loaded from the AST cache.
+            output_hash (Optional[str]): The content hash of the rendered page.
+            compressed (Optional[bytes]): The gzip compressed page, None if the page is below
+                the compression threshold or its compressed copy is still up to date.
+            compressed_unchanged (bool): Whether the existing compressed copy of the page is
+                still up to date, it is removed when the page is no longer compressed.
+            links (Optional[list[LinkRecord]]): The links and images of the page.
+        """
+        self.source = source
+        self.html = html
+        self.error = error
+        self.intern_hits = intern_hits
+        self.intern_misses = intern_misses
+        self.profile = profile
+        self.from_ast = from_ast
+        self.output_hash = output_hash
+        self.compressed = compressed
+        self.compressed_unchanged = compressed_unchanged
+        self.links = links if links is not None else []
+
+
+# State of the current worker process, set up by ``_init_worker``
+_worker_template: Optional[Template] = None
+_worker_pool: Optional[LeafNodePool] = None
+_worker_profile = False
+_worker_ast_dir: Optional[Path] = None
+_worker_compress_min_size: Optional[int] = None
+_worker_pages: Optional[dict[str, "ParsedPage"]] = None
+
+
+def _init_worker(
+    template_path: str,
+    profile: bool = False,
+    ast_dir: Optional[str] = None,
+    compress_min_size: Optional[int] = None,
+) -> None:
+    _set_worker_state(
+        load_template(template_path),
+        LeafNodePool(INTERN_POOL_SIZE),
+        profile,
+        ast_dir,
+        compress_min_size,
+    )
+
+
+def _set_worker_state(
+    template: Template,
+    pool: LeafNodePool,
+    profile: bool = False,
+    ast_dir: Optional[str] = None,
+    compress_min_size: Optional[int] = None,
+    pages: Optional[dict[str, "ParsedPage"]] = None,
+) -> None:
+    global _worker_template, _worker_pool, _worker_profile, _worker_ast_dir
+    global _worker_compress_min_size, _worker_pages
+    _worker_template = template
+    _worker_pool = pool
+    _worker_profile = profile
+    _worker_ast_dir = Path(ast_dir) if ast_dir is not None else None
+    _worker_compress_min_size = compress_min_size
+    _worker_pages = pages
+
+
+def ast_path_for(ast_dir: Path, input_hash: str) -> Path:
+    return ast_dir / f"{input_hash}{ast_cache.AST_SUFFIX}"
+
+
+def save_page_ast(
+    path: Path,
+    node: ParentNode,
+    title: Optional[str],
+    page_links: Iterable[LinkRecord] = (),
+) -> None:
+    """
+    Stores a parsed page in the AST cache. The title and the links of the page are kept as
+    trailing TextNodes, a 'text' node for the title and one 'link' or 'image' node per URL,
+    holding its line.
+    """
+    roots: list[ast_cache.ASTNode] = [node]
+    if title is not None:
+        roots.append(TextNode(title, "text"))
+    roots.extend(
+        TextNode(str(record.line), record.kind, record.url) for record in page_links
+    )
+    ast_cache.save(path, roots)
+
+
+def load_page_ast(path: Path) -> ParsedPage:
+    """
+    Loads a parsed page stored by ``save_page_ast``.
+
+    Returns:
+        ParsedPage: The <div> node of the page, its title and its links, which are not bound to
+            a source.
+
+    Raises:
+        OSError: If the file cannot be read.
+        InvalidCacheFile: If the file is not a valid page AST.
+    """
+    roots = ast_cache.load(path)
+    if not roots or not isinstance(roots[0], ParentNode):
+        raise InvalidCacheFile(f"{path} does not hold a page")
+    title = None
+    page_links = []
+    for position, extra in enumerate(roots[1:], start=1):
+        if not isinstance(extra, TextNode):
+            raise InvalidCacheFile(f"{path} holds more than one page")
+        if extra.text_type == "text" and position == 1:
+            title = extra.text
+        elif extra.text_type in LINK_TYPES and extra.url is not None:
+            if not extra.text.isdigit():
+                raise InvalidCacheFile(f"{path} holds an invalid link line")
+            page_links.append(
+                LinkRecord(extra.text_type, extra.url, None, int(extra.text))
+            )
+        else:
+            raise InvalidCacheFile(f"{path} holds an invalid {extra.text_type} node")
+    return roots[0], title, page_links
+
+
+def render_source_cached(
+    source_path: Path,
+    template: Template,
+    ast_dir: Optional[Path],
+    pool: Optional[LeafNodePool] = None,
+    pages: Optional[dict[str, ParsedPage]] = None,
+) -> tuple[str, bool]:
+    """
+    Renders a Markdown file like ``render_source``, going through the AST cache.
+
+    Arguments:
+        source_path (Path): The Markdown file.
+        template (Template): The page template, see ``render_page``.
+        ast_dir (Optional[Path]): The AST cache directory, where parsed documents are stored by
+            content hash, None to only use the in-memory cache.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+        pages (Optional[dict[str, ParsedPage]]): In-memory cache of parsed documents keyed by
+            content hash, looked up before the AST cache directory and filled by this call.
+
+    Returns:
+        tuple[str, bool]: The HTML of the page, and whether parsing was skipped because the
+                          parsed document was found in the cache.
+
+    The links of the page are stored along with its parsed document, and recorded into the
+    enabled LinkIndex whether the page is parsed or loaded.
+    """
+    instr = instrumentation.active()
+    with map_source(source_path) as data:
+        with instr.stage("io") if instr is not None else nullcontext():
+            input_hash = hash_bytes(data)
+            page = pages.get(input_hash) if pages is not None else None
+            if page is None and ast_dir is not None:
+                try:
+                    page = load_page_ast(ast_path_for(ast_dir, input_hash))
+                except (OSError, InvalidCacheFile):
+                    pass
+        cached = page is not None
+        if page is None:
+            recorder = LinkIndex()
+            with links.enabled(recorder), recorder.document(source_path.name):
+                node, title = markdown_to_page_node(data, pool)
+            page = node, title, recorder.page(source_path.name)
+            if ast_dir is not None:
+                save_page_ast(ast_path_for(ast_dir, input_hash), *page)
+        if pages is not None:
+            pages[input_hash] = page
+    node, title, page_links = page
+    index = links.active()
+    if index is not None:
+        for record in page_links:
+            index.record(record.kind, record.url, record.line)
+    return render_page_node(node, title, template, source_path.stem), cached
+
+
+def render_source(
+    source_path: Path, template: Template, pool: Optional[LeafNodePool] = None
+) -> str:
+    """
+    Renders a Markdown file into a full HTML page.
+
+    Arguments:
+        source_path (Path): The Markdown file.
+        template (Template): The page template, see ``render_page``.
+        pool (Optional[LeafNodePool]): Pool sharing the LeafNodes of identical inline elements.
+
+    Returns:
+        str: The HTML of the page. Pages without a level 1 heading are titled after their file name.
+    """
+    instr = instrumentation.active()
+    if instr is not None:
+        # Reading upfront keeps file I/O out of the parsing stages of the profile
+        with instr.stage("io"):
+            data = source_path.read_bytes()
+        return render_page(data, template, default_title=source_path.stem, pool=pool)
+    # Blocks are split straight from the mapped file, only their own lines are decoded
+    with map_source(source_path) as source:
+        return render_page(source, template, default_title=source_path.stem, pool=pool)
+
+
+def _render_job(job: tuple[str, str, Optional[str], Optional[str]]) -> RenderResult:
+    """
+    Renders one page inside a worker process, compressing it when the build compresses pages.
+
+    Arguments:
+        job (tuple[str, str, Optional[str], Optional[str]]): The relative and absolute paths of
+            the Markdown source, the content hash of its existing page and the content hash of
+            the page its existing compressed copy was made from, if any. A page identical to the
+            existing one is not sent back, and is not compressed again.
+
+    Returns:
+        RenderResult: The rendered page, or the reason why it could not be rendered.
+    """
+    source, source_path, previous_hash, compressed_hash = job
+    if _worker_template is None or _worker_pool is None:
+        raise RuntimeError("worker was not initialized")
+    hits, misses = _worker_pool.hits, _worker_pool.misses
+    profile = None
+    index = LinkIndex()
+    try:
+        with links.enabled(index), index.document(source) as page_links:
+            if _worker_profile:
+                with instrumentation.enabled(Instrumentation()) as instr:
+                    with instr.document(source):
+                        html, from_ast = _render_worker_page(Path(source_path))
+                profile = instr.snapshot()
+            else:
+                html, from_ast = _render_worker_page(Path(source_path))
+        data = html.encode("utf-8")
+        output_hash = hash_bytes(data)
+        compressed = None
+        compressed_unchanged = False
+        if (
+            _worker_compress_min_size is not None
+            and len(data) >= _worker_compress_min_size
+        ):
+            if output_hash == compressed_hash:
+                compressed_unchanged = True
+            else:
+                compressed = compress_page(data)
+    except Exception as exc:
+        return RenderResult(
+            source, error=f"worker {os.getpid()}: {type(exc).__name__}: {exc}"
+        )
+    return RenderResult(
+        source,
+        html=html if output_hash != previous_hash else None,
+        intern_hits=_worker_pool.hits - hits,
+        intern_misses=_worker_pool.misses - misses,
+        profile=profile,
+        from_ast=from_ast,
+        output_hash=output_hash,
+        compressed=compressed,
+        compressed_unchanged=compressed_unchanged,
+        links=page_links,
+    )
+
+
+def _render_worker_page(source_path: Path) -> tuple[str, bool]:
+    if _worker_ast_dir is None and _worker_pages is None:
+        return render_source(source_path, _worker_template, _worker_pool), False  # type: ignore[arg-type]
+    return render_source_cached(
+        source_path, _worker_template, _worker_ast_dir, _worker_pool, _worker_pages  # type: ignore[arg-type]
+    )
+
+
+@contextmanager
+def _profiled_io(profile: Optional[Instrumentation], source: str) -> Iterator[None]:
+    if profile is None:
+        yield
+        return
+    with profile.document(source), profile.stage("io"):
+        yield
+
+
+def _chunk_size(jobs_count: int, workers: int) -> int:
+    # A few chunks per worker keeps the pool balanced without paying IPC for every page
+    return max(1, jobs_count // (workers * CHUNKS_PER_WORKER))
+
+
+def build_site(
+    content_dir: Path,
+    output_dir: Path,
+    template_path: Path,
+    manifest_path: Optional[Path] = None,
+    jobs: int = 1,
+    profile: Optional[Instrumentation] = None,
+    ast_cache_dir: Optional[Path] = None,
+    use_ast_cache: bool = True,
+    compress: bool = False,
+    compress_min_size: int = COMPRESS_MIN_SIZE,
+    shard: Optional[Shard] = None,
+    state: Optional[BuildState] = None,
+) -> BuildReport:
+    """
+    Renders every Markdown file of a content directory into an HTML page, skipping unchanged pages.
+
+    Arguments:
+        content_dir (Path): The directory holding the Markdown sources.
+        output_dir (Path): The directory where pages are written, mirroring the content tree.
+        template_path (Path): The page template, see ``render_page``.
+        manifest_path (Optional[Path]): Where the build manifest is kept.
+            Defaults to a MANIFEST_NAME file inside the output directory.
+        jobs (int): How many processes render pages. With more than one, pages are distributed in
+            chunks to a process pool and only file paths and rendered HTML cross process boundaries.
+        profile (Optional[Instrumentation]): If provided, collects the time spent per stage and per
+            document, including the measurements taken inside worker processes.
+        ast_cache_dir (Optional[Path]): Where parsed documents are cached by content hash.
+            Defaults to an AST_CACHE_NAME directory inside the output directory.
+        use_ast_cache (bool): Whether pages are parsed through the AST cache. When the template
+            changes, every page is rendered again but unchanged sources are not parsed again.
+        compress (bool): Whether a gzip compressed copy of each page is written next to it, with
+            a GZIP_SUFFIX, for hosts serving precompressed files. Pages are compressed by the
+            processes rendering them, and a compressed copy is only rewritten when the content
+            of its page changed.
+        compress_min_size (int): The size in bytes from which pages are compressed.
+        shard (Optional[Shard]): Only builds the sources assigned to this shard, see
+            ``shard_for``. The manifest then only describes the pages of the shard, and the
+            output directories of every shard are combined by ``merge_shards``.
+        state (Optional[BuildState]): Caches kept from the previous builds of the site by a
+            long-running process. Pages are then rendered in this process whatever the number
+            of jobs, with the pool and the parsed pages of the state.
+
+    Returns:
+        BuildReport: Which pages were rendered, skipped or failed.
+
+    A page is skipped when its content hash matches the one recorded in the manifest and its output
+    still exists. Changing the template, the compression settings or upgrading repytile invalidates
+    every page. Pages that fail
+    to render are reported in ``BuildReport.errors`` and left out of the manifest, so the next build
+    retries them. Results are always handled in source path order, whatever the number of jobs.
+    """
+    if jobs < 1:
+        raise ValueError("jobs should be at least 1")
+    manifest_path = manifest_path or output_dir / MANIFEST_NAME
+    ast_dir = (ast_cache_dir or output_dir / AST_CACHE_NAME) if use_ast_cache else None
+    template = (
+        state.template(template_path)
+        if state is not None
+        else load_template(template_path)
+    )
+    template_hash = hash_bytes(template.source.encode("utf-8"))
+
+    min_size = compress_min_size if compress else None
+
+    previous = (
+        state.manifest(manifest_path)
+        if state is not None
+        else BuildManifest.load(manifest_path)
+    )
+    previous_pages = (
+        previous.pages if previous.is_compatible(template_hash, min_size) else {}
+    )
+    sources = find_sources(content_dir)
+    if shard is not None:
+        sources = [source for source in sources if shard.contains(source)]
+    manifest = BuildManifest(
+        version=__version__,
+        template_hash=template_hash,
+        compress_min_size=min_size,
+        shard=shard,
+        sources=sources if shard is not None else None,
+    )
+    report = BuildReport()
+    pending: dict[str, PageRecord] = {}
+
+    for source in sources:
+        with _profiled_io(profile, source):
+            if state is not None:
+                input_hash = state.hash_source(content_dir / source)
+            else:
+                with map_source(content_dir / source) as data:
+                    input_hash = hash_bytes(data)
+        record = PageRecord(input_hash=input_hash, output=output_path_for(source))
+        previous_record = previous_pages.get(source)
+        if (
+            previous_record is not None
+            and previous_record.input_hash == record.input_hash
+            and previous_record.output == record.output
+            and (output_dir / record.output).exists()
+            and (
+                not previous_record.compressed
+                or (output_dir / compressed_path_for(record.output)).exists()
+            )
+        ):
+            manifest.pages[source] = previous_record
+            manifest.links.set_page(source, previous.links.page(source))
+            report.skipped.append(source)
+        else:
+            pending[source] = record
+
+    # Content hashes of the existing pages, and of the pages the existing compressed copies were
+    # made from, as recorded when they were written. Files that render to the same content are
+    # kept as they are, without being read.
+    output_hashes: dict[str, str] = {}
+    compressed_hashes: dict[str, Optional[str]] = {}
+    for source, record in pending.items():
+        previous_record = previous.pages.get(source)
+        if previous_record is None or previous_record.output != record.output:
+            continue
+        if (
+            previous_record.output_hash is not None
+            and (output_dir / record.output).is_file()
+        ):
+            output_hashes[source] = previous_record.output_hash
+        if previous_record.compressed:
+            exists = (output_dir / compressed_path_for(record.output)).exists()
+            compressed_hashes[source] = previous_record.output_hash if exists else None
+
+    render_jobs = [
+        (
+            source,
+            str(content_dir / source),
+            output_hashes.get(source),
+            compressed_hashes.get(source),
+        )
+        for source in pending
+    ]
+    initargs = (
+        str(template_path),
+        profile is not None,
+        _optional_str(ast_dir),
+        min_size,
+    )
+    if state is not None or jobs == 1 or len(render_jobs) <= 1:
+        if state is not None:
+            _set_worker_state(template, state.pool, *initargs[1:], pages=state.pages)
+        else:
+            _init_worker(*initargs)
+        results: Iterable[RenderResult] = map(_render_job, render_jobs)
+        _write_results(
+            results, pending, compressed_hashes, output_dir, manifest, report, profile
+        )
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=initargs
+        ) as executor:
+            results = executor.map(
+                _render_job, render_jobs, chunksize=_chunk_size(len(render_jobs), jobs)
+            )
+            _write_results(
+                results,
+                pending,
+                compressed_hashes,
+                output_dir,
+                manifest,
+                report,
+                profile,
+            )
+
+    # Skipped pages were indexed first, the index follows the source path order like the report
+    manifest.links = LinkIndex.from_pages(
+        (source, manifest.links.page(source)) for source in sorted(manifest.pages)
+    )
+    input_hashes = {record.input_hash for record in manifest.pages.values()}
+    if state is not None:
+        state.save_manifest(manifest_path, manifest)
+        state.prune((content_dir / source for source in sources), input_hashes)
+    else:
+        manifest.save(manifest_path)
+    report.links = manifest.links
+    if ast_dir is not None:
+        _prune_ast_cache(ast_dir, input_hashes)
+    return report
+
+
+def merge_shards(
+    shard_dirs: Sequence[Path],
+    output_dir: Path,
+    manifest_path: Optional[Path] = None,
+    content_dir: Optional[Path] = None,
+) -> BuildManifest:
+    """
+    Combines the output directories of a sharded build into the output directory of the site.
+
+    Arguments:
+        shard_dirs (Sequence[Path]): The output directories of the shards, each holding the
+            partial manifest of its shard under MANIFEST_NAME.
+        output_dir (Path): The directory where the pages of every shard are copied.
+        manifest_path (Optional[Path]): Where the merged manifest is written.
+            Defaults to a MANIFEST_NAME file inside the output directory.
+        content_dir (Optional[Path]): If provided, also checks that the shards cover every
+            Markdown source of this directory.
+
+    Returns:
+        BuildManifest: The merged manifest, describing the whole site like a build without
+                       shards, so the next build of the output directory reuses its pages.
+
+    Raises:
+        ShardMergeError: If a shard is missing or given twice, the shards come from different
+            builds, a page is missing or built by several shards, or an output file is missing.
+            Every problem is listed and nothing is copied.
+    """
+    problems: list[str] = []
+    manifests: list[tuple[Path, BuildManifest]] = []
+    for shard_dir in shard_dirs:
+        manifest = BuildManifest.load(shard_dir / MANIFEST_NAME)
+        if manifest.shard is None:
+            problems.append(f"{shard_dir}: no shard manifest")
+        else:
+            manifests.append((shard_dir, manifest))
+    if not manifests:
+        raise ShardMergeError("\n".join(problems or ["No shard to merge"]))
+
+    first = manifests[0][1]
+    count = first.shard.count  # type: ignore[union-attr]
+    numbers: dict[int, Path] = {}
+    owners: dict[str, int] = {}
+    for shard_dir, manifest in manifests:
+        shard: Shard = manifest.shard  # type: ignore[assignment]
+        if shard.count != count:
+            problems.append(f"{shard_dir}: shard {shard} of a build split in {count}")
+            continue
+        if (
+            manifest.version,
+            manifest.template_hash,
+            manifest.compress_min_size,
+        ) != (first.version, first.template_hash, first.compress_min_size):
+            problems.append(
+                f"{shard_dir}: built with another version, template or compression"
+            )
+        if shard.number in numbers:
+            problems.append(
+                f"{shard_dir}: shard {shard} already given by {numbers[shard.number]}"
+            )
+            continue
+        numbers[shard.number] = shard_dir
+        for source in manifest.sources:
+            if not shard.contains(source):
+                problems.append(f"{source}: does not belong to shard {shard}")
+            elif source not in manifest.pages:
+                problems.append(f"{source}: not built by shard {shard}")
+        for source, record in manifest.pages.items():
+            if source in owners:
+                problems.append(
+                    f"{source}: built by shards {owners[source]}/{count} and {shard}"
+                )
+                continue
+            owners[source] = shard.number
+            paths = [record.output]
+            if record.compressed:
+                paths.append(compressed_path_for(record.output))
+            for path in paths:
+                if not (shard_dir / path).is_file():
+                    problems.append(f"{source}: {path} missing from {shard_dir}")
+    for number in range(1, count + 1):
+        if number not in numbers:
+            problems.append(f"shard {number}/{count} is missing")
+    if content_dir is not None:
+        for source in find_sources(content_dir):
+            if source not in owners:
+                problems.append(f"{source}: not built by any shard")
+    if problems:
+        raise ShardMergeError("\n".join(problems))
+
+    merged = BuildManifest(
+        version=first.version,
+        template_hash=first.template_hash,
+        compress_min_size=first.compress_min_size,
+    )
+    page_links: dict[str, list[LinkRecord]] = {}
+    for shard_dir, manifest in manifests:
+        for source, record in manifest.pages.items():
+            paths = [record.output]
+            if record.compressed:
+                paths.append(compressed_path_for(record.output))
+            for path in paths:
+                destination = output_dir / path
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(shard_dir / path, destination)
+            merged.pages[source] = record
+            page_links[source] = manifest.links.page(source)
+    # Pages and links follow the source path order, like the manifest of a build without shards
+    merged.pages = dict(sorted(merged.pages.items()))
+    merged.links = LinkIndex.from_pages(sorted(page_links.items()))
+    merged.save(manifest_path or output_dir / MANIFEST_NAME)
+    return merged
+
+
+def find_broken_links(
+    index: LinkIndex, content_dir: Path, output_dir: Path
+) -> list[LinkRecord]:
+    """
+    Finds the links and images pointing to paths missing from a built site.
+
+    Arguments:
+        index (LinkIndex): The links of the site, such as ``BuildReport.links``.
+        content_dir (Path): The directory holding the Markdown sources and the assets.
+        output_dir (Path): The directory holding the rendered pages.
+
+    Returns:
+        list[LinkRecord]: The records with a missing target, see ``LinkIndex.broken``.
+
+    A target exists if it is a file of the output directory, or, for the images that
+    ``copy_assets`` copies, of the content directory. Other files of the content directory, such
+    as Markdown sources, are not part of the built site. Only the targets of the index are looked
+    up, pages are never read again.
+    """
+    assets = index.assets()
+
+    def exists(target: str) -> bool:
+        if target.startswith("../"):
+            return False
+        if (output_dir / target).is_file():
+            return True
+        return target in assets and (content_dir / target).is_file()
+
+    return index.broken(exists)
+
+
+def copy_assets(index: LinkIndex, content_dir: Path, output_dir: Path) -> list[str]:
+    """
+    Copies the images referenced by the pages from the content directory to the output directory.
+
+    Arguments:
+        index (LinkIndex): The links of the site, such as ``BuildReport.links``.
+        content_dir (Path): The directory holding the assets.
+        output_dir (Path): The directory holding the rendered pages.
+
+    Returns:
+        list[str]: The sorted paths of the copied assets. Assets whose copy has the same size and
+                   modification time are left alone, missing ones are reported by
+                   ``find_broken_links``.
+    """
+    copied = []
+    for target in sorted(index.assets()):
+        source = content_dir / target
+        if target.startswith("../") or not source.is_file():
+            continue
+        destination = output_dir / target
+        source_stat = source.stat()
+        try:
+            destination_stat = destination.stat()
+        except FileNotFoundError:
+            pass
+        else:
+            if (destination_stat.st_size, destination_stat.st_mtime_ns) == (
+                source_stat.st_size,
+                source_stat.st_mtime_ns,
+            ):
+                continue
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, destination)
+        copied.append(target)
+    return copied
+
+
+def _optional_str(path: Optional[Path]) -> Optional[str]:
+    return str(path) if path is not None else None
+
+
+def _prune_ast_cache(ast_dir: Path, keep: set[str]) -> None:
+    """
+    Deletes the cached documents of sources that changed or disappeared.
+    """
+    if not ast_dir.is_dir():
+        return
+    for path in ast_dir.iterdir():
+        if path.suffix == ast_cache.AST_SUFFIX and path.stem not in keep:
+            path.unlink(missing_ok=True)
+
+
+def _write_results(
+    results: Iterable[RenderResult],
+    pending: dict[str, PageRecord],
+    compressed_hashes: dict[str, Optional[str]],
+    output_dir: Path,
+    manifest: BuildManifest,
+    report: BuildReport,
+    profile: Optional[Instrumentation],
+) -> None:
+    with OutputWriter(output_dir) as writer:
+        for result in results:
+            if profile is not None and result.profile is not None:
+                profile.merge(result.profile)
+            report.intern_hits += result.intern_hits
+            report.intern_misses += result.intern_misses
+            if result.from_ast:
+                report.ast_hits += 1
+            if result.error is not None:
+                report.errors[result.source] = result.error
+                continue
+            record = pending[result.source]
+            record.output_hash = result.output_hash
+            compressed = compressed_path_for(record.output)
+            with _profiled_io(profile, result.source):
+                if result.html is None:
+                    # Identical to the existing page, which was not sent back
+                    writer.keep()
+                else:
+                    writer.write(record.output, result.html.encode("utf-8"))
+                if result.compressed is not None:
+                    writer.write(compressed, result.compressed)
+                    record.compressed = True
+                    report.compressed += 1
+                elif result.compressed_unchanged:
+                    writer.keep()
+                    record.compressed = True
+                    report.compressed_unchanged += 1
+                elif result.source in compressed_hashes:
+                    # The page fell below the threshold or the build stopped compressing
+                    (output_dir / compressed).unlink(missing_ok=True)
+            manifest.pages[result.source] = record
+            manifest.links.set_page(result.source, result.links)
+            report.rendered.append(result.source)
+    report.files_written += writer.written
+    report.files_unchanged += writer.unchanged
@@ -0,0 +1,35 @@
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+from repytile.block_parser import MarkdownBuffer
+
+
+@contextmanager
+def map_source(path: Union[str, Path]) -> Iterator[MarkdownBuffer]:
+    """
+    Memory-maps a Markdown file, to be parsed straight from its bytes.
+
+    Passed to ``iter_blocks`` or any function built on it, the file is split into blocks on byte
+    offsets and only the lines of each block are decoded, so parsing never holds the whole file
+    as a str and peak memory stays near the size of the largest block. The mapped bytes can also
+    be hashed without being copied.
+
+    Arguments:
+        path (Union[str, Path]): The Markdown file.
+
+    Returns:
+        Iterator[MarkdownBuffer]: A context manager giving the mapped file, or empty bytes for an
+                                  empty file, which cannot be mapped. The map is closed on exit.
+
+    Raises:
+        OSError: If the file cannot be opened or mapped.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
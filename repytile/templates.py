@@ -0,0 +1,146 @@
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Union
+
+from repytile.block_elements import HTMLNode, SupportsWrite
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Values of a template slot, nodes are rendered in place
+SlotValue = Union[str, HTMLNode]
+
+
+class Template:
+    __slots__ = ("source", "_segments", "_slots")
+
+    def __init__(self, source: str) -> None:
+        """
+        Initialize a Template object, parsing the template source once into literal segments and slots.
+
+        Parameters:
+            source (str): The template text, where placeholders such as "{{ Title }}" or
+                "{{ Content }}" mark the slots filled on render.
+
+        Rendering only joins the precomputed segments with the slot values, the template text is
+        never scanned again.
+        """
+        self.source = source
+        # Literal segments surround the slots: segments[i], slots[i], segments[i + 1], ...
+        self._segments: list[str] = []
+        self._slots: list[tuple[str, str]] = []
+        position = 0
+        for placeholder in PLACEHOLDER_PATTERN.finditer(source):
+            self._segments.append(source[position : placeholder.start()])
+            self._slots.append((placeholder.group(1), placeholder.group(0)))
+            position = placeholder.end()
+        self._segments.append(source[position:])
+
+    @property
+    def placeholders(self) -> list[str]:
+        """
+        The names of the slots of the template, in order of appearance.
+        """
+        return [name for name, _ in self._slots]
+
+    def _iter_chunks(self, values: Mapping[str, SlotValue]) -> list[str | HTMLNode]:
+        chunks: list[str | HTMLNode] = []
+        for segment, (name, placeholder) in zip(self._segments, self._slots):
+            chunks.append(segment)
+            # Placeholders without a value are kept as they are
+            chunks.append(values.get(name, placeholder))
+        chunks.append(self._segments[-1])
+        return chunks
+
+    def render(self, values: Mapping[str, SlotValue]) -> str:
+        """
+        Renders the template with the given slot values.
+
+        Arguments:
+            values (Mapping[str, SlotValue]): The value of each slot, keyed by placeholder name.
+                Strings are inserted verbatim and nodes are rendered into HTML.
+
+        Returns:
+            str: The rendered template.
+        """
+        return "".join(
+            chunk if isinstance(chunk, str) else "".join(chunk.iter_html())
+            for chunk in self._iter_chunks(values)
+        )
+
+    def iter_render(
+        self, values: Mapping[str, Union[SlotValue, Iterable[str]]]
+    ) -> Iterator[str]:
+        """
+        Lazily renders the template as a sequence of string chunks.
+
+        Arguments:
+            values (Mapping[str, Union[SlotValue, Iterable[str]]]): The value of each slot, keyed
+                by placeholder name. Besides strings and nodes, a slot value can be any iterable
+                of HTML chunks, only consumed when the slot is reached, so the segments before
+                it are produced before any of its chunks is computed.
+
+        Returns:
+            Iterator[str]: The chunks that, once concatenated, form the rendered template.
+        """
+        for segment, (name, placeholder) in zip(self._segments, self._slots):
+            if segment:
+                yield segment
+            value = values.get(name, placeholder)
+            if isinstance(value, str):
+                yield value
+            elif isinstance(value, HTMLNode):
+                yield from value.iter_html()
+            else:
+                yield from value
+        if self._segments[-1]:
+            yield self._segments[-1]
+
+    def render_to(self, writer: SupportsWrite, values: Mapping[str, SlotValue]) -> None:
+        """
+        Writes the rendered template into a file-like object.
+
+        Arguments:
+            writer (SupportsWrite): Any object exposing a ``write(str)`` method.
+            values (Mapping[str, SlotValue]): The value of each slot, keyed by placeholder name.
+                Nodes are streamed into the writer with ``HTMLNode.render_to``, without building
+                their whole HTML in memory.
+        """
+        for chunk in self._iter_chunks(values):
+            if isinstance(chunk, str):
+                if chunk:
+                    writer.write(chunk)
+            else:
+                chunk.render_to(writer)
+
+    def __repr__(self) -> str:
+        return f"Template(placeholders={self.placeholders})"
+
+
+# Parsed templates keyed by path, along with the modification time and size they were parsed at
+_TEMPLATE_CACHE: dict[str, tuple[int, int, Template]] = {}
+
+
+def load_template(path: Union[str, Path]) -> Template:
+    """
+    Loads and parses a template file, reusing the parsed template while the file is unchanged.
+
+    Arguments:
+        path (Union[str, Path]): The template file.
+
+    Returns:
+        Template: The parsed template. The file is read and parsed again only when its
+                  modification time or size changed since the last call.
+    """
+    key = os.fspath(path)
+    stat = os.stat(key)
+    cached = _TEMPLATE_CACHE.get(key)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    template = Template(Path(key).read_text(encoding="utf-8"))
+    _TEMPLATE_CACHE[key] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
+
+
+def clear_template_cache() -> None:
+    _TEMPLATE_CACHE.clear()
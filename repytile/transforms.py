@@ -0,0 +1,356 @@
+import re
+from typing import Callable, Iterable, Optional, Sequence
+from urllib.parse import urlsplit
+
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+
+_SLUG_DROPPED = re.compile(r"[^\w\s-]")
+_SLUG_SEPARATORS = re.compile(r"[\s_-]+")
+
+
+class TreeWalk:
+    __slots__ = ("root", "node", "parent", "index", "depth", "_skip")
+
+    def __init__(self, root: HTMLNode) -> None:
+        """
+        Initialize a TreeWalk object, the position of ``apply_transforms`` in the tree, handed to
+        every hook.
+
+        Parameters:
+            root (HTMLNode): The root of the tree, replaced if a hook replaces the root node.
+
+        The node, its parent, its index among the children of the parent and its depth, the root
+        being at depth 0, are updated before each hook call.
+        """
+        self.root = root
+        self.node = root
+        self.parent: Optional[ParentNode] = None
+        self.index = 0
+        self.depth = 0
+        self._skip = False
+
+    def set_prop(self, name: str, value: str) -> None:
+        """
+        Sets a property of the current node.
+
+        LeafNodes can be shared by several trees through a LeafNodePool, so they are replaced by an
+        updated copy. ParentNodes are updated in place. Either way, the cached HTML of the node and
+        of its ancestors is dropped.
+
+        Parameters:
+            name (str): The name of the attribute.
+            value (str): The value of the attribute.
+        """
+        node = self.node
+        if isinstance(node, LeafNode):
+            props = dict(node.props) if node.props else {}
+            props[name] = value
+            self.replace(LeafNode(node.tag, node.value, None, props))
+        else:
+            node.set_prop(name, value)
+
+    def replace(self, node: HTMLNode) -> None:
+        """
+        Replaces the current node in its parent. The hooks of the following transforms, and the
+        traversal of the children, see the new node.
+        """
+        if self.parent is None:
+            self.root = node
+        else:
+            self.parent.replace_child(self.index, node)
+        self.node = node
+
+    def skip_children(self) -> None:
+        """
+        Leaves the children of the current node out of the traversal, for every transform.
+        """
+        self._skip = True
+
+
+class Transform:
+    """
+    Transform is the base class of the passes run by ``apply_transforms``.
+
+    Subclasses override ``enter``, called before the children of a node are visited, and ``exit``,
+    called after them, and update the tree through the TreeWalk. Hooks are only called for the
+    nodes whose tag is in ``tags``, or for every node if ``tags`` is None. ``start`` and ``finish``
+    are called before and after each traversal, so a transform can be reused across documents.
+    """
+
+    __slots__ = ()
+
+    tags: Optional[frozenset[str]] = None
+
+    def start(self, root: HTMLNode) -> None:
+        pass
+
+    def enter(self, walk: TreeWalk) -> None:
+        pass
+
+    def exit(self, walk: TreeWalk) -> None:
+        pass
+
+    def finish(self, root: HTMLNode) -> None:
+        pass
+
+
+_Hook = Callable[[TreeWalk], None]
+
+
+def _hook_table(
+    transforms: Sequence[Transform], name: str
+) -> tuple[dict[Optional[str], list[_Hook]], list[_Hook]]:
+    # Maps each tag to the hooks called on it, in registration order. Hooks left to the base
+    # class do nothing and are not called at all.
+    overriding = [
+        transform
+        for transform in transforms
+        if getattr(type(transform), name) is not getattr(Transform, name)
+    ]
+    untagged: list[_Hook] = [
+        getattr(transform, name) for transform in overriding if transform.tags is None
+    ]
+    tags = {tag for transform in overriding for tag in transform.tags or ()}
+    table: dict[Optional[str], list[_Hook]] = {
+        tag: [
+            getattr(transform, name)
+            for transform in overriding
+            if transform.tags is None or tag in transform.tags
+        ]
+        for tag in tags
+    }
+    return table, untagged
+
+
+def apply_transforms(root: HTMLNode, transforms: Sequence[Transform]) -> HTMLNode:
+    """
+    Runs several transforms over a tree in a single traversal.
+
+    Every node is visited once, in document order, without recursion. On each node the ``enter``
+    hooks of the transforms run in registration order, then its children are visited, then the
+    ``exit`` hooks run in registration order. A transform sees the changes made by the transforms
+    registered before it, so N passes cost one walk of the tree instead of N.
+
+    Arguments:
+        root (HTMLNode): The root of the tree.
+        transforms (Sequence[Transform]): The passes to run.
+
+    Returns:
+        HTMLNode: The root of the tree, a new node if a hook replaced it.
+    """
+    for transform in transforms:
+        transform.start(root)
+    enter_table, enter_untagged = _hook_table(transforms, "enter")
+    exit_table, exit_untagged = _hook_table(transforms, "exit")
+    has_exit = bool(exit_table or exit_untagged)
+    walk = TreeWalk(root)
+
+    # Frames hold a node, its parent, its index, its depth and whether it is being exited
+    stack: list[tuple[HTMLNode, Optional[ParentNode], int, int, bool]] = [
+        (root, None, 0, 0, False)
+    ]
+    while stack:
+        node, parent, index, depth, exiting = stack.pop()
+        walk.node = node
+        walk.parent = parent
+        walk.index = index
+        walk.depth = depth
+        if exiting:
+            for hook in exit_table.get(node.tag, exit_untagged):
+                hook(walk)
+            continue
+
+        walk._skip = False
+        for hook in enter_table.get(node.tag, enter_untagged):
+            hook(walk)
+        node = walk.node
+        if has_exit:
+            stack.append((node, parent, index, depth, True))
+        children = node.children
+        if children and not walk._skip and isinstance(node, ParentNode):
+            depth += 1
+            for child_index in range(len(children) - 1, -1, -1):
+                stack.append((children[child_index], node, child_index, depth, False))
+
+    for transform in transforms:
+        transform.finish(walk.root)
+    return walk.root
+
+
+def text_content(node: HTMLNode) -> str:
+    """
+    Returns the text of a node and its descendants, without any markup.
+    """
+    parts: list[str] = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.children:
+            stack.extend(reversed(current.children))
+        elif current.value is not None and current.tag != "img":
+            parts.append(f"{current.value}")
+    return "".join(parts)
+
+
+def slugify(text: str) -> str:
+    """
+    Turns a heading text into an identifier, such as 'Getting Started!' into 'getting-started'.
+    """
+    slug = _SLUG_SEPARATORS.sub("-", _SLUG_DROPPED.sub("", text.lower()))
+    return slug.strip("-") or "section"
+
+
+class HeadingIds(Transform):
+    """
+    HeadingIds gives every heading a unique id attribute, derived from its text, and collects
+    the headings of the document to build a table of contents.
+    """
+
+    __slots__ = ("levels", "tags", "headings", "_used")
+
+    def __init__(self, levels: Iterable[int] = range(1, 7)) -> None:
+        """
+        Initialize a HeadingIds object.
+
+        Parameters:
+            levels (Iterable[int]): The heading levels given an id, all of them by default.
+        """
+        self.levels = frozenset(levels)
+        self.tags = frozenset(f"h{level}" for level in self.levels)
+        # Level, id and text of each heading, in document order
+        self.headings: list[tuple[int, str, str]] = []
+        self._used: set[str] = set()
+
+    def start(self, root: HTMLNode) -> None:
+        self.headings = []
+        self._used = set()
+
+    def enter(self, walk: TreeWalk) -> None:
+        node = walk.node
+        text = text_content(node)
+        props = node.props or {}
+        heading_id = props.get("id")
+        if heading_id is None:
+            base = heading_id = slugify(text)
+            suffix = 0
+            while heading_id in self._used:
+                suffix += 1
+                heading_id = f"{base}-{suffix}"
+            walk.set_prop("id", heading_id)
+        self._used.add(heading_id)
+        self.headings.append((int(node.tag[1:]), heading_id, text))  # type: ignore[index]
+
+    def table_of_contents(self) -> Optional[ParentNode]:
+        """
+        Builds nested <ul> lists linking to the headings found by the last traversal.
+
+        Returns:
+            Optional[ParentNode]: The outer <ul> node, None if the document has no headings.
+        """
+        if not self.headings:
+            return None
+        root = ParentNode(tag="ul", children=[])
+        # Lists currently open, with the level of their headings
+        lists: list[tuple[int, ParentNode]] = [(self.headings[0][0], root)]
+        for level, heading_id, text in self.headings:
+            while len(lists) > 1 and level < lists[-1][0]:
+                lists.pop()
+            current_level, current = lists[-1]
+            if level > current_level and current.children:
+                nested = ParentNode(tag="ul", children=[])
+                current.children[-1].append_child(nested)  # type: ignore[attr-defined]
+                lists.append((level, nested))
+                current = nested
+            link = LeafNode("a", text, None, {"href": f"#{heading_id}"})
+            current.append_child(ParentNode(tag="li", children=[link]))
+        return root
+
+
+class ExternalLinks(Transform):
+    """
+    ExternalLinks sets the rel attribute, and optionally the target attribute, of links
+    pointing outside of the site.
+    """
+
+    __slots__ = ("rel", "target", "site_hosts")
+
+    tags = frozenset({"a"})
+
+    def __init__(
+        self,
+        rel: str = "noopener noreferrer",
+        target: Optional[str] = None,
+        site_hosts: Iterable[str] = (),
+    ) -> None:
+        """
+        Initialize an ExternalLinks object.
+
+        Parameters:
+            rel (str): The value of the rel attribute.
+            target (Optional[str]): The value of the target attribute, such as '_blank',
+                None to leave it unset.
+            site_hosts (Iterable[str]): The host names of the site, links to them are internal.
+        """
+        self.rel = rel
+        self.target = target
+        self.site_hosts = frozenset(site_hosts)
+
+    def enter(self, walk: TreeWalk) -> None:
+        props = walk.node.props
+        if not props or "href" not in props:
+            return
+        parts = urlsplit(props["href"])
+        if parts.scheme not in ("http", "https") or parts.hostname in self.site_hosts:
+            return
+        if props.get("rel") != self.rel:
+            walk.set_prop("rel", self.rel)
+        if self.target is not None and props.get("target") != self.target:
+            walk.set_prop("target", self.target)
+
+
+class LazyImages(Transform):
+    """
+    LazyImages lets browsers defer loading images until they are about to be displayed.
+    """
+
+    __slots__ = ()
+
+    tags = frozenset({"img"})
+
+    def enter(self, walk: TreeWalk) -> None:
+        props = walk.node.props
+        if not props or "loading" not in props:
+            walk.set_prop("loading", "lazy")
+
+
+class RewriteUrls(Transform):
+    """
+    RewriteUrls maps the URLs of links and images, for instance to point '.md' links to the
+    rendered pages or images to a CDN.
+    """
+
+    __slots__ = ("rewrite",)
+
+    tags = frozenset({"a", "img"})
+
+    def __init__(self, rewrite: Callable[[str], str]) -> None:
+        """
+        Initialize a RewriteUrls object.
+
+        Parameters:
+            rewrite (Callable[[str], str]): Called with each href and src value, returns the
+                new URL.
+        """
+        self.rewrite = rewrite
+
+    def enter(self, walk: TreeWalk) -> None:
+        props = walk.node.props
+        if not props:
+            return
+        name = "href" if walk.node.tag == "a" else "src"
+        url = props.get(name)
+        if url is None:
+            return
+        rewritten = self.rewrite(url)
+        if rewritten != url:
+            walk.set_prop(name, rewritten)
@@ -0,0 +1,151 @@
+import pytest
+
+from repytile.arena import NO_NODE, NodeArena
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.block_parser import markdown_to_html_node
+from repytile.escaping import Markup
+
+
+def _sample_tree() -> ParentNode:
+    return ParentNode(
+        tag="div",
+        children=[
+            ParentNode(
+                tag="p",
+                children=[
+                    LeafNode(None, "Normal text "),
+                    LeafNode("b", "bold", props={}),
+                    LeafNode("a", "link", props={"href": "/a.html", "class": "x"}),
+                ],
+                props={"class": "para"},
+            ),
+            LeafNode("img", "", props={"src": "/a.png", "alt": "a"}),
+        ],
+    )
+
+
+def test_from_node_renders_like_the_object_tree() -> None:
+    tree = _sample_tree()
+
+    arena = NodeArena.from_node(tree)
+
+    assert len(arena) == 6
+    assert arena.to_html() == tree.to_html()
+
+
+def test_markdown_document_round_trips() -> None:
+    tree = markdown_to_html_node(
+        "# Title\n\nSome **bold** and [a link](/x)\n\n* one\n* two\n\n```py\ncode\n```"
+    )
+
+    arena = NodeArena.from_node(tree)
+
+    assert arena.to_html() == tree.to_html()
+    assert arena.to_node().to_html() == tree.to_html()
+
+
+def test_to_node_rebuilds_structure_and_props() -> None:
+    rebuilt = NodeArena.from_node(_sample_tree()).to_node()
+
+    assert isinstance(rebuilt, ParentNode)
+    paragraph, image = rebuilt.children  # type: ignore[misc]
+    assert paragraph.props == {"class": "para"}
+    assert paragraph.parent is rebuilt
+    assert [child.tag for child in paragraph.children] == [None, "b", "a"]
+    assert paragraph.children[1].props == {}
+    assert paragraph.children[0].props is None
+    assert isinstance(image, LeafNode)
+    assert image.props == {"src": "/a.png", "alt": "a"}
+
+
+def test_builder_links_children_in_order() -> None:
+    arena = NodeArena()
+    root = arena.add_parent("ul")
+    first = arena.add_parent("li", parent=root)
+    arena.add_leaf(None, "one", parent=first)
+    second = arena.add_parent("li", parent=root)
+    arena.add_leaf("i", "two", parent=second)
+
+    assert list(arena.children(root)) == [first, second]
+    assert arena.parent(first) == root
+    assert arena.parent(root) == NO_NODE
+    assert arena.is_leaf(first) is False
+    assert arena.to_html() == "<ul><li>one</li><li><i>two</i></li></ul>"
+    assert arena.to_html(second) == "<li><i>two</i></li>"
+
+
+def test_tags_and_props_are_interned() -> None:
+    arena = NodeArena()
+    root = arena.add_parent("p")
+    for index in range(100):
+        arena.add_leaf("a", str(index), {"href": "/same"}, parent=root)
+
+    assert len(arena._strings) == 2
+    assert len(arena._prop_sets) == 1
+    # Props are returned as copies, the shared set cannot be modified
+    props = arena.props(1)
+    props["href"] = "/other"  # type: ignore[index]
+    assert arena.props(2) == {"href": "/same"}
+
+
+def test_leaf_cannot_have_children() -> None:
+    arena = NodeArena()
+    leaf = arena.add_leaf("b", "bold")
+
+    with pytest.raises(ValueError):
+        arena.add_leaf(None, "text", parent=leaf)
+
+
+@pytest.mark.parametrize(
+    "build, message",
+    [
+        pytest.param(
+            lambda arena: arena.add_leaf(None, "x", parent=arena.add_parent(None)),
+            "should have a tag value",
+            id="parent-without-tag",
+        ),
+        pytest.param(
+            lambda arena: arena.add_parent("div"),
+            "should have at least one children",
+            id="parent-without-children",
+        ),
+    ],
+)
+def test_invalid_parents_raise_like_parent_node(build, message: str) -> None:
+    arena = NodeArena()
+    build(arena)
+
+    with pytest.raises(ValueError, match=message):
+        arena.to_html()
+
+
+def test_unsupported_nodes_are_rejected() -> None:
+    with pytest.raises(TypeError):
+        NodeArena.from_node(HTMLNode("p", "text"))
+
+
+def test_deep_documents_do_not_recurse() -> None:
+    node: HTMLNode = LeafNode("b", "deep")
+    for _ in range(10_000):
+        node = ParentNode(tag="div", children=[node])
+
+    arena = NodeArena.from_node(node)
+
+    html = arena.to_html()
+    assert html.startswith("<div>" * 10_000 + "<b>deep</b>")
+    assert isinstance(arena.to_node(), ParentNode)
+
+
+def test_values_and_attributes_are_escaped_like_nodes() -> None:
+    tree = ParentNode(
+        tag="p",
+        children=[
+            LeafNode(None, "a < b & "),
+            LeafNode("a", "<link>", props={"href": '/?a=1&b="2"'}),
+            LeafNode("span", Markup("<i>raw</i>")),
+            LeafNode("td", "cell", props={"colspan": 2, "title": None}),
+        ],
+    )
+
+    assert NodeArena.from_node(tree).to_html() == tree.to_html()
+    assert "&lt;link&gt;" in tree.to_html()
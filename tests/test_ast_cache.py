@@ -0,0 +1,151 @@
+from pathlib import Path
+
+import pytest
+
+from repytile import ast_cache
+from repytile.ast_cache import dumps, load, loads, save
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.block_parser import markdown_to_html_node
+from repytile.escaping import Markup
+from repytile.exceptions import InvalidCacheFile
+from repytile.inline_elements import TextNode
+
+
+def _describe(node):
+    """
+    Lists the fields of a tree, so two trees can be compared without an __eq__ on nodes.
+    """
+    if isinstance(node, TextNode):
+        return ("TextNode", node.text, node.text_type, node.url)
+    return (
+        type(node).__name__,
+        node.tag,
+        node.value,
+        type(node.value).__name__,
+        node.props,
+        [_describe(child) for child in node.children or ()],
+    )
+
+
+SAMPLES = [
+    pytest.param(LeafNode(None, "raw text"), id="raw-leaf"),
+    pytest.param(LeafNode("b", "bold", props={}), id="empty-props"),
+    pytest.param(LeafNode("svg", Markup("<circle />")), id="markup"),
+    pytest.param(LeafNode("p", None), id="no-value"),
+    pytest.param(
+        LeafNode("img", "", props={"src": "/a.png", "alt": "ünïcode ✓"}), id="props"
+    ),
+    pytest.param(TextNode("link", "link", "https://example.com"), id="text-node"),
+    pytest.param(TextNode("plain", "text"), id="text-node-without-url"),
+    pytest.param(ParentNode(tag="div"), id="parent-without-children"),
+    pytest.param(
+        markdown_to_html_node(
+            "# Title\n\nSome **bold** and [link](/x)\n\n* a\n* b\n\n```py\ncode\n```"
+        ),
+        id="document",
+    ),
+]
+
+
+@pytest.mark.parametrize("node", SAMPLES)
+def test_round_trip(node) -> None:
+    (loaded,) = loads(dumps([node]))
+
+    assert _describe(loaded) == _describe(node)
+
+
+def test_several_roots_keep_their_order() -> None:
+    roots = [LeafNode("b", "1"), ParentNode("p", children=[LeafNode(None, "2")])]
+    roots.append(TextNode("3", "text"))
+
+    loaded = loads(dumps(roots))
+
+    assert [_describe(node) for node in loaded] == [_describe(node) for node in roots]
+
+
+def test_loaded_tree_renders_and_links_parents() -> None:
+    tree = markdown_to_html_node("Some *text*\n\n> quote")
+
+    (loaded,) = loads(dumps([tree]))
+
+    assert loaded.to_html() == tree.to_html()
+    assert all(child.parent is loaded for child in loaded.children)
+
+
+def test_strings_are_stored_once() -> None:
+    tree = ParentNode(tag="ul", children=[LeafNode("li", "same") for _ in range(100)])
+
+    data = dumps([tree])
+
+    assert data.count(b"same") == 1
+    # A flag byte and two string indices per leaf
+    assert len(data) < 100 * 3 + 50
+
+
+def test_deep_trees_do_not_recurse() -> None:
+    node: HTMLNode = LeafNode("b", "deep")
+    for _ in range(10_000):
+        node = ParentNode(tag="div", children=[node])
+
+    (loaded,) = loads(dumps([node]))
+
+    depth = 0
+    while isinstance(loaded, ParentNode):
+        loaded = loaded.children[0]
+        depth += 1
+    assert depth == 10_000
+
+
+def test_save_and_load_through_mmap(tmp_path: Path) -> None:
+    tree = markdown_to_html_node("# Title\n\ntext")
+    path = tmp_path / "cache" / "page.ast"
+
+    save(path, [tree])
+
+    (loaded,) = load(path)
+    assert loaded.to_html() == tree.to_html()
+    assert [p.name for p in path.parent.iterdir()] == ["page.ast"]
+
+
+def test_unsupported_nodes_are_rejected() -> None:
+    with pytest.raises(TypeError):
+        dumps([HTMLNode("p", "text")])
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(b"", id="empty"),
+        pytest.param(b"not an ast file", id="wrong-magic"),
+        pytest.param(dumps([LeafNode("b", "bold")])[:-2], id="truncated"),
+        pytest.param(dumps([LeafNode("b", "bold")]) + b"\x00", id="trailing-data"),
+    ],
+)
+def test_invalid_data_raises(data: bytes) -> None:
+    with pytest.raises(InvalidCacheFile):
+        loads(data)
+
+
+def test_invalid_nodes_raise() -> None:
+    data = bytearray(dumps([TextNode("", "bold")]))
+    # Points the text type of the record at the empty string of its text
+    data[-1] = data[-2]
+
+    with pytest.raises(InvalidCacheFile, match="text_type"):
+        loads(bytes(data))
+
+
+def test_other_versions_are_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    data = dumps([LeafNode("b", "bold")])
+    monkeypatch.setattr(ast_cache, "__version__", "0.0.0-other")
+
+    with pytest.raises(InvalidCacheFile, match="repytile"):
+        loads(data)
+
+
+def test_empty_file_is_invalid(tmp_path: Path) -> None:
+    path = tmp_path / "empty.ast"
+    path.write_bytes(b"")
+
+    with pytest.raises(InvalidCacheFile):
+        load(path)
@@ -0,0 +1,190 @@
+import io
+from typing import Iterator
+
+import pytest
+
+from repytile.block_parser import (
+    MarkdownBlock,
+    block_to_html_node,
+    iter_blocks,
+    markdown_to_html_node,
+    markdown_to_html_nodes,
+)
+from repytile.document import Document
+from repytile.exceptions import InvalidElementType
+
+
+def test_blocks_are_split_on_blank_lines() -> None:
+    markdown = "# Title\n\nFirst paragraph\nstill first\n\n\n* one\n* two\n"
+
+    assert list(iter_blocks(markdown)) == [
+        MarkdownBlock("heading", ["# Title"], 1),
+        MarkdownBlock("paragraph", ["First paragraph", "still first"], 3),
+        MarkdownBlock("unordered_list", ["* one", "* two"], 7),
+    ]
+
+
+def test_code_fences_keep_blank_lines() -> None:
+    markdown = "```python\nx = 1\n\ny = 2\n```\nafter"
+
+    assert list(iter_blocks(markdown)) == [
+        MarkdownBlock("code", ["```python", "x = 1", "", "y = 2", "```"], 1),
+        MarkdownBlock("paragraph", ["after"], 6),
+    ]
+
+
+def test_headings_close_the_current_block() -> None:
+    markdown = "text\n## Sub\nmore"
+
+    assert [block.block_type for block in iter_blocks(markdown)] == [
+        "paragraph",
+        "heading",
+        "paragraph",
+    ]
+
+
+@pytest.mark.parametrize(
+    "lines,expected",
+    [
+        pytest.param(["> quote", ">more"], "quote", id="quote"),
+        pytest.param(["- one", "* two"], "unordered_list", id="unordered_list"),
+        pytest.param(["1. one", "2. two"], "ordered_list", id="ordered_list"),
+        pytest.param(["1. one", "two"], "paragraph", id="mixed_lines"),
+    ],
+)
+def test_blocks_are_classified_by_their_markers(
+    lines: list[str], expected: str
+) -> None:
+    (block,) = iter_blocks(lines)
+
+    assert block.block_type == expected
+
+
+def test_blocks_are_yielded_before_the_rest_of_the_input_is_read() -> None:
+    consumed: list[str] = []
+
+    def lines() -> Iterator[str]:
+        for line in ["# Title\n", "\n", "paragraph\n", "\n", "never read yet\n"]:
+            consumed.append(line)
+            yield line
+
+    blocks = iter_blocks(lines())
+    next(blocks)
+    assert len(consumed) == 1
+
+    next(blocks)
+    assert len(consumed) == 4
+
+
+@pytest.mark.parametrize(
+    "block,expected_html",
+    [
+        pytest.param(
+            MarkdownBlock("heading", ["### Some **bold** title"], 1),
+            "<h3>Some <b>bold</b> title</h3>",
+            id="heading",
+        ),
+        pytest.param(
+            MarkdownBlock("paragraph", ["A *first*", "line"], 1),
+            "<p>A <i>first</i> line</p>",
+            id="paragraph",
+        ),
+        pytest.param(
+            MarkdownBlock("quote", ["> quoted", ">text"], 1),
+            "<blockquote>quoted text</blockquote>",
+            id="quote",
+        ),
+        pytest.param(
+            MarkdownBlock("code", ["```py", "a = 1", "", "b = 2", "```"], 1),
+            '<pre><code class="language-py">a = 1\n\nb = 2</code></pre>',
+            id="code",
+        ),
+        pytest.param(
+            MarkdownBlock("code", ["```", "unclosed"], 1),
+            "<pre><code>unclosed</code></pre>",
+            id="unclosed_code",
+        ),
+        pytest.param(
+            MarkdownBlock("unordered_list", ["* [a](/a)", "- `b`"], 1),
+            '<ul><li><a href="/a">a</a></li><li><code>b</code></li></ul>',
+            id="unordered_list",
+        ),
+        pytest.param(
+            MarkdownBlock("ordered_list", ["1. one", "2. two"], 1),
+            "<ol><li>one</li><li>two</li></ol>",
+            id="ordered_list",
+        ),
+    ],
+)
+def test_block_to_html_node_generates_valid_html(
+    block: MarkdownBlock, expected_html: str
+) -> None:
+    assert block_to_html_node(block).to_html() == expected_html
+
+
+def test_block_to_html_node_raises_exception_on_invalid_block_type() -> None:
+    with pytest.raises(InvalidElementType):
+        block_to_html_node(MarkdownBlock("table", ["| a |"], 1))
+
+
+def test_markdown_can_be_read_from_a_file_object() -> None:
+    source = io.StringIO("# Title\n\nSome text\n")
+
+    assert [node.to_html() for node in markdown_to_html_nodes(source)] == [
+        "<h1>Title</h1>",
+        "<p>Some text</p>",
+    ]
+
+
+def test_markdown_to_html_node_wraps_blocks_in_a_div() -> None:
+    node = markdown_to_html_node("# Title\n\n* item")
+
+    assert node.to_html() == "<div><h1>Title</h1><ul><li>item</li></ul></div>"
+
+
+def test_empty_markdown_renders_an_empty_div() -> None:
+    assert markdown_to_html_node("").to_html() == "<div></div>"
+
+
+@pytest.mark.parametrize(
+    "markdown",
+    [
+        pytest.param(
+            "# Title\n\nFirst paragraph\nstill first\n\n\n* one\n* two\n", id="blocks"
+        ),
+        pytest.param("```python\nx = 1\n\ny = 2\n```\nafter", id="code_fence"),
+        pytest.param("```\nunclosed\n\n\n", id="unclosed_code_fence"),
+        pytest.param("text\n## Sub\n#not a heading\n> quote", id="headings"),
+        pytest.param("a\n \t\nb\n\xa0\nété", id="whitespace_lines"),
+        pytest.param("# Title\r\n\r\n1. one\r\n2. two\r\n", id="crlf"),
+        pytest.param("", id="empty"),
+    ],
+)
+def test_buffers_are_split_like_their_decoded_text(markdown: str) -> None:
+    expected = list(iter_blocks(io.StringIO(markdown, newline=None)))
+
+    assert list(iter_blocks(markdown)) == expected
+    assert list(iter_blocks(markdown.encode("utf-8"))) == expected
+    assert list(iter_blocks(bytearray(markdown.encode("utf-8")))) == expected
+
+
+@pytest.mark.parametrize(
+    "markdown",
+    [
+        pytest.param("first\x0csame line\n\nsecond", id="form-feed"),
+        pytest.param("a\x1cb\x1dc\x1ed\n\n# Title", id="separators"),
+        pytest.param("next\x85line\u2028and\u2029more\n\n* item", id="unicode"),
+        pytest.param("```\ncode\x0c\n\n", id="unclosed-code-fence"),
+        pytest.param("# Title\r\n\r\ntext\r\n", id="crlf"),
+    ],
+)
+def test_text_and_bytes_are_split_on_the_same_lines(markdown: str) -> None:
+    blocks = list(iter_blocks(markdown))
+
+    assert blocks == list(iter_blocks(markdown.encode("utf-8")))
+    assert Document(markdown).blocks == blocks
+
+
+def test_buffers_must_be_utf8() -> None:
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_blocks("café\n".encode("latin-1")))
@@ -1,6 +1,11 @@
+import gc
+import io
+import weakref
+
 import pytest
 
-from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.block_elements import HTML_CACHE_DEPTH, HTMLNode, LeafNode, ParentNode
+from repytile.escaping import Markup
 
 
 def test_convertion_from_props_to_html_matches_expectation() -> None:
@@ -94,12 +99,47 @@ def test_leafnode_with_props_can_generates_valid_html() -> None:
 
 
 def test_leafnode_with_empty_props_can_generates_valid_html() -> None:
-    leaf_node = LeafNode(tag="svg", value="<circle />")
+    leaf_node = LeafNode(tag="svg", value=Markup("<circle />"))
     expected_html = "<svg><circle /></svg>"
 
     assert leaf_node.to_html() == expected_html
 
 
+def test_leafnode_escapes_its_value() -> None:
+    leaf_node = LeafNode(tag="code", value="a < b && c > d")
+
+    assert leaf_node.to_html() == "<code>a &lt; b &amp;&amp; c &gt; d</code>"
+    assert LeafNode(None, "<script>").to_html() == "&lt;script&gt;"
+
+
+def test_props_to_html_escapes_attribute_values() -> None:
+    node = HTMLNode(props={"href": "/search?q=a&b=1", "title": 'say "hi" <now>'})
+
+    assert node.props_to_html() == (
+        'href="/search?q=a&amp;b=1" title="say &quot;hi&quot; &lt;now&gt;"'
+    )
+
+
+def test_props_to_html_converts_values_and_skips_none() -> None:
+    node = LeafNode("td", "x", props={"colspan": 2, "title": None, "id": "cell"})
+
+    assert node.props_to_html() == 'colspan="2" id="cell"'
+    assert node.to_html() == '<td colspan="2" id="cell">x</td>'
+
+
+def test_props_to_html_is_cached_until_props_change() -> None:
+    props = {"class": "a"}
+    node = LeafNode("span", "x", props=props)
+    assert node.props_to_html() is node.props_to_html()
+
+    props["class"] = "b"
+    assert node.props_to_html() == 'class="a"'
+    node.invalidate()
+    assert node.props_to_html() == 'class="b"'
+    node.set_prop("id", "c")
+    assert node.to_html() == '<span class="b" id="c">x</span>'
+
+
 def test_parent_node_cannot_generate_html_without_tag() -> None:
     parent_node = ParentNode()
 
@@ -147,3 +187,287 @@ def test_nested_parent_nodes_generates_valid_html() -> None:
     )
 
     assert node.to_html() == "<div><p><b>bold</b>normal</p></div>"
+
+
+@pytest.mark.parametrize(
+    "depth,render",
+    [
+        pytest.param(10_000, lambda node: "".join(node.iter_html()), id="iter_html"),
+        pytest.param(10_000, lambda node: node.to_html(), id="to_html"),
+    ],
+)
+def test_deeply_nested_parent_nodes_do_not_hit_recursion_limit(
+    depth: int, render
+) -> None:
+    node: HTMLNode = LeafNode(tag="b", value="deep")
+    for _ in range(depth):
+        node = ParentNode(tag="div", children=[node])
+
+    html = render(node)
+
+    assert html == "<div>" * depth + "<b>deep</b>" + "</div>" * depth
+
+
+def test_parent_node_iter_html_yields_chunks_in_document_order() -> None:
+    node = ParentNode(
+        tag="p",
+        children=[LeafNode("b", "bold"), LeafNode(None, "normal")],
+        props={"class": "intro"},
+    )
+
+    assert list(node.iter_html()) == [
+        '<p class="intro">',
+        "<b>bold</b>",
+        "normal",
+        "</p>",
+    ]
+
+
+def test_parent_node_render_to_writes_same_html_as_to_html() -> None:
+    node = ParentNode(
+        tag="ul",
+        children=[
+            ParentNode(tag="li", children=[LeafNode(None, f"item {i}")])
+            for i in range(10_000)
+        ],
+    )
+    writer = io.StringIO()
+
+    node.render_to(writer)
+
+    assert writer.getvalue() == node.to_html()
+
+
+def test_parent_node_render_to_raises_for_invalid_nested_node() -> None:
+    node = ParentNode(tag="div", children=[ParentNode(tag="p")])
+
+    with pytest.raises(
+        ValueError, match="ParentNode instances should have at least one children"
+    ):
+        node.render_to(io.StringIO())
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        pytest.param(HTMLNode(), id="html_node"),
+        pytest.param(LeafNode(tag="b", value="bold"), id="leaf_node"),
+        pytest.param(ParentNode(tag="p", children=[]), id="parent_node"),
+    ],
+)
+def test_nodes_do_not_carry_an_instance_dict(node: HTMLNode) -> None:
+    assert not hasattr(node, "__dict__")
+
+
+def _count_leaf_renders(monkeypatch: pytest.MonkeyPatch) -> list[LeafNode]:
+    rendered: list[LeafNode] = []
+    render = LeafNode._render
+
+    def counting_render(self: LeafNode) -> str:
+        rendered.append(self)
+        return render(self)
+
+    monkeypatch.setattr(LeafNode, "_render", counting_render)
+    return rendered
+
+
+def _make_document(sections: int, paragraphs: int) -> ParentNode:
+    return ParentNode(
+        tag="div",
+        children=[
+            ParentNode(
+                tag="section",
+                children=[
+                    ParentNode(tag="p", children=[LeafNode(None, f"{s}.{p}")])
+                    for p in range(paragraphs)
+                ],
+            )
+            for s in range(sections)
+        ],
+    )
+
+
+def test_to_html_is_cached_until_the_tree_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    rendered = _count_leaf_renders(monkeypatch)
+    document = _make_document(sections=3, paragraphs=3)
+
+    first = document.to_html()
+    second = document.to_html()
+
+    assert first is second
+    assert len(rendered) == 9
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        pytest.param(lambda leaf, paragraph: setattr(leaf, "value", "new"), id="value"),
+        pytest.param(lambda leaf, paragraph: setattr(paragraph, "tag", "h2"), id="tag"),
+        pytest.param(
+            lambda leaf, paragraph: setattr(paragraph, "props", {"id": "x"}),
+            id="props",
+        ),
+        pytest.param(
+            lambda leaf, paragraph: paragraph.set_prop("class", "note"), id="set_prop"
+        ),
+        pytest.param(
+            lambda leaf, paragraph: paragraph.replace_child(0, LeafNode("b", "new")),
+            id="replace_child",
+        ),
+        pytest.param(
+            lambda leaf, paragraph: paragraph.append_child(LeafNode(None, "new")),
+            id="append_child",
+        ),
+        pytest.param(
+            lambda leaf, paragraph: setattr(
+                paragraph, "children", [LeafNode(None, "new")]
+            ),
+            id="children",
+        ),
+    ],
+)
+def test_local_edit_only_re_renders_the_edited_path(
+    monkeypatch: pytest.MonkeyPatch, edit
+) -> None:
+    document = _make_document(sections=10, paragraphs=10)
+    document.to_html()
+    section = document.children[4]
+    paragraph = section.children[7]
+    leaf = paragraph.children[0]
+    rendered = _count_leaf_renders(monkeypatch)
+
+    edit(leaf, paragraph)
+    html = document.to_html()
+
+    # Only the edited paragraph is rendered again
+    assert len(rendered) <= len(paragraph.children)
+    assert html == "".join(document.iter_html())
+    # Sibling blocks keep their cached HTML
+    assert document.children[3]._html is not None
+    assert document.children[5]._html is not None
+
+
+def test_invalidate_is_needed_after_in_place_mutation() -> None:
+    node = ParentNode(tag="p", children=[LeafNode(None, "a")])
+    node.to_html()
+
+    node.children.append(LeafNode(None, "b"))
+    assert node.to_html() == "<p>a</p>"
+
+    node.invalidate()
+    assert node.to_html() == "<p>ab</p>"
+
+
+def test_set_prop_does_not_mutate_shared_props() -> None:
+    shared = {"href": "/a"}
+    first = LeafNode("a", "first", props=shared)
+    second = LeafNode("a", "second", props=shared)
+
+    first.set_prop("rel", "nofollow")
+
+    assert first.to_html() == '<a href="/a" rel="nofollow">first</a>'
+    assert second.to_html() == '<a href="/a">second</a>'
+    assert shared == {"href": "/a"}
+
+
+def test_children_know_their_parent() -> None:
+    leaf = LeafNode(None, "a")
+    parent = ParentNode(tag="p", children=[leaf])
+
+    assert leaf.parent is parent
+    assert parent.remove_child(0) is leaf
+    assert leaf.parent is None
+
+
+def test_nodes_belong_to_a_single_tree() -> None:
+    leaf = LeafNode("b", "x")
+    first = ParentNode(tag="p", children=[leaf])
+
+    with pytest.raises(ValueError):
+        ParentNode(tag="p", children=[leaf])
+    with pytest.raises(ValueError):
+        ParentNode(tag="div", children=[]).append_child(leaf)
+    second = ParentNode(tag="p", children=[LeafNode(None, "")])
+    with pytest.raises(ValueError):
+        second.replace_child(0, leaf)
+
+    first.remove_child(0)
+    second.replace_child(0, leaf)
+    assert leaf.parent is second
+    assert second.to_html() == "<p><b>x</b></p>"
+
+
+def test_shared_nodes_are_read_only() -> None:
+    leaf = LeafNode("b", "x")
+    leaf.share()
+    first = ParentNode(tag="p", children=[leaf])
+    second = ParentNode(tag="p", children=[leaf])
+
+    assert leaf.parent is None
+    assert first.to_html() == second.to_html() == "<p><b>x</b></p>"
+    with pytest.raises(ValueError):
+        leaf.value = "y"
+    with pytest.raises(ValueError):
+        leaf.set_prop("class", "c")
+    assert leaf.value == "x"
+    assert first.to_html() == "<p><b>x</b></p>"
+
+
+def test_to_html_caches_a_bounded_number_of_levels() -> None:
+    leaf = LeafNode("b", "deep")
+    chain: list[HTMLNode] = [leaf]
+    for _ in range(HTML_CACHE_DEPTH + 3):
+        chain.append(ParentNode(tag="div", children=[chain[-1]]))
+    chain.reverse()
+
+    chain[0].to_html()
+
+    # The root, HTML_CACHE_DEPTH levels below it, and the children of the deepest one
+    cached = [node._html is not None for node in chain]
+    assert cached == [True] * (HTML_CACHE_DEPTH + 2) + [False] * 2
+
+
+def test_deep_edit_only_re_renders_the_edited_subtree(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    items = ParentNode(
+        tag="ul",
+        children=[
+            ParentNode(tag="li", children=[LeafNode("b", f"{i}"), LeafNode(None, "x")])
+            for i in range(5_000)
+        ],
+    )
+    document = ParentNode(tag="div", children=[items])
+    document.to_html()
+    rendered = _count_leaf_renders(monkeypatch)
+
+    items.children[2_500].children[0].value = "edited"
+    html = document.to_html()
+
+    assert rendered == [items.children[2_500].children[0]]
+    assert "<li><b>edited</b>x</li>" in html
+    assert html == "".join(document.iter_html())
+
+
+def test_dropped_trees_are_freed_without_the_cyclic_collector() -> None:
+    document = _make_document(sections=2, paragraphs=2)
+    leaf = document.children[0].children[0].children[0]
+    root = weakref.ref(document)
+    gc.disable()
+    try:
+        del document
+        assert root() is None
+        assert leaf.parent is None
+    finally:
+        gc.enable()
+
+
+def test_iter_html_does_not_fill_caches() -> None:
+    document = _make_document(sections=2, paragraphs=2)
+
+    "".join(document.iter_html())
+
+    assert document._html is None
+    assert document.children[0].children[0].children[0]._html is None
@@ -0,0 +1,165 @@
+import asyncio
+import gc
+import threading
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from repytile import daemon as daemon_module
+from repytile.cli import main
+from repytile.daemon import FULL_COLLECTION_BUILDS, BuildDaemon, send_request
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    content = tmp_path / "content"
+    (content / "blog").mkdir(parents=True)
+    (content / "index.md").write_text("# Home\n\nWelcome")
+    (content / "blog" / "post.md").write_text("# Post\n\n* a\n* b")
+    (tmp_path / "template.html").write_text(TEMPLATE)
+    return tmp_path
+
+
+@pytest.fixture
+def daemon(site: Path):
+    # The daemon runs its own event loop, clients block on the socket like the CLI does
+    daemon = BuildDaemon(site / "d.sock")
+    started = threading.Event()
+
+    async def run() -> None:
+        await daemon.start()
+        started.set()
+        try:
+            await daemon.serve_forever()
+        finally:
+            await daemon.close()
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),))
+    thread.start()
+    assert started.wait(5)
+    yield daemon
+    if thread.is_alive():
+        send_request(daemon.socket_path, {"command": "stop"}, timeout=5)
+    thread.join(5)
+    gc.unfreeze()
+
+
+def _request(site: Path, **options) -> dict:
+    return {
+        "command": "build",
+        "content": str(site / "content"),
+        "output": str(site / "public"),
+        "template": str(site / "template.html"),
+        **options,
+    }
+
+
+def test_daemon_only_renders_what_changed(site: Path, daemon: BuildDaemon) -> None:
+    first = send_request(daemon.socket_path, _request(site))
+    second = send_request(daemon.socket_path, _request(site))
+    (site / "content" / "index.md").write_text("# Home\n\nEdited")
+    third = send_request(daemon.socket_path, _request(site))
+
+    assert first["rendered"] == ["blog/post.md", "index.md"]
+    assert second["rendered"] == []
+    assert second["skipped"] == ["blog/post.md", "index.md"]
+    assert third["rendered"] == ["index.md"]
+    assert "Edited" in (site / "public" / "index.html").read_text()
+    assert daemon.builds == 3
+
+
+def test_daemon_memory_stays_bounded_across_rebuilds(
+    site: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    build_site = daemon_module.build_site
+
+    def build_with_cyclic_garbage(*args, **kwargs):
+        # Stands for the reference cycles a build leaves behind, only the collector frees them
+        garbage: list = [bytes(64 * 1024)]
+        garbage.append(garbage)
+        return build_site(*args, **kwargs)
+
+    monkeypatch.setattr(daemon_module, "build_site", build_with_cyclic_garbage)
+    daemon = BuildDaemon(site / "d.sock")
+    index = site / "content" / "index.md"
+
+    def rebuild(count: int) -> None:
+        for number in range(count):
+            index.write_text(f"# Home\n\n* [Edit {number}](/)\n* **item**")
+            daemon.build(_request(site))
+
+    try:
+        rebuild(5)
+        tracemalloc.start()
+        rebuild(5)
+        baseline = tracemalloc.get_traced_memory()[0]
+        # Stops before the periodic full collection, which would free leaked garbage anyway
+        rebuild(FULL_COLLECTION_BUILDS - 11)
+        grown = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+        gc.unfreeze()
+
+    assert daemon.builds == FULL_COLLECTION_BUILDS - 1
+    assert grown < 256 * 1024
+
+
+def test_daemon_reports_failed_requests(site: Path, daemon: BuildDaemon) -> None:
+    missing = send_request(
+        daemon.socket_path, _request(site, template=str(site / "missing.html"))
+    )
+    unknown = send_request(daemon.socket_path, {"command": "clean"})
+
+    assert missing["error"].startswith("FileNotFoundError")
+    assert unknown["error"] == "Unknown command 'clean'"
+
+
+def test_daemon_stops_on_request(site: Path, daemon: BuildDaemon) -> None:
+    assert send_request(daemon.socket_path, {"command": "stop"}) == {"stopped": True}
+
+    for _ in range(50):
+        if not daemon.socket_path.exists():
+            break
+        threading.Event().wait(0.1)
+    assert not daemon.socket_path.exists()
+
+
+def test_build_command_uses_the_daemon(
+    site: Path, daemon: BuildDaemon, capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = [
+        "build",
+        str(site / "content"),
+        str(site / "public"),
+        "--template",
+        str(site / "template.html"),
+        "--daemon",
+        str(daemon.socket_path),
+    ]
+
+    assert main(args) == 0
+    assert main(args) == 0
+
+    output = capsys.readouterr().out.splitlines()
+    assert output[-1] == "2 pages: 0 rendered, 2 unchanged (cache hit rate 100.0%)"
+    assert daemon.builds == 2
+
+
+def test_build_command_reports_unreachable_daemon(
+    site: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = [
+        "build",
+        str(site / "content"),
+        str(site / "public"),
+        "--template",
+        str(site / "template.html"),
+        "--daemon",
+        str(site / "none.sock"),
+    ]
+
+    assert main(args) == 1
+    assert "cannot reach the daemon" in capsys.readouterr().err
@@ -0,0 +1,172 @@
+import random
+
+import pytest
+
+from repytile import document as document_module
+from repytile.block_parser import iter_blocks, markdown_to_html_node
+from repytile.document import Document
+
+SOURCE = (
+    "# Title\n\nFirst *paragraph*\n\n* one\n* two\n\n```py\ncode\n```\n\nLast paragraph"
+)
+
+
+@pytest.fixture
+def parse_count(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    calls = [0]
+    original = document_module.block_to_html_node
+
+    def counting(block, pool=None):
+        calls[0] += 1
+        return original(block, pool)
+
+    monkeypatch.setattr(document_module, "block_to_html_node", counting)
+    return calls
+
+
+def _assert_matches_full_parse(document: Document) -> None:
+    lines = document.lines
+    assert document.to_html() == markdown_to_html_node(lines).to_html()
+    assert document.blocks == list(iter_blocks(lines))
+    assert Document(document.source).lines == lines
+
+
+def test_initial_parse_matches_markdown_to_html_node() -> None:
+    document = Document(SOURCE)
+
+    assert document.to_html() == markdown_to_html_node(SOURCE).to_html()
+    assert len(document.blocks) == 5
+
+
+def test_empty_document_renders_an_empty_div() -> None:
+    document = Document()
+
+    assert document.to_html() == "<div></div>"
+    document.update("Hello")
+    assert document.to_html() == "<div><p>Hello</p></div>"
+    document.update("")
+    assert document.to_html() == "<div></div>"
+
+
+def test_single_line_edit_reparses_one_block(parse_count: list[int]) -> None:
+    document = Document(SOURCE)
+    untouched = document.nodes
+    parse_count[0] = 0
+
+    reparsed = document.edit(2, 3, "Changed **paragraph**")
+
+    assert reparsed == [1]
+    assert parse_count[0] == 1
+    assert "<p>Changed <b>paragraph</b></p>" in document.to_html()
+    nodes = document.nodes
+    assert [node is old for node, old in zip(nodes, untouched)] == [
+        True,
+        False,
+        True,
+        True,
+        True,
+    ]
+    assert nodes[1].parent is document.root
+    _assert_matches_full_parse(document)
+
+
+def test_inserted_lines_shift_following_blocks(parse_count: list[int]) -> None:
+    document = Document(SOURCE)
+    parse_count[0] = 0
+
+    reparsed = document.edit(1, 1, "\nNew paragraph\n")
+
+    assert reparsed == [1]
+    assert parse_count[0] == 1
+    assert [block.line_number for block in document.blocks] == [1, 3, 5, 7, 10, 14]
+    _assert_matches_full_parse(document)
+
+
+def test_opening_a_code_fence_reparses_until_blocks_line_up() -> None:
+    document = Document(SOURCE)
+
+    document.edit(2, 3, "```")
+
+    assert document.blocks[1].block_type == "code"
+    _assert_matches_full_parse(document)
+
+
+def test_update_finds_the_changed_lines(parse_count: list[int]) -> None:
+    document = Document(SOURCE)
+    parse_count[0] = 0
+
+    reparsed = document.update(SOURCE.replace("* two", "* three"))
+
+    assert reparsed == [2]
+    assert parse_count[0] == 1
+    assert "<li>three</li>" in document.to_html()
+
+
+def test_only_changed_blocks_are_rendered_again(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    document = Document(SOURCE)
+    document.to_html()
+    rendered = []
+    original = document_module.ParentNode._tag_pair
+
+    def tracking(node):
+        rendered.append(node.tag)
+        return original(node)
+
+    monkeypatch.setattr(document_module.ParentNode, "_tag_pair", tracking)
+    document.edit(4, 5, "* zero")
+    document.to_html()
+
+    assert rendered == ["div", "ul", "li", "li"]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        pytest.param("para", id="no-line-break"),
+        pytest.param("para\n", id="final-line-break"),
+        pytest.param("```\ncode\n\n", id="unclosed-fence-blank-line"),
+        pytest.param("```\ncode\n\n\n", id="unclosed-fence-blank-lines"),
+        pytest.param("\n", id="blank-line"),
+    ],
+)
+def test_source_is_the_parsed_text(source: str) -> None:
+    document = Document(source)
+
+    assert document.source == source
+    assert Document(document.source).to_html() == document.to_html()
+    assert document.to_html() == markdown_to_html_node(source).to_html()
+
+
+def test_edit_at_the_end_sets_the_final_line_break() -> None:
+    document = Document("```\ncode")
+
+    document.edit(2, 2, "\n")
+    assert document.source == "```\ncode\n\n"
+    document.edit(0, 1, "text")
+    assert document.source == "text\ncode\n\n"
+    document.edit(1, 3, "last")
+    assert document.source == "text\nlast"
+
+
+def test_edit_out_of_range_raises() -> None:
+    document = Document(SOURCE)
+
+    with pytest.raises(IndexError):
+        document.edit(5, 100, "text")
+
+
+def test_random_edits_match_full_parse() -> None:
+    rng = random.Random(0)
+    pieces = ["# H", "para *x*", "", "", "* a", "- b", "1. one", "```", "code", "> q"]
+    for _ in range(300):
+        document = Document("\n".join(rng.choices(pieces, k=rng.randint(0, 12))))
+        for _ in range(5):
+            lines = len(document.lines)
+            start = rng.randint(0, lines)
+            end = rng.randint(start, min(lines, start + 3))
+            document.edit(
+                start, end, "\n".join(rng.choices(pieces, k=rng.randint(1, 3)))
+            )
+            _assert_matches_full_parse(document)
@@ -0,0 +1,47 @@
+import pytest
+
+from repytile.escaping import Markup, escape_attribute, escape_text
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param("plain text", "plain text", id="clean"),
+        pytest.param("a & b", "a &amp; b", id="ampersand"),
+        pytest.param("<b>x</b>", "&lt;b&gt;x&lt;/b&gt;", id="tags"),
+        pytest.param("&lt;", "&amp;lt;", id="already-escaped"),
+        pytest.param('say "hi"', 'say "hi"', id="quotes-kept"),
+        pytest.param("", "", id="empty"),
+    ],
+)
+def test_escape_text(value: str, expected: str) -> None:
+    assert escape_text(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param("/page.html", "/page.html", id="clean"),
+        pytest.param("/q?a=1&b=2", "/q?a=1&amp;b=2", id="ampersand"),
+        pytest.param('" onload="x', "&quot; onload=&quot;x", id="quote"),
+        pytest.param("<>", "&lt;&gt;", id="brackets"),
+        pytest.param(3, "3", id="int"),
+    ],
+)
+def test_escape_attribute(value: object, expected: str) -> None:
+    assert escape_attribute(value) == expected
+
+
+def test_clean_strings_are_returned_without_copy() -> None:
+    value = "".join(["no", " special characters"])
+
+    assert escape_text(value) is value
+    assert escape_attribute(value) is value
+
+
+def test_markup_is_never_escaped() -> None:
+    markup = Markup('<a href="/">&copy;</a>')
+
+    assert escape_text(markup) is markup
+    assert escape_attribute(markup) is markup
+    assert repr(markup) == "Markup('<a href=\"/\">&copy;</a>')"
@@ -1,7 +1,21 @@
+import random
+import time
+
 import pytest
 
+from repytile.block_elements import LeafNode, ParentNode
 from repytile.exceptions import InvalidElementType
-from repytile.helpers import _split_keep, split_nodes_delimiter, text_node_to_html_node
+from repytile.helpers import (
+    NODE_BUILDERS,
+    TAG_MAPPING,
+    LeafNodePool,
+    _split_keep,
+    split_nodes_delimiter,
+    split_nodes_inline,
+    text_node_to_html_node,
+    text_nodes_to_html_nodes,
+    text_to_textnodes,
+)
 from repytile.inline_elements import TextNode
 
 
@@ -201,3 +215,273 @@ def test_split_with_mismatching_separators_keeps_string_unchanged(
     input_str: str, sep: str, expected: list[str]
 ) -> None:
     assert _split_keep(input_str, sep) == expected
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        pytest.param("", [], id="empty"),
+        pytest.param("plain", [TextNode("plain", "text")], id="plain-text"),
+        pytest.param(
+            "This has **bold** text",
+            [
+                TextNode("This has ", "text"),
+                TextNode("bold", "bold"),
+                TextNode(" text", "text"),
+            ],
+            id="bold",
+        ),
+        pytest.param(
+            "*italic* and `code`",
+            [
+                TextNode("italic", "italic"),
+                TextNode(" and ", "text"),
+                TextNode("code", "code"),
+            ],
+            id="italic-and-code",
+        ),
+        pytest.param(
+            "See [docs](https://example.com) or ![logo](logo.png)",
+            [
+                TextNode("See ", "text"),
+                TextNode("docs", "link", "https://example.com"),
+                TextNode(" or ", "text"),
+                TextNode("logo", "image", "logo.png"),
+            ],
+            id="link-and-image",
+        ),
+        pytest.param(
+            "`a * b` is **not *nested***",
+            [
+                TextNode("a * b", "code"),
+                TextNode(" is ", "text"),
+                TextNode("not *nested", "bold"),
+                TextNode("*", "text"),
+            ],
+            id="no-nesting",
+        ),
+        pytest.param(
+            "This has **bold* text is wrong",
+            [
+                TextNode("This has *", "text"),
+                TextNode("bold", "italic"),
+                TextNode(" text is wrong", "text"),
+            ],
+            id="mismatching-delimiters",
+        ),
+        pytest.param(
+            "unmatched ` and [bracket] (paren) and ![",
+            [TextNode("unmatched ` and [bracket] (paren) and ![", "text")],
+            id="unmatched-markers",
+        ),
+    ],
+)
+def test_text_to_textnodes_splits_all_inline_elements(
+    text: str, expected: list[TextNode]
+) -> None:
+    assert text_to_textnodes(text) == expected
+
+
+def test_split_nodes_inline_only_splits_text_nodes() -> None:
+    code = TextNode("**kept**", "code")
+    leaf = LeafNode(tag="b", value="leaf")
+
+    result = split_nodes_inline([TextNode("a **b**", "text"), code, leaf])
+
+    assert result == [TextNode("a ", "text"), TextNode("b", "bold"), code, leaf]
+
+
+def test_split_nodes_inline_raises_exception_on_invalid_textnode_type() -> None:
+    with pytest.raises(InvalidElementType):
+        split_nodes_inline([TextNode("test", text_type="none")])
+
+
+_MARKDOWN_SYNTAX = {
+    "text": "{}",
+    "bold": "**{}**",
+    "italic": "*{}*",
+    "code": "`{}`",
+}
+
+
+def _to_markdown(nodes: list[TextNode]) -> str:
+    parts = []
+    for node in nodes:
+        if node.text_type == "link":
+            parts.append(f"[{node.text}]({node.url})")
+        elif node.text_type == "image":
+            parts.append(f"![{node.text}]({node.url})")
+        else:
+            parts.append(_MARKDOWN_SYNTAX[node.text_type].format(node.text))
+    return "".join(parts)
+
+
+def test_text_to_textnodes_fuzz_round_trips_to_original_text() -> None:
+    rng = random.Random(1234)
+    alphabet = "ab *`![]()"
+    for _ in range(2_000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        nodes = text_to_textnodes(text)
+
+        assert _to_markdown(nodes) == text
+        # Plain text runs are always merged together
+        assert all(
+            not (left.text_type == right.text_type == "text")
+            for left, right in zip(nodes, nodes[1:])
+        )
+
+
+def _best_time(text: str, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text_to_textnodes(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@pytest.mark.parametrize(
+    "unit",
+    [
+        pytest.param("*", id="unmatched-italic"),
+        pytest.param("`", id="unmatched-code"),
+        pytest.param("**a ", id="unmatched-bold"),
+        pytest.param("[a", id="unmatched-link"),
+        pytest.param("[a](", id="unclosed-link-url"),
+        pytest.param("![a]x", id="broken-image"),
+    ],
+)
+def test_text_to_textnodes_is_linear_on_adversarial_input(unit: str) -> None:
+    # A single closing delimiter at the very end is the worst case for a backtracking scanner
+    small = unit * 5_000 + ")"
+    large = unit * 40_000 + ")"
+
+    ratio = _best_time(large) / _best_time(small)
+
+    # 8 times the input must stay far from the 64 times a quadratic scanner would take
+    assert ratio < 24
+
+
+def test_every_tag_mapping_type_has_a_builder() -> None:
+    assert set(NODE_BUILDERS) == set(TAG_MAPPING) | {"text"}
+
+
+def test_pooled_conversion_shares_identical_nodes() -> None:
+    pool = LeafNodePool()
+
+    first = text_node_to_html_node(TextNode("nav", "link", "/"), pool)
+    second = text_node_to_html_node(TextNode("nav", "link", "/"), pool)
+    other = text_node_to_html_node(TextNode("nav", "link", "/other"), pool)
+
+    assert first is second
+    assert first.props is second.props
+    assert other is not first
+    assert (pool.hits, pool.misses) == (1, 2)
+    assert pool.hit_rate == pytest.approx(1 / 3)
+
+
+def test_pooled_nodes_are_shared_and_read_only() -> None:
+    pool = LeafNodePool()
+    nodes = [text_node_to_html_node(TextNode("x", "bold"), pool) for _ in range(2)]
+    first, second = (ParentNode(tag="p", children=[node]) for node in nodes)
+
+    assert first.to_html() == second.to_html() == "<p><b>x</b></p>"
+    with pytest.raises(ValueError):
+        nodes[0].value = "y"
+
+
+def test_pooled_conversion_matches_unpooled_conversion() -> None:
+    pool = LeafNodePool()
+    tn = TextNode("Description", "image", "https://www.example.com/image.png")
+
+    pooled = text_node_to_html_node(tn, pool)
+    fresh = text_node_to_html_node(tn)
+
+    assert (pooled.tag, pooled.value, pooled.props) == (
+        fresh.tag,
+        fresh.value,
+        fresh.props,
+    )
+    assert pooled.to_html() == fresh.to_html()
+
+
+@pytest.mark.parametrize(
+    "pool",
+    [pytest.param(None, id="unpooled"), pytest.param(LeafNodePool(), id="pooled")],
+)
+def test_link_without_url_renders_without_href(pool) -> None:
+    node = text_node_to_html_node(TextNode("anchor", "link", None), pool)
+
+    assert node.to_html() == "<a>anchor</a>"
+
+
+def test_pool_evicts_least_recently_used_nodes() -> None:
+    pool = LeafNodePool(maxsize=2)
+    a, b, c = (TextNode(name, "code") for name in "abc")
+
+    first_a = text_node_to_html_node(a, pool)
+    text_node_to_html_node(b, pool)
+    text_node_to_html_node(a, pool)
+    text_node_to_html_node(c, pool)
+
+    assert len(pool) == 2
+    assert pool.evictions == 1
+    assert text_node_to_html_node(a, pool) is first_a
+    assert text_node_to_html_node(b, pool) is not None
+    assert pool.misses == 4
+
+
+def test_pool_rejects_invalid_size() -> None:
+    with pytest.raises(ValueError):
+        LeafNodePool(maxsize=0)
+
+
+def test_pooled_conversion_still_validates_type() -> None:
+    with pytest.raises(InvalidElementType):
+        text_node_to_html_node(TextNode(text="test", text_type="none"), LeafNodePool())
+
+
+def _batch_input() -> list[TextNode]:
+    return [
+        TextNode("plain ", "text"),
+        TextNode("bold", "bold"),
+        TextNode("nav", "link", "/"),
+        TextNode("logo", "image", "/logo.png"),
+        TextNode("nav", "link", "/"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "pool",
+    [pytest.param(None, id="plain"), pytest.param(LeafNodePool(), id="pooled")],
+)
+def test_batch_conversion_matches_single_conversion(pool) -> None:
+    nodes = _batch_input()
+
+    converted = text_nodes_to_html_nodes(nodes, pool)
+
+    assert [node.to_html() for node in converted] == [
+        text_node_to_html_node(tn).to_html() for tn in nodes
+    ]
+
+
+def test_batch_conversion_updates_pool_counters() -> None:
+    pool = LeafNodePool()
+
+    converted = text_nodes_to_html_nodes(_batch_input(), pool)
+
+    assert converted[2] is converted[4]
+    assert (pool.hits, pool.misses, len(pool)) == (1, 4, 4)
+
+
+def test_batch_conversion_reports_index_of_invalid_node() -> None:
+    nodes = _batch_input()
+    nodes.insert(3, TextNode("test", "none"))
+    pool = LeafNodePool()
+
+    with pytest.raises(InvalidElementType, match="none at index 3") as error:
+        text_nodes_to_html_nodes(nodes, pool)
+
+    assert "TextNode(test, none" in str(error.value)
+    # Nothing is converted when the batch is invalid
+    assert len(pool) == 0
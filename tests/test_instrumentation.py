@@ -0,0 +1,159 @@
+from pathlib import Path
+
+import pytest
+
+from repytile import instrumentation
+from repytile.block_elements import LeafNode, ParentNode
+from repytile.cli import main
+from repytile.instrumentation import Instrumentation, count_nodes
+from repytile.pages import render_page
+from repytile.site_builder import build_site
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    content = tmp_path / "content"
+    (content / "blog").mkdir(parents=True)
+    (content / "index.md").write_text("# Home\n\nWelcome **here**")
+    (content / "blog" / "post.md").write_text("# Post\n\n* a\n* b")
+    (tmp_path / "template.html").write_text("<title>{{ Title }}</title>{{ Content }}")
+    return tmp_path
+
+
+def test_probes_record_nothing_when_disabled() -> None:
+    instr = Instrumentation()
+    render_page("# Title\n\nSome *text*", "{{ Content }}")
+
+    assert instrumentation.active() is None
+    assert instr.stage_ns == {}
+
+
+def test_enabled_records_every_parsing_stage() -> None:
+    with instrumentation.enabled() as instr, instr.document("page.md"):
+        render_page("# Title\n\nSome *text*\n\n* a\n* b", "{{ Content }}")
+
+    assert instrumentation.active() is None
+    assert set(instr.stage_ns) == {"block_split", "inline_split", "convert", "render"}
+    assert instr.stage_calls["inline_split"] == 4
+    assert instr.counters["inline_nodes"] == 5
+    document = instr.documents["page.md"]
+    assert document.node_count == 11
+    assert document.total_ns == sum(instr.stage_ns.values())
+
+
+def test_enabled_restores_previous_instrumentation() -> None:
+    outer = Instrumentation()
+    with instrumentation.enabled(outer):
+        with instrumentation.enabled() as inner:
+            assert instrumentation.active() is inner
+        assert instrumentation.active() is outer
+    assert instrumentation.active() is None
+
+
+def test_hooks_receive_stage_document_and_duration() -> None:
+    calls = []
+    instr = Instrumentation()
+    instr.add_hook(lambda stage, document, elapsed: calls.append((stage, document)))
+
+    instr.record("io", 5)
+    with instr.document("a.md"):
+        instr.record("render", 7)
+
+    assert calls == [("io", None), ("render", "a.md")]
+
+
+def test_node_histogram_uses_power_of_two_buckets() -> None:
+    instr = Instrumentation()
+    for count in (1, 2, 3, 4, 5, 300):
+        instr.record_nodes(count)
+
+    assert instr.node_histogram == {1: 1, 2: 1, 4: 2, 8: 1, 512: 1}
+
+
+def test_merge_adds_snapshots_and_calls_hooks() -> None:
+    worker = Instrumentation()
+    with worker.document("a.md"):
+        worker.record("convert", 10)
+        worker.record_nodes(3)
+    worker.count("inline_nodes", 4)
+    calls = []
+    main_instr = Instrumentation()
+    main_instr.add_hook(lambda stage, document, elapsed: calls.append(elapsed))
+    main_instr.record("convert", 5)
+
+    main_instr.merge(worker.snapshot())
+    main_instr.merge(worker.snapshot())
+
+    assert main_instr.stage_ns == {"convert": 25}
+    assert main_instr.stage_calls == {"convert": 3}
+    assert main_instr.counters == {"inline_nodes": 8}
+    assert main_instr.node_histogram == {4: 2}
+    assert main_instr.documents["a.md"].stage_ns == {"convert": 20}
+    assert main_instr.documents["a.md"].node_count == 6
+    assert calls == [5, 10, 10]
+
+
+def test_report_lists_stages_and_slowest_documents() -> None:
+    instr = Instrumentation()
+    for name, elapsed in (("fast.md", 1_000_000), ("slow.md", 9_000_000)):
+        with instr.document(name):
+            instr.record("convert", elapsed)
+
+    report = instr.report(top=1)
+
+    assert "convert" in report
+    assert "Slowest documents (top 1):" in report
+    assert "slow.md" in report
+    assert "fast.md" not in report
+
+
+def test_count_nodes() -> None:
+    tree = ParentNode(
+        tag="div",
+        children=[
+            ParentNode(tag="p", children=[LeafNode(None, "a")]),
+            LeafNode("b", "c"),
+        ],
+    )
+
+    assert count_nodes(tree) == 4
+
+
+@pytest.mark.parametrize(
+    "jobs", [pytest.param(1, id="serial"), pytest.param(2, id="parallel")]
+)
+def test_build_site_profiles_every_page(site: Path, jobs: int) -> None:
+    profile = Instrumentation()
+
+    build_site(
+        site / "content",
+        site / "public",
+        site / "template.html",
+        jobs=jobs,
+        profile=profile,
+    )
+
+    assert set(profile.documents) == {"blog/post.md", "index.md"}
+    assert set(profile.stage_ns) == {
+        "io",
+        "block_split",
+        "inline_split",
+        "convert",
+        "render",
+    }
+    assert all(doc.stage_ns["io"] > 0 for doc in profile.documents.values())
+    assert sum(profile.node_histogram.values()) == 2
+    assert instrumentation.active() is None
+
+
+def test_cli_profile_prints_report(
+    site: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = ["build", str(site / "content"), str(site / "public")]
+    args += ["--template", str(site / "template.html"), "--profile"]
+
+    assert main(args) == 0
+
+    output = capsys.readouterr().out
+    assert "Stages:" in output
+    assert "index.md" in output
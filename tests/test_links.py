@@ -0,0 +1,133 @@
+from typing import Optional
+
+import pytest
+
+from repytile import links
+from repytile.block_parser import markdown_to_html_node
+from repytile.helpers import LeafNodePool, text_node_to_html_node
+from repytile.inline_elements import TextNode
+from repytile.links import LinkIndex, LinkRecord
+
+MARKDOWN = """# [Title](/index.html)
+
+A paragraph with a [link](other.html)
+and an ![image](img/logo.png).
+
+* [first](https://example.com)
+* [second](#anchor)
+"""
+
+
+def test_urls_are_recorded_while_parsing() -> None:
+    with links.enabled() as index, index.document("docs/page.md"):
+        markdown_to_html_node(MARKDOWN)
+
+    assert index.page("docs/page.md") == [
+        LinkRecord("link", "/index.html", "docs/page.md", 1),
+        LinkRecord("link", "other.html", "docs/page.md", 3),
+        LinkRecord("image", "img/logo.png", "docs/page.md", 3),
+        LinkRecord("link", "https://example.com", "docs/page.md", 6),
+        LinkRecord("link", "#anchor", "docs/page.md", 7),
+    ]
+
+
+def test_pooled_nodes_are_recorded_every_time() -> None:
+    pool = LeafNodePool()
+
+    with links.enabled() as index, index.document("page.md"):
+        markdown_to_html_node("[a](/a)\n\n[a](/a)", pool)
+        text_node_to_html_node(TextNode("b", "image", "/b.png"), pool)
+
+    assert [record.url for record in index] == ["/a", "/a", "/b.png"]
+    assert pool.hits == 1
+
+
+def test_nothing_is_recorded_when_disabled() -> None:
+    index = LinkIndex()
+    markdown_to_html_node(MARKDOWN)
+
+    assert links.active() is None
+    assert len(index) == 0
+
+
+@pytest.mark.parametrize(
+    "url,source,expected",
+    [
+        pytest.param("other.html", "docs/page.md", "docs/other.html", id="relative"),
+        pytest.param("../index.html", "docs/page.md", "index.html", id="parent"),
+        pytest.param("/img/a.png", "docs/page.md", "img/a.png", id="absolute"),
+        pytest.param("/", "docs/page.md", "index.html", id="root"),
+        pytest.param("guide/", "docs/page.md", "docs/guide/index.html", id="directory"),
+        pytest.param("a%20b.html?x=1#top", "page.md", "a b.html", id="quoted"),
+        pytest.param("https://example.com/a", "page.md", None, id="external"),
+        pytest.param("mailto:me@example.com", "page.md", None, id="mailto"),
+        pytest.param("#anchor", "page.md", None, id="fragment"),
+    ],
+)
+def test_records_resolve_their_target(
+    url: str, source: str, expected: Optional[str]
+) -> None:
+    assert LinkRecord("link", url, source, 1).target == expected
+
+
+def _index() -> LinkIndex:
+    index = LinkIndex()
+    index.set_page(
+        "index.md",
+        [
+            LinkRecord("link", "docs/page.html", "index.md", 1),
+            LinkRecord("image", "logo.png", "index.md", 2),
+            LinkRecord("link", "missing.html", "index.md", 3),
+        ],
+    )
+    index.set_page(
+        "docs/page.md",
+        [
+            LinkRecord("link", "../missing.html", "docs/page.md", 4),
+            LinkRecord("link", "https://example.com", "docs/page.md", 5),
+        ],
+    )
+    return index
+
+
+def test_index_lookups() -> None:
+    index = _index()
+
+    assert index.targets() == {"docs/page.html", "logo.png", "missing.html"}
+    assert index.assets() == {"logo.png"}
+    assert [record.line for record in index.referencing("missing.html")] == [3, 4]
+
+
+def test_broken_links_are_looked_up_once_per_target() -> None:
+    lookups = []
+
+    def exists(target: str) -> bool:
+        lookups.append(target)
+        return target != "missing.html"
+
+    broken = _index().broken(exists)
+
+    assert [(record.source, record.line) for record in broken] == [
+        ("index.md", 3),
+        ("docs/page.md", 4),
+    ]
+    assert sorted(lookups) == ["docs/page.html", "logo.png", "missing.html"]
+
+
+def test_index_round_trips_through_dict() -> None:
+    index = _index()
+
+    loaded = LinkIndex.from_dict(index.to_dict())
+
+    assert list(loaded) == list(index)
+
+
+def test_documents_replace_their_previous_records() -> None:
+    index = _index()
+
+    with index.document("index.md"):
+        index.record("link", "new.html", 7)
+    index.remove_page("docs/page.md")
+
+    assert list(index) == [LinkRecord("link", "new.html", "index.md", 7)]
+    assert index.targets() == {"new.html"}
@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from repytile.output import OutputWriter, write_atomic
+
+
+def test_write_atomic_replaces_files_without_leftovers(tmp_path: Path) -> None:
+    path = tmp_path / "page.html"
+    path.write_bytes(b"old")
+
+    write_atomic(path, b"new")
+
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["page.html"]
+
+
+def test_writer_writes_files_in_batches(tmp_path: Path) -> None:
+    with OutputWriter(tmp_path, batch_size=2) as writer:
+        writer.write("a.html", b"a")
+        assert not (tmp_path / "a.html").exists()
+        writer.write("blog/b.html", b"b")
+        assert (tmp_path / "blog" / "b.html").read_bytes() == b"b"
+        writer.write("blog/c.html", b"c")
+        assert not (tmp_path / "blog" / "c.html").exists()
+
+    assert (tmp_path / "blog" / "c.html").read_bytes() == b"c"
+    assert writer.written == 3
+    assert sorted(os.listdir(tmp_path / "blog")) == ["b.html", "c.html"]
+
+
+def test_writer_counts_kept_files(tmp_path: Path) -> None:
+    path = tmp_path / "page.html"
+    path.write_bytes(b"page")
+    before = path.stat().st_mtime_ns
+
+    with OutputWriter(tmp_path) as writer:
+        writer.keep()
+        writer.write("new.html", b"new")
+
+    assert path.stat().st_mtime_ns == before
+    assert (writer.written, writer.unchanged) == (1, 1)
+
+
+def test_writer_drops_queued_files_on_error(tmp_path: Path) -> None:
+    with pytest.raises(RuntimeError):
+        with OutputWriter(tmp_path) as writer:
+            writer.write("page.html", b"page")
+            raise RuntimeError
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_writer_rejects_invalid_batch_size(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        OutputWriter(tmp_path, batch_size=0)
@@ -0,0 +1,136 @@
+from typing import Iterator
+
+import pytest
+
+from repytile import helpers
+from repytile.exceptions import InvalidElementType
+from repytile.helpers import LeafNodePool
+from repytile.pages import (
+    markdown_to_page_node,
+    render_page,
+    render_pages,
+    stream_page,
+)
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+def test_page_title_is_the_first_level_one_heading() -> None:
+    node, title = markdown_to_page_node("## Sub\n\n# Main title\n\n# Other")
+
+    assert title == "Main title"
+    assert node.to_html() == "<div><h2>Sub</h2><h1>Main title</h1><h1>Other</h1></div>"
+
+
+def test_page_without_level_one_heading_has_no_title() -> None:
+    _, title = markdown_to_page_node("text")
+
+    assert title is None
+
+
+def test_render_page_fills_template_placeholders() -> None:
+    html = render_page("# Hello\n\nworld", TEMPLATE)
+
+    assert (
+        html == "<title>Hello</title><body><div><h1>Hello</h1><p>world</p></div></body>"
+    )
+
+
+def test_render_page_uses_default_title() -> None:
+    html = render_page("world", TEMPLATE, default_title="index")
+
+    assert html == "<title>index</title><body><div><p>world</p></div></body>"
+
+
+def test_render_page_escapes_title_and_text() -> None:
+    html = render_page("# Fish & <Chips>\n\n1 < 2", TEMPLATE)
+
+    assert html == (
+        "<title>Fish &amp; &lt;Chips&gt;</title>"
+        "<body><div><h1>Fish &amp; &lt;Chips&gt;</h1><p>1 &lt; 2</p></div></body>"
+    )
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        pytest.param("# Hello\n\n**world**\n\n* a\n* b", id="titled"),
+        pytest.param("world\n\n```\ncode\n```", id="untitled"),
+        pytest.param("", id="empty"),
+    ],
+)
+def test_stream_page_matches_render_page(source: str) -> None:
+    chunks = list(stream_page(iter(source.splitlines()), TEMPLATE, "index"))
+
+    assert "".join(chunks) == render_page(source, TEMPLATE, default_title="index")
+
+
+def test_stream_page_yields_head_before_reading_the_document() -> None:
+    read: list[str] = []
+
+    def lines() -> Iterator[str]:
+        for line in ["# Title", "", "first", "", "second"]:
+            read.append(line)
+            yield line
+
+    chunks = stream_page(lines(), TEMPLATE)
+
+    assert read == []
+    assert next(chunks) == "<title>"
+    assert next(chunks) == "Title"
+    assert next(chunks) == "</title><body>"
+    assert next(chunks) == "<div>"
+    assert next(chunks) == "<h1>Title</h1>"
+    assert read == ["# Title"]
+    assert next(chunks) == "<p>first</p>"
+    assert read == ["# Title", "", "first", ""]
+
+
+def test_stream_page_raises_read_errors_while_iterating() -> None:
+    def lines() -> Iterator[str]:
+        raise OSError("unreadable")
+        yield ""
+
+    chunks = stream_page(lines(), TEMPLATE)
+
+    with pytest.raises(OSError):
+        next(chunks)
+
+
+def test_stream_page_only_takes_title_from_first_block() -> None:
+    html = "".join(stream_page("intro\n\n# Late title", TEMPLATE, "index"))
+
+    assert html.startswith("<title>index</title>")
+
+
+def test_render_pages_matches_render_page() -> None:
+    sources = ["# One\n\n**shared** text", "**shared** text", "# Three"]
+
+    pages = render_pages(sources, TEMPLATE, default_titles=["a", "b", "c"])
+
+    assert pages == [
+        render_page(source, TEMPLATE, default_title=title)
+        for source, title in zip(sources, ["a", "b", "c"])
+    ]
+
+
+def test_render_pages_shares_inline_nodes_across_documents() -> None:
+    pool = LeafNodePool()
+
+    render_pages(["**shared**", "**shared**"], TEMPLATE, pool=pool)
+
+    assert (pool.hits, pool.misses) == (1, 1)
+
+
+def test_render_pages_rejects_mismatched_titles() -> None:
+    with pytest.raises(ValueError):
+        render_pages(["a", "b"], TEMPLATE, default_titles=["a"])
+
+
+def test_render_pages_reports_failing_document(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delitem(helpers.NODE_BUILDERS, "bold")
+
+    with pytest.raises(InvalidElementType) as error:
+        render_pages(["fine", "**bold**"], TEMPLATE)
+
+    assert error.value.__notes__ == ["while rendering document 1"]
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from repytile import server as server_module
+from repytile.cli import make_parser
+from repytile.server import (
+    CACHE_HEADER,
+    DevServer,
+    FileWatcher,
+    PageCache,
+    source_for_url,
+)
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    content = tmp_path / "content"
+    (content / "blog").mkdir(parents=True)
+    (content / "index.md").write_text("# Home\n\nWelcome")
+    (content / "blog" / "post.md").write_text("# Post\n\n* a\n* b")
+    (tmp_path / "template.html").write_text(TEMPLATE)
+    return tmp_path
+
+
+async def _get(port: int, path: str, method: str = "GET") -> tuple[int, dict, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in header_lines)
+    return int(status_line.split()[1]), headers, body
+
+
+def _run(site: Path, scenario, **kwargs):
+    async def main():
+        dev_server = DevServer(site / "content", site / "template.html", **kwargs)
+        await dev_server.start(port=0)
+        try:
+            return await scenario(dev_server)
+        finally:
+            await dev_server.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        pytest.param("/", "index.md", id="root"),
+        pytest.param("/blog/", "blog/index.md", id="directory"),
+        pytest.param("/blog/post.html", "blog/post.md", id="html-page"),
+        pytest.param("/blog/post", "blog/post.md", id="no-suffix"),
+        pytest.param("/blog/my%20post.html?x=1", "blog/my post.md", id="quoted"),
+        pytest.param("/../secret.html", None, id="parent-directory"),
+        pytest.param("/blog/%2e%2e/%2e%2e/secret", None, id="quoted-parent"),
+    ],
+)
+def test_source_for_url(url: str, expected) -> None:
+    assert source_for_url(url) == expected
+
+
+def test_page_cache_evicts_least_recently_used_pages() -> None:
+    cache = PageCache(max_bytes=10)
+    cache.put("a.md", "1", b"aaaa")
+    cache.put("b.md", "1", b"bbbb")
+    assert cache.get("a.md", "1") == b"aaaa"
+
+    cache.put("c.md", "1", b"cccc")
+
+    assert cache.get("b.md", "1") is None
+    assert cache.get("a.md", "1") == b"aaaa"
+    assert cache.size == 8
+    assert cache.evictions == 1
+
+
+def test_page_cache_keeps_one_version_per_page() -> None:
+    cache = PageCache()
+    cache.put("a.md", "1", b"old")
+    cache.put("a.md", "2", b"new")
+
+    assert len(cache) == 1
+    assert cache.get("a.md", "1") is None
+    assert cache.get("a.md", "2") == b"new"
+    cache.invalidate("a.md")
+    assert cache.size == 0
+
+
+def test_page_cache_rejects_invalid_size() -> None:
+    with pytest.raises(ValueError):
+        PageCache(0)
+
+
+def test_file_watcher_reports_changes(site: Path) -> None:
+    content = site / "content"
+    watcher = FileWatcher(content, extra_files=(site / "template.html",))
+    assert watcher.poll() == []
+
+    index = content / "index.md"
+    index.write_text("# Home\n\nChanged!")
+    os.utime(index, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    (content / "blog" / "post.md").unlink()
+    (content / "new.md").write_text("new")
+
+    assert watcher.poll() == sorted(
+        [index, content / "blog" / "post.md", content / "new.md"]
+    )
+    assert watcher.poll() == []
+
+
+def test_serves_rendered_pages_and_caches_them(site: Path) -> None:
+    async def scenario(dev_server: DevServer):
+        return [await _get(dev_server.port, "/") for _ in range(2)]
+
+    (cold_status, cold_headers, cold_body), (_, warm_headers, warm_body) = _run(
+        site, scenario, poll_interval=None
+    )
+
+    assert cold_status == 200
+    assert cold_body == b"<title>Home</title><div><h1>Home</h1><p>Welcome</p></div>"
+    assert cold_headers["Content-Type"] == "text/html; charset=utf-8"
+    assert cold_headers[CACHE_HEADER] == "miss"
+    assert warm_headers[CACHE_HEADER] == "hit"
+    assert warm_body == cold_body
+
+
+def test_head_requests_send_the_headers_of_the_page(site: Path) -> None:
+    async def scenario(dev_server: DevServer):
+        return [await _get(dev_server.port, "/", method) for method in ("GET", "HEAD")]
+
+    (_, get_headers, get_body), (status, headers, body) = _run(
+        site, scenario, poll_interval=None
+    )
+
+    assert status == 200
+    assert body == b""
+    assert headers["Content-Length"] == str(len(get_body))
+    assert headers["Content-Type"] == get_headers["Content-Type"]
+
+
+def test_changed_content_is_rendered_again(site: Path) -> None:
+    async def scenario(dev_server: DevServer):
+        await _get(dev_server.port, "/blog/post.html")
+        (site / "content" / "blog" / "post.md").write_text("# Post\n\nEdited")
+        return await _get(dev_server.port, "/blog/post.html")
+
+    _, headers, body = _run(site, scenario, poll_interval=None)
+
+    assert headers[CACHE_HEADER] == "miss"
+    assert b"<p>Edited</p>" in body
+
+
+def test_watcher_invalidates_cached_pages(site: Path) -> None:
+    async def scenario(dev_server: DevServer):
+        await _get(dev_server.port, "/")
+        assert len(dev_server.cache) == 1
+        (site / "content" / "index.md").write_text("# Home\n\nWatched change")
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if not len(dev_server.cache):
+                return True
+        return False
+
+    assert _run(site, scenario, poll_interval=0.01)
+
+
+def test_concurrent_requests_coalesce_into_one_render(
+    site: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    original = server_module.render_page
+
+    def slow_render(*args, **kwargs):
+        time.sleep(0.1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(server_module, "render_page", slow_render)
+
+    async def scenario(dev_server: DevServer):
+        responses = await asyncio.gather(
+            *(_get(dev_server.port, "/") for _ in range(5))
+        )
+        return dev_server.renders, responses
+
+    renders, responses = _run(site, scenario, poll_interval=None)
+
+    assert renders == 1
+    assert {body for _, _, body in responses} == {responses[0][2]}
+    assert all(status == 200 for status, _, _ in responses)
+
+
+@pytest.mark.parametrize(
+    "method, path, status",
+    [
+        pytest.param("GET", "/missing.html", 404, id="missing"),
+        pytest.param("GET", "/../template.html", 404, id="outside-content"),
+        pytest.param("POST", "/", 405, id="post"),
+        pytest.param("HEAD", "/", 200, id="head"),
+    ],
+)
+def test_error_statuses(site: Path, method: str, path: str, status: int) -> None:
+    async def scenario(dev_server: DevServer):
+        return await _get(dev_server.port, path, method)
+
+    assert _run(site, scenario, poll_interval=None)[0] == status
+
+
+def test_cli_serve_arguments() -> None:
+    args = make_parser().parse_args(
+        ["serve", "content", "--template", "t.html", "--port", "0"]
+    )
+
+    assert args.port == 0
+    assert args.poll_interval == server_module.DEFAULT_POLL_INTERVAL
+    assert args.cache_size * 1024 * 1024 == server_module.DEFAULT_CACHE_BYTES
@@ -0,0 +1,694 @@
+import gzip
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from repytile import __version__, site_builder
+from repytile.cli import main
+from repytile.site_builder import (
+    AST_CACHE_NAME,
+    MANIFEST_NAME,
+    BuildManifest,
+    BuildState,
+    Shard,
+    build_site,
+    compress_page,
+    copy_assets,
+    find_broken_links,
+    merge_shards,
+    shard_for,
+)
+from repytile.exceptions import ShardMergeError
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    content = tmp_path / "content"
+    (content / "blog").mkdir(parents=True)
+    (content / "index.md").write_text("# Home\n\nWelcome")
+    (content / "blog" / "post.md").write_text("# Post\n\n* a\n* b")
+    (content / "notes.txt").write_text("not markdown")
+    (tmp_path / "template.html").write_text(TEMPLATE)
+    return tmp_path
+
+
+def _build(site: Path):
+    return build_site(site / "content", site / "public", site / "template.html")
+
+
+def test_build_renders_every_markdown_file(site: Path) -> None:
+    report = _build(site)
+
+    assert report.rendered == ["blog/post.md", "index.md"]
+    assert report.skipped == []
+    assert (site / "public" / "index.html").read_text() == (
+        "<title>Home</title><div><h1>Home</h1><p>Welcome</p></div>"
+    )
+    assert (site / "public" / "blog" / "post.html").exists()
+    assert not (site / "public" / "notes.html").exists()
+
+
+def test_build_records_hashes_and_version_in_manifest(site: Path) -> None:
+    _build(site)
+
+    manifest = json.loads((site / "public" / MANIFEST_NAME).read_text())
+
+    assert manifest["version"] == __version__
+    assert manifest["template_hash"]
+    assert set(manifest["pages"]) == {"blog/post.md", "index.md"}
+    assert manifest["pages"]["index.md"]["output"] == "index.html"
+
+
+def test_unchanged_pages_are_skipped(site: Path) -> None:
+    _build(site)
+    (site / "content" / "index.md").write_text("# Home\n\nChanged")
+
+    report = _build(site)
+
+    assert report.rendered == ["index.md"]
+    assert report.skipped == ["blog/post.md"]
+    assert report.hit_rate == 0.5
+    assert "Changed" in (site / "public" / "index.html").read_text()
+
+
+def test_deleted_output_is_rendered_again(site: Path) -> None:
+    _build(site)
+    (site / "public" / "index.html").unlink()
+
+    report = _build(site)
+
+    assert report.rendered == ["index.md"]
+
+
+def test_template_change_invalidates_every_page(site: Path) -> None:
+    _build(site)
+    (site / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+
+    report = _build(site)
+
+    assert report.rendered == ["blog/post.md", "index.md"]
+    assert report.hit_rate == 0.0
+
+
+def test_template_change_renders_from_the_ast_cache(site: Path) -> None:
+    _build(site)
+    _build(site)
+    (site / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+
+    report = _build(site)
+
+    assert report.ast_hits == 2
+    assert "2 loaded from the AST cache" in report.summary()
+    assert (site / "public" / "index.html").read_text() == (
+        "<h1>Home</h1><div><h1>Home</h1><p>Welcome</p></div>"
+    )
+
+
+def test_ast_cache_drops_documents_of_changed_sources(site: Path) -> None:
+    _build(site)
+    ast_dir = site / "public" / AST_CACHE_NAME
+    before = {path.name for path in ast_dir.iterdir()}
+    (site / "content" / "index.md").write_text("# Home\n\nChanged")
+
+    _build(site)
+
+    after = {path.name for path in ast_dir.iterdir()}
+    assert len(before) == len(after) == 2
+    assert len(before & after) == 1
+
+
+def test_corrupt_ast_files_are_parsed_again(site: Path) -> None:
+    _build(site)
+    for path in (site / "public" / AST_CACHE_NAME).iterdir():
+        path.write_bytes(b"garbage")
+    (site / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+
+    report = _build(site)
+
+    assert report.ast_hits == 0
+    assert report.rendered == ["blog/post.md", "index.md"]
+    assert "<p>Welcome</p>" in (site / "public" / "index.html").read_text()
+
+
+def test_ast_cache_can_be_disabled(site: Path) -> None:
+    build_site(
+        site / "content", site / "public", site / "template.html", use_ast_cache=False
+    )
+
+    assert not (site / "public" / AST_CACHE_NAME).exists()
+
+
+def test_version_change_invalidates_every_page(site: Path) -> None:
+    _build(site)
+    manifest_path = site / "public" / MANIFEST_NAME
+    manifest = BuildManifest.load(manifest_path)
+    manifest.version = "0.0.0"
+    manifest.save(manifest_path)
+
+    report = _build(site)
+
+    assert report.skipped == []
+
+
+def test_corrupted_manifest_forces_full_build(site: Path) -> None:
+    _build(site)
+    (site / "public" / MANIFEST_NAME).write_text("{not json")
+
+    report = _build(site)
+
+    assert len(report.rendered) == 2
+
+
+def test_build_command_reports_cache_hit_rate(
+    site: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = [
+        "build",
+        str(site / "content"),
+        str(site / "public"),
+        "--template",
+        str(site / "template.html"),
+    ]
+    main(args)
+    main(args)
+
+    output = capsys.readouterr().out.splitlines()
+
+    assert output[-1] == "2 pages: 0 rendered, 2 unchanged (cache hit rate 100.0%)"
+
+
+def test_parallel_build_matches_serial_build(site: Path) -> None:
+    for i in range(20):
+        (site / "content" / f"page{i:02}.md").write_text(f"# Page {i}\n\n**{i}**")
+    serial = _build(site)
+
+    parallel = build_site(
+        site / "content", site / "parallel", site / "template.html", jobs=3
+    )
+
+    assert parallel.rendered == serial.rendered
+    for source in serial.rendered:
+        html = source.removesuffix(".md") + ".html"
+        assert (site / "parallel" / html).read_text() == (
+            site / "public" / html
+        ).read_text()
+
+
+def test_failing_pages_are_reported_and_retried(site: Path) -> None:
+    (site / "content" / "broken.md").write_bytes(b"# \xff invalid utf-8")
+
+    report = build_site(
+        site / "content", site / "public", site / "template.html", jobs=2
+    )
+
+    assert report.rendered == ["blog/post.md", "index.md"]
+    assert list(report.errors) == ["broken.md"]
+    assert "UnicodeDecodeError" in report.errors["broken.md"]
+    assert report.errors["broken.md"].startswith("worker ")
+    assert "broken.md" not in BuildManifest.load(site / "public" / MANIFEST_NAME).pages
+
+    (site / "content" / "broken.md").write_text("# Fixed")
+    report = _build(site)
+
+    assert report.rendered == ["broken.md"]
+
+
+def test_build_rejects_invalid_jobs(site: Path) -> None:
+    with pytest.raises(ValueError):
+        build_site(site / "content", site / "public", site / "template.html", jobs=0)
+
+
+def test_build_reports_shared_inline_nodes(site: Path) -> None:
+    (site / "content" / "nav.md").write_text("[Home](/)\n\n[Home](/)")
+
+    report = _build(site)
+
+    assert report.intern_hits >= 1
+    assert "inline nodes shared" in report.summary()
+
+
+def _build_compressed(site: Path, jobs: int = 1):
+    return build_site(
+        site / "content",
+        site / "public",
+        site / "template.html",
+        jobs=jobs,
+        compress=True,
+        compress_min_size=200,
+    )
+
+
+@pytest.mark.parametrize(
+    "jobs", [pytest.param(1, id="serial"), pytest.param(2, id="parallel")]
+)
+def test_compressed_copies_are_written_above_the_size_threshold(
+    site: Path, jobs: int
+) -> None:
+    (site / "content" / "long.md").write_text("# Long\n\n" + "Lorem ipsum. " * 50)
+
+    report = _build_compressed(site, jobs)
+
+    public = site / "public"
+    assert report.compressed == 1
+    assert (
+        gzip.decompress((public / "long.html.gz").read_bytes())
+        == (public / "long.html").read_bytes()
+    )
+    assert not (public / "index.html.gz").exists()
+    assert BuildManifest.load(public / MANIFEST_NAME).pages["long.md"].compressed
+
+
+def test_compression_is_deterministic() -> None:
+    assert compress_page(b"<p>page</p>") == compress_page(b"<p>page</p>")
+
+
+def test_unchanged_compressed_copies_are_not_rewritten(site: Path) -> None:
+    (site / "content" / "long.md").write_text("# Long\n\n" + "Lorem ipsum. " * 50)
+    _build_compressed(site)
+    compressed = site / "public" / "long.html.gz"
+    compressed.write_bytes(b"marker")
+    manifest = BuildManifest.load(site / "public" / MANIFEST_NAME)
+    # A new repytile version renders every page again, to the same content
+    manifest.version = "0.0.0"
+    manifest.save(site / "public" / MANIFEST_NAME)
+
+    report = _build_compressed(site)
+
+    assert "long.md" in report.rendered
+    assert report.compressed == 0
+    assert report.compressed_unchanged == 1
+    assert compressed.read_bytes() == b"marker"
+
+
+def test_stale_compressed_copies_are_removed(site: Path) -> None:
+    (site / "content" / "long.md").write_text("# Long\n\n" + "Lorem ipsum. " * 50)
+    _build_compressed(site)
+    (site / "content" / "long.md").write_text("# Short")
+
+    report = _build_compressed(site)
+
+    assert report.rendered == ["long.md"]
+    assert not (site / "public" / "long.html.gz").exists()
+    assert (
+        not BuildManifest.load(site / "public" / MANIFEST_NAME)
+        .pages["long.md"]
+        .compressed
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        pytest.param({"compress": False}, id="compression-off"),
+        pytest.param(
+            {"compress": True, "compress_min_size": 10_000}, id="threshold-raised"
+        ),
+    ],
+)
+def test_compressed_copies_of_unchanged_pages_are_removed(
+    site: Path, options: dict
+) -> None:
+    (site / "content" / "long.md").write_text("# Long\n\n" + "Lorem ipsum. " * 50)
+    _build_compressed(site)
+
+    report = build_site(
+        site / "content", site / "public", site / "template.html", **options
+    )
+
+    assert "long.md" in report.rendered
+    assert report.compressed_unchanged == 0
+    assert not (site / "public" / "long.html.gz").exists()
+    assert (
+        not BuildManifest.load(site / "public" / MANIFEST_NAME)
+        .pages["long.md"]
+        .compressed
+    )
+
+
+def test_enabling_compression_renders_every_page(site: Path) -> None:
+    _build(site)
+
+    report = build_site(
+        site / "content",
+        site / "public",
+        site / "template.html",
+        compress=True,
+        compress_min_size=0,
+    )
+
+    assert report.skipped == []
+    assert report.compressed == 2
+    assert (site / "public" / "blog" / "post.html.gz").exists()
+
+
+def _write_linked_pages(site: Path) -> None:
+    (site / "content" / "index.md").write_text(
+        "# Home\n\n[Post](blog/post.html)\n\n![Logo](img/logo.png)"
+    )
+    (site / "content" / "blog" / "links.md").write_text(
+        "* [Home](../index.html)\n* [Gone](gone.html)"
+    )
+    (site / "content" / "img").mkdir()
+    (site / "content" / "img" / "logo.png").write_bytes(b"png")
+
+
+def test_build_indexes_links_of_every_page(site: Path) -> None:
+    _write_linked_pages(site)
+    _build(site)
+    (site / "content" / "blog" / "post.md").write_text("# Post\n\n[Home](/)")
+
+    report = _build(site)
+
+    assert report.skipped == ["blog/links.md", "index.md"]
+    assert [(record.source, record.url) for record in report.links] == [
+        ("blog/links.md", "../index.html"),
+        ("blog/links.md", "gone.html"),
+        ("blog/post.md", "/"),
+        ("index.md", "blog/post.html"),
+        ("index.md", "img/logo.png"),
+    ]
+    manifest = BuildManifest.load(site / "public" / MANIFEST_NAME)
+    assert list(manifest.links) == list(report.links)
+
+
+def test_links_of_pages_loaded_from_the_ast_cache_are_indexed(site: Path) -> None:
+    _write_linked_pages(site)
+    first = _build(site)
+    (site / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+
+    report = _build(site)
+
+    assert report.ast_hits == 3
+    assert list(report.links) == list(first.links)
+
+
+def test_broken_links_and_assets(site: Path) -> None:
+    _write_linked_pages(site)
+    report = _build(site)
+
+    broken = find_broken_links(report.links, site / "content", site / "public")
+
+    assert [(record.source, record.line, record.url) for record in broken] == [
+        ("blog/links.md", 2, "gone.html")
+    ]
+    assert copy_assets(report.links, site / "content", site / "public") == [
+        "img/logo.png"
+    ]
+    assert (site / "public" / "img" / "logo.png").read_bytes() == b"png"
+    assert copy_assets(report.links, site / "content", site / "public") == []
+
+
+def test_links_to_content_files_that_are_not_copied_are_broken(site: Path) -> None:
+    _write_linked_pages(site)
+    (site / "content" / "sources.md").write_text(
+        "* [Source](blog/post.md)\n* [Doc](doc.pdf)\n* [Logo](img/logo.png)"
+    )
+    (site / "content" / "doc.pdf").write_bytes(b"pdf")
+    report = _build(site)
+
+    broken = find_broken_links(report.links, site / "content", site / "public")
+
+    # Only images are copied into the site, a link to one is valid once it is copied
+    assert [(record.source, record.line, record.url) for record in broken] == [
+        ("blog/links.md", 2, "gone.html"),
+        ("sources.md", 1, "blog/post.md"),
+        ("sources.md", 2, "doc.pdf"),
+    ]
+
+
+def test_build_command_checks_links(
+    site: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    _write_linked_pages(site)
+    args = [
+        "build",
+        str(site / "content"),
+        str(site / "public"),
+        "--template",
+        str(site / "template.html"),
+        "--check-links",
+        "--copy-assets",
+    ]
+
+    assert main(args) == 1
+
+    captured = capsys.readouterr()
+    assert "blog/links.md:2: broken link gone.html" in captured.err
+    assert "1 assets copied" in captured.out
+
+
+def _write_many_pages(site: Path, count: int = 20) -> None:
+    for i in range(count):
+        (site / "content" / f"page{i:02}.md").write_text(
+            f"# Page {i}\n\n[next](page{(i + 1) % count:02}.html)"
+        )
+
+
+def _build_shards(site: Path, count: int) -> list[Path]:
+    shard_dirs = []
+    for number in range(1, count + 1):
+        shard_dir = site / f"shard{number}"
+        build_site(
+            site / "content",
+            shard_dir,
+            site / "template.html",
+            shard=Shard(number, count),
+        )
+        shard_dirs.append(shard_dir)
+    return shard_dirs
+
+
+def test_shards_partition_sources_by_path() -> None:
+    sources = [f"docs/page{i}.md" for i in range(100)]
+
+    shards = [shard_for(source, 4) for source in sources]
+
+    assert set(shards) == {1, 2, 3, 4}
+    assert shards == [shard_for(source, 4) for source in sources]
+    assert all(
+        Shard(number, 4).contains(source) for source, number in zip(sources, shards)
+    )
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        pytest.param("0/4", id="zero"),
+        pytest.param("5/4", id="above-count"),
+        pytest.param("4", id="no-count"),
+        pytest.param("a/b", id="not-numbers"),
+    ],
+)
+def test_invalid_shards_are_rejected(spec: str) -> None:
+    with pytest.raises(ValueError):
+        Shard.parse(spec)
+
+
+def test_merged_shards_match_a_full_build(site: Path) -> None:
+    _write_many_pages(site)
+    full = _build(site)
+    shard_dirs = _build_shards(site, 3)
+
+    merged = merge_shards(shard_dirs, site / "merged", content_dir=site / "content")
+
+    expected = BuildManifest.load(site / "public" / MANIFEST_NAME)
+    assert merged.shard is None
+    assert merged.to_dict() == expected.to_dict()
+    assert BuildManifest.load(site / "merged" / MANIFEST_NAME).to_dict() == (
+        expected.to_dict()
+    )
+    for source in full.rendered:
+        html = source.removesuffix(".md") + ".html"
+        assert (site / "merged" / html).read_text() == (
+            site / "public" / html
+        ).read_text()
+
+    report = build_site(site / "content", site / "merged", site / "template.html")
+
+    assert report.rendered == []
+
+
+def test_merge_reports_missing_and_duplicated_shards(site: Path) -> None:
+    _write_many_pages(site)
+    shard_dirs = _build_shards(site, 3)
+
+    with pytest.raises(ShardMergeError) as excinfo:
+        merge_shards([shard_dirs[0], shard_dirs[0], shard_dirs[1]], site / "merged")
+
+    assert f"shard 1/3 already given by {shard_dirs[0]}" in str(excinfo.value)
+    assert "shard 3/3 is missing" in str(excinfo.value)
+    assert not (site / "merged").exists()
+
+
+def test_merge_reports_pages_missing_from_shards(site: Path) -> None:
+    _write_many_pages(site)
+    shard_dirs = _build_shards(site, 2)
+    failing = next(
+        f"page{i:02}.md" for i in range(20) if shard_for(f"page{i:02}.md", 2) == 1
+    )
+    (site / "content" / failing).write_bytes(b"# \xff invalid utf-8")
+    build_site(
+        site / "content", shard_dirs[0], site / "template.html", shard=Shard(1, 2)
+    )
+    (shard_dirs[1] / "index.html").unlink(missing_ok=True)
+    (shard_dirs[1] / "blog" / "post.html").unlink(missing_ok=True)
+    (site / "content" / "late.md").write_text("# Late")
+
+    with pytest.raises(ShardMergeError) as excinfo:
+        merge_shards(shard_dirs, site / "merged", content_dir=site / "content")
+
+    problems = str(excinfo.value).splitlines()
+    assert f"{failing}: not built by shard 1/2" in problems
+    assert "late.md: not built by any shard" in problems
+    assert any("missing from" in problem for problem in problems)
+
+
+def test_shards_built_by_separate_processes_are_merged(
+    site: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    _write_many_pages(site)
+    count = 3
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "repytile",
+                "build",
+                str(site / "content"),
+                str(site / f"shard{number}"),
+                "--template",
+                str(site / "template.html"),
+                "--shard",
+                f"{number}/{count}",
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+        for number in range(1, count + 1)
+    ]
+    assert [process.wait() for process in processes] == [0] * count
+
+    merge_args = ["merge", str(site / "merged")]
+    merge_args += [str(site / f"shard{number}") for number in range(1, count + 1)]
+    merge_args += ["--content", str(site / "content"), "--check-links"]
+
+    assert main(merge_args) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "22 pages merged from 3 shards"
+    assert main(merge_args[:-4]) == 1
+    assert "shard 3/3 is missing" in capsys.readouterr().err
+
+
+def test_build_command_rejects_link_checks_of_a_shard(
+    site: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    args = [
+        "build",
+        str(site / "content"),
+        str(site / "public"),
+        "--template",
+        str(site / "template.html"),
+        "--shard",
+        "1/2",
+        "--check-links",
+    ]
+
+    assert main(args) == 2
+    assert "--check-links is not supported with --shard" in capsys.readouterr().err
+    assert not (site / "public").exists()
+
+
+def test_build_state_only_reads_changed_sources(
+    site: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    state = BuildState()
+
+    def build():
+        return build_site(
+            site / "content", site / "public", site / "template.html", state=state
+        )
+
+    assert build().rendered == ["blog/post.md", "index.md"]
+    hashed: list[str] = []
+    original = site_builder.map_source
+
+    def counting_map_source(path):
+        hashed.append(Path(path).name)
+        return original(path)
+
+    monkeypatch.setattr(site_builder, "map_source", counting_map_source)
+    (site / "content" / "index.md").write_text("# Home\n\nEdited")
+
+    report = build()
+
+    assert report.rendered == ["index.md"]
+    assert report.skipped == ["blog/post.md"]
+    assert hashed == ["index.md", "index.md"]
+    assert "Edited" in (site / "public" / "index.html").read_text()
+
+
+def test_build_state_renders_template_changes_from_memory(site: Path) -> None:
+    state = BuildState()
+
+    def build():
+        return build_site(
+            site / "content",
+            site / "public",
+            site / "template.html",
+            use_ast_cache=False,
+            state=state,
+        )
+
+    build()
+    (site / "template.html").write_text("<h6>{{ Title }}</h6>{{ Content }}")
+
+    report = build()
+
+    assert report.rendered == ["blog/post.md", "index.md"]
+    assert report.ast_hits == 2
+    assert (site / "public" / "index.html").read_text().startswith("<h6>Home</h6>")
+    assert not (site / "public" / AST_CACHE_NAME).exists()
+
+    (site / "content" / "blog" / "post.md").unlink()
+    build()
+
+    assert len(state.pages) == 1
+
+
+def test_identical_pages_are_not_rewritten(site: Path) -> None:
+    _build(site)
+    index = site / "public" / "index.html"
+    post = site / "public" / "blog" / "post.html"
+    mtimes = index.stat().st_mtime_ns, post.stat().st_mtime_ns
+    # Renders to the same HTML
+    (site / "content" / "index.md").write_text("# Home\n\n\n\nWelcome\n")
+    (site / "content" / "blog" / "post.md").write_text("# Post\n\n* a\n* c")
+
+    report = _build(site)
+
+    assert report.rendered == ["blog/post.md", "index.md"]
+    assert (report.files_written, report.files_unchanged) == (1, 1)
+    assert "1 files written, 1 identical files kept" in report.summary()
+    assert index.stat().st_mtime_ns == mtimes[0]
+    assert post.stat().st_mtime_ns != mtimes[1]
+    assert "<li>c</li>" in post.read_text()
+    assert not [path for path in (site / "public").rglob("*.tmp")]
+
+
+def test_identical_pages_are_written_again_when_missing(site: Path) -> None:
+    _build(site)
+    (site / "public" / "index.html").unlink()
+    (site / "content" / "index.md").write_text("# Home\n\n\n\nWelcome\n")
+
+    report = build_site(
+        site / "content", site / "public", site / "template.html", jobs=2
+    )
+
+    assert report.files_written == 1
+    assert (site / "public" / "index.html").read_text() == (
+        "<title>Home</title><div><h1>Home</h1><p>Welcome</p></div>"
+    )
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from repytile.block_parser import MarkdownBlock, iter_blocks, markdown_to_html_node
+from repytile.source import map_source
+
+
+def test_mapped_files_are_parsed_from_their_bytes(tmp_path: Path) -> None:
+    path = tmp_path / "page.md"
+    path.write_bytes("# Tîte\r\n\r\nSome *text*\r\n".encode("utf-8"))
+
+    with map_source(path) as source:
+        blocks = list(iter_blocks(source))
+        html = markdown_to_html_node(source).to_html()
+
+    assert blocks == [
+        MarkdownBlock("heading", ["# Tîte"], 1),
+        MarkdownBlock("paragraph", ["Some *text*"], 3),
+    ]
+    assert html == "<div><h1>Tîte</h1><p>Some <i>text</i></p></div>"
+
+
+def test_empty_files_are_not_mapped(tmp_path: Path) -> None:
+    path = tmp_path / "empty.md"
+    path.write_bytes(b"")
+
+    with map_source(path) as source:
+        assert source == b""
+        assert markdown_to_html_node(source).to_html() == "<div></div>"
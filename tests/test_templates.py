@@ -0,0 +1,76 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from repytile.block_elements import LeafNode, ParentNode
+from repytile.pages import render_page, render_page_to
+from repytile.templates import Template, clear_template_cache, load_template
+
+
+@pytest.fixture(autouse=True)
+def empty_template_cache() -> None:
+    clear_template_cache()
+
+
+def test_template_is_parsed_into_segments_and_slots() -> None:
+    template = Template("<title>{{ Title }}</title>{{Content}}<footer>{{ Title }}")
+
+    assert template.placeholders == ["Title", "Content", "Title"]
+    assert template.render({"Title": "Hi", "Content": "<p>x</p>"}) == (
+        "<title>Hi</title><p>x</p><footer>Hi"
+    )
+
+
+def test_template_without_placeholders_renders_verbatim() -> None:
+    assert Template("<html></html>").render({"Title": "unused"}) == "<html></html>"
+
+
+def test_placeholders_without_value_are_kept() -> None:
+    template = Template("{{ Title }} {{ Unknown }}")
+
+    assert template.render({"Title": "Hi"}) == "Hi {{ Unknown }}"
+
+
+def test_template_renders_nodes_in_slots() -> None:
+    node = ParentNode(tag="p", children=[LeafNode("b", "bold")])
+
+    assert Template("<main>{{ Content }}</main>").render({"Content": node}) == (
+        "<main><p><b>bold</b></p></main>"
+    )
+
+
+def test_template_render_to_streams_into_writer() -> None:
+    node = ParentNode(tag="p", children=[LeafNode(None, "streamed")])
+    template = Template("<title>{{ Title }}</title>{{ Content }}")
+    writer = io.StringIO()
+
+    template.render_to(writer, {"Title": "Hi", "Content": node})
+
+    assert writer.getvalue() == "<title>Hi</title><p>streamed</p>"
+
+
+def test_render_page_to_matches_render_page() -> None:
+    template = Template("<title>{{ Title }}</title>{{ Content }}")
+    writer = io.StringIO()
+
+    render_page_to(writer, "# Hello\n\nworld", template)
+
+    assert writer.getvalue() == render_page("# Hello\n\nworld", template)
+
+
+def test_load_template_is_cached_until_file_changes(tmp_path: Path) -> None:
+    path = tmp_path / "template.html"
+    path.write_text("<p>{{ Content }}</p>")
+
+    first = load_template(path)
+    assert load_template(path) is first
+
+    path.write_text("<div>{{ Content }}</div>")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = load_template(path)
+
+    assert second is not first
+    assert second.render({"Content": "x"}) == "<div>x</div>"
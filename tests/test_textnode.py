@@ -82,3 +82,21 @@ def test_textnode_eq_method_evaluates_correctly(
 )
 def test_text_repr_follows_expected_format(text_node: TextNode, expected: str) -> None:
     assert str(text_node) == expected
+
+
+def test_textnode_does_not_carry_an_instance_dict() -> None:
+    assert not hasattr(TextNode("text", "type"), "__dict__")
+
+
+def test_equal_textnodes_have_the_same_hash() -> None:
+    nodes = {TextNode("text", "link", "url"), TextNode("text", "link", "url")}
+
+    assert nodes == {TextNode("text", "link", "url")}
+
+
+@pytest.mark.parametrize("field", ["text", "text_type", "url"])
+def test_textnode_is_immutable(field: str) -> None:
+    text_node = TextNode("text", "type")
+
+    with pytest.raises(AttributeError):
+        setattr(text_node, field, "changed")
@@ -0,0 +1,189 @@
+from repytile.block_elements import HTMLNode, LeafNode, ParentNode
+from repytile.block_parser import markdown_to_html_node
+from repytile.helpers import LeafNodePool
+from repytile.transforms import (
+    ExternalLinks,
+    HeadingIds,
+    LazyImages,
+    RewriteUrls,
+    Transform,
+    TreeWalk,
+    apply_transforms,
+    slugify,
+    text_content,
+)
+
+MARKDOWN = """# Intro
+
+## Setup [guide](https://example.com/guide)
+
+![logo](/img/logo.png) and [home](/index.md)
+
+### Details
+
+## Setup
+"""
+
+
+class Recorder(Transform):
+    def __init__(self, name: str, events: list[str]) -> None:
+        self.name = name
+        self.events = events
+
+    def enter(self, walk: TreeWalk) -> None:
+        self.events.append(f"{self.name}+{walk.node.tag}@{walk.depth}")
+
+    def exit(self, walk: TreeWalk) -> None:
+        self.events.append(f"{self.name}-{walk.node.tag}")
+
+
+def test_transforms_are_fused_in_one_traversal() -> None:
+    events: list[str] = []
+    root = ParentNode(
+        tag="div",
+        children=[
+            ParentNode(tag="p", children=[LeafNode("b", "x")]),
+            LeafNode("i", "y"),
+        ],
+    )
+
+    apply_transforms(root, [Recorder("A", events), Recorder("B", events)])
+
+    assert events == [
+        "A+div@0",
+        "B+div@0",
+        "A+p@1",
+        "B+p@1",
+        "A+b@2",
+        "B+b@2",
+        "A-b",
+        "B-b",
+        "A-p",
+        "B-p",
+        "A+i@1",
+        "B+i@1",
+        "A-i",
+        "B-i",
+        "A-div",
+        "B-div",
+    ]
+
+
+def test_hooks_only_run_on_their_tags() -> None:
+    events: list[str] = []
+    recorder = Recorder("A", events)
+    recorder.tags = frozenset({"b"})  # type: ignore[misc]
+    root = ParentNode(tag="p", children=[LeafNode("b", "x"), LeafNode("i", "y")])
+
+    apply_transforms(root, [recorder])
+
+    assert events == ["A+b@1", "A-b"]
+
+
+def test_skipped_children_are_not_visited() -> None:
+    class SkipParagraphs(Transform):
+        def enter(self, walk: TreeWalk) -> None:
+            if walk.node.tag == "p":
+                walk.skip_children()
+
+    events: list[str] = []
+    root = ParentNode(
+        tag="div", children=[ParentNode(tag="p", children=[LeafNode("b", "x")])]
+    )
+
+    apply_transforms(root, [SkipParagraphs(), Recorder("A", events)])
+
+    assert events == ["A+div@0", "A+p@1", "A-p", "A-div"]
+
+
+def test_root_can_be_replaced() -> None:
+    class Wrap(Transform):
+        def enter(self, walk: TreeWalk) -> None:
+            if walk.parent is None and walk.node.tag == "p":
+                walk.replace(ParentNode(tag="section", children=[walk.node]))
+                walk.skip_children()
+
+    root = ParentNode(tag="p", children=[LeafNode(None, "text")])
+
+    assert (
+        apply_transforms(root, [Wrap()]).to_html() == "<section><p>text</p></section>"
+    )
+
+
+def test_builtin_transforms() -> None:
+    root = markdown_to_html_node(MARKDOWN)
+    root.to_html()
+    headings = HeadingIds()
+
+    apply_transforms(
+        root,
+        [
+            headings,
+            ExternalLinks(target="_blank"),
+            LazyImages(),
+            RewriteUrls(lambda url: url.replace(".md", ".html")),
+        ],
+    )
+
+    assert root.to_html() == (
+        '<div><h1 id="intro">Intro</h1>'
+        '<h2 id="setup-guide">Setup <a href="https://example.com/guide" '
+        'rel="noopener noreferrer" target="_blank">guide</a></h2>'
+        '<p><img src="/img/logo.png" alt="logo" loading="lazy">logo</img> and '
+        '<a href="/index.html">home</a></p>'
+        '<h3 id="details">Details</h3><h2 id="setup">Setup</h2></div>'
+    )
+    assert headings.headings == [
+        (1, "intro", "Intro"),
+        (2, "setup-guide", "Setup guide"),
+        (3, "details", "Details"),
+        (2, "setup", "Setup"),
+    ]
+    assert headings.table_of_contents().to_html() == (  # type: ignore[union-attr]
+        '<ul><li><a href="#intro">Intro</a><ul>'
+        '<li><a href="#setup-guide">Setup guide</a><ul>'
+        '<li><a href="#details">Details</a></li></ul></li>'
+        '<li><a href="#setup">Setup</a></li></ul></li></ul>'
+    )
+
+
+def test_heading_ids_are_unique_and_reset_per_document() -> None:
+    headings = HeadingIds()
+    root = markdown_to_html_node("## A\n\n## A\n\n## A-1")
+
+    apply_transforms(root, [headings])
+    assert [heading_id for _, heading_id, _ in headings.headings] == [
+        "a",
+        "a-1",
+        "a-1-1",
+    ]
+
+    apply_transforms(markdown_to_html_node("## A"), [headings])
+    assert headings.headings == [(2, "a", "A")]
+
+
+def test_internal_links_are_left_alone() -> None:
+    root = markdown_to_html_node("[a](https://my.site/a) [b](/b)")
+
+    apply_transforms(root, [ExternalLinks(site_hosts=["my.site"])])
+
+    assert "rel=" not in root.to_html()
+
+
+def test_pooled_leaves_are_copied_before_being_updated() -> None:
+    pool = LeafNodePool()
+    first = markdown_to_html_node("![a](/a.png)", pool)
+    second = markdown_to_html_node("![a](/a.png)", pool)
+
+    apply_transforms(first, [LazyImages()])
+
+    assert 'loading="lazy"' in first.to_html()
+    assert 'loading="lazy"' not in second.to_html()
+
+
+def test_text_content_and_slugify() -> None:
+    node: HTMLNode = markdown_to_html_node("## Getting *Started*, ![x](/x.png) now!")
+
+    assert text_content(node) == "Getting Started,  now!"
+    assert slugify(text_content(node)) == "getting-started-now"
+    assert slugify("!!!") == "section"